@@ -19,7 +19,7 @@ from config_loader import ConfigLoader
 from question_manager import QuestionManager
 from exam_logic import ExamLogic
 from ui_components import UIComponents
-from data_persistence import DataPersistence
+from data_persistence import crear_persistencia, obtener_cola_progreso
 from validators import validate_codigo_estudiante
 
 
@@ -93,8 +93,8 @@ def main():
     # EXAMEN DISPONIBLE - CONTINUAR NORMALMENTE
     # ============================================
     try:
-        # Cargar banco de preguntas
-        question_manager = QuestionManager(config['archivo_preguntas'])
+        # Cargar banco de preguntas (compartido entre sesiones y reruns)
+        question_manager = QuestionManager.obtener_compartido(config['archivo_preguntas'])
         
         # Inicializar componentes
         ui = UIComponents(config)
@@ -222,7 +222,7 @@ def mostrar_pantalla_inicio(config, ui):
                 codigo_limpio = codigo.strip().upper()
                 
                 try:
-                    persistence = DataPersistence(config)
+                    persistence = crear_persistencia(config)
                     
                     if persistence.verificar_examen_completado(codigo_limpio):
                         st.error("⚠️ Ya completaste este examen anteriormente.")
@@ -256,7 +256,7 @@ def ejecutar_examen(config, question_manager, ui):
     if 'exam_logic' not in st.session_state:
         st.session_state.exam_logic = ExamLogic(config, question_manager)
         try:
-            persistence = DataPersistence(config)
+            persistence = crear_persistencia(config)
             persistence.guardar_inicio_examen(st.session_state.codigo_estudiante)
         except Exception as e:
             st.warning(f"⚠️ No se pudo guardar el inicio del examen: {e}")
@@ -338,15 +338,15 @@ def ejecutar_examen(config, question_manager, ui):
             if opciones_key in st.session_state:
                 del st.session_state[opciones_key]
             
+            # El progreso se escribe en segundo plano (ver ColaProgreso)
             try:
-                persistence = DataPersistence(config)
-                persistence.actualizar_progreso_examen(
+                obtener_cola_progreso(config).encolar(
                     st.session_state.codigo_estudiante,
                     exam_logic.pregunta_actual,
                     exam_logic.correctas,
                     exam_logic.incorrectas
                 )
-            except:
+            except Exception:
                 pass
             
             st.rerun()
@@ -363,7 +363,13 @@ def guardar_resultados(config, exam_logic):
         # 3. TERCERO: Ahora sí guardar en Sheets (con mensajes)
         st.info("🔄 Guardando resultados en Google Sheets...")
         
-        persistence = DataPersistence(config)
+        # Descartar progreso pendiente para que no llegue después del resultado final
+        try:
+            obtener_cola_progreso(config).descartar(st.session_state.codigo_estudiante)
+        except Exception:
+            pass
+        
+        persistence = crear_persistencia(config)
         resultado = persistence.guardar_resultados(
             codigo_estudiante=st.session_state.codigo_estudiante,
             stats=stats
@@ -389,10 +395,15 @@ def mostrar_resultados(config, ui):
     
     stats = st.session_state.final_stats
     
+    # Los textos de la retroalimentación se leen del banco solo al mostrar
+    exam_logic = st.session_state.get('exam_logic')
+    detalle_respuestas = exam_logic.obtener_detalle_respuestas() if exam_logic else []
+    
     # Mostrar resultados
     ui.mostrar_resultados_finales(
         stats=stats,
-        codigo=st.session_state.codigo_estudiante
+        codigo=st.session_state.codigo_estudiante,
+        detalle_respuestas=detalle_respuestas
     )
     
     # Botón para reiniciar
@@ -0,0 +1,62 @@
+"""
+Directorios de la Aplicación
+Directorios de caché privados del usuario para los archivos que comparten
+los procesos de la aplicación (imágenes de bancos, espejos de resultados)
+"""
+import os
+import stat
+from pathlib import Path
+from typing import Optional, Union
+
+
+def directorio_cache() -> Path:
+    """Directorio base de caché de la aplicación ($XDG_CACHE_HOME/examenes o ~/.cache/examenes)"""
+    return Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'examenes'
+
+
+def es_propio(ruta: Union[str, Path]) -> bool:
+    """
+    Indica si un archivo existe, no es un enlace simbólico y pertenece al usuario actual
+
+    Args:
+        ruta: Ruta a comprobar
+
+    Returns:
+        True si el archivo es del usuario actual
+    """
+    try:
+        info = os.lstat(ruta)
+    except OSError:
+        return False
+    if stat.S_ISLNK(info.st_mode):
+        return False
+    return not hasattr(os, 'getuid') or info.st_uid == os.getuid()
+
+
+def directorio_privado(nombre: str, variable: Optional[str] = None) -> Path:
+    """
+    Crea (si hace falta) y valida un directorio privado de la aplicación
+
+    Los procesos del mismo usuario comparten el directorio; los de otros
+    usuarios no pueden leerlo ni escribir en él. Un directorio existente con
+    permisos más abiertos que 0700 se rechaza (no se cambian sus permisos).
+
+    Args:
+        nombre: Subdirectorio dentro de directorio_cache()
+        variable: Variable de entorno que puede indicar otra ruta
+
+    Returns:
+        Ruta del directorio
+
+    Raises:
+        OSError: Si no se puede crear, no pertenece al usuario actual o
+            otros usuarios tienen acceso
+    """
+    directorio = Path((variable and os.environ.get(variable)) or directorio_cache() / nombre)
+    directorio.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    if not es_propio(directorio) or not directorio.is_dir():
+        raise PermissionError(f"{directorio} no es un directorio del usuario actual")
+    if hasattr(os, 'getuid') and stat.S_IMODE(os.lstat(directorio).st_mode) & 0o077:
+        raise PermissionError(f"{directorio} es accesible por otros usuarios (se requiere 0700)")
+    return directorio
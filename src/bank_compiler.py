@@ -0,0 +1,491 @@
+"""
+Compilador del Banco de Preguntas
+Convierte el banco JSON en un artefacto binario que QuestionManager abre sin
+volver a parsear ni reindexar el JSON
+
+Uso:
+    python src/bank_compiler.py data/preguntas/Programación_CIII.json
+
+Genera, junto al JSON:
+    Programación_CIII.qbank                  artefacto binario
+    Programación_CIII.qbank.manifest.json    manifiesto (firma del origen)
+
+Si no hay artefacto junto al JSON, QuestionManager compila una imagen en un
+directorio privado del usuario (0700; variable de entorno
+EXAMENES_DIR_BANCOS, por defecto ~/.cache/examenes/bancos) y la abre con
+mmap, de modo que los workers del mismo usuario comparten las mismas
+páginas en memoria.
+"""
+import argparse
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+from app_dirs import directorio_privado, es_propio
+
+FORMATO_VERSION = 1
+MAGIC = b'QBNK'
+EXTENSION = '.qbank'
+EXTENSION_MANIFIESTO = '.qbank.manifest.json'
+
+# Cabecera: magic, versión, número de preguntas y (offset, longitud) de las
+# secciones meta, dificultad, categoría, offsets y cuerpos
+SECCIONES = ('meta', 'dificultad', 'categoria', 'offsets', 'cuerpos')
+_CABECERA = struct.Struct('<4sHI' + 'QQ' * len(SECCIONES))
+
+# Tipos de array de las columnas (deben coincidir al compilar y al cargar)
+TIPO_DIFICULTAD = 'h'
+TIPO_CATEGORIA = 'H'
+TIPO_OFFSET = 'Q'
+
+
+def ruta_compilado(ruta_json: Union[str, Path]) -> Path:
+    """Ruta del artefacto binario correspondiente a un banco JSON"""
+    return Path(ruta_json).with_suffix(EXTENSION)
+
+
+def ruta_manifiesto(artefacto: Union[str, Path]) -> Path:
+    """Ruta del manifiesto correspondiente a un artefacto binario"""
+    return Path(artefacto).with_suffix(EXTENSION_MANIFIESTO)
+
+
+def directorio_imagenes() -> Path:
+    """Directorio privado del usuario donde se compilan las imágenes de los bancos"""
+    return directorio_privado('bancos', 'EXAMENES_DIR_BANCOS')
+
+
+def _resumen(texto: str) -> str:
+    """Resumen hexadecimal corto de un texto"""
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:12]
+
+
+def ruta_imagen(ruta_json: Union[str, Path], origen_sha256: str, directorio: Path) -> Path:
+    """
+    Ruta de la imagen de un banco JSON
+
+    El nombre incluye un resumen de la ruta del banco y el hash de su
+    contenido, así todos los procesos que ven el mismo banco llegan a la
+    misma imagen y un banco editado obtiene una imagen nueva.
+
+    Args:
+        ruta_json: Ruta al banco JSON
+        origen_sha256: SHA-256 del contenido del banco
+        directorio: Directorio de imágenes
+
+    Returns:
+        Ruta de la imagen .qbank
+    """
+    ruta_json = Path(ruta_json).resolve()
+    return directorio / f"{ruta_json.stem}-{_resumen(str(ruta_json))}-{origen_sha256[:12]}{EXTENSION}"
+
+
+def _hash_archivo(ruta: Path) -> str:
+    """SHA-256 del contenido de un archivo"""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _entorno() -> Dict[str, Any]:
+    """Datos del intérprete de los que depende el formato binario"""
+    return {
+        'python': list(sys.version_info[:2]),
+        'marshal': marshal.version,
+        'byteorder': sys.byteorder
+    }
+
+
+def _publicar(destino: Path, escribir) -> None:
+    """
+    Escribe un archivo de forma atómica (temporal propio y os.replace)
+
+    Args:
+        destino: Ruta final
+        escribir: Función que recibe el archivo temporal abierto en modo binario
+    """
+    temporal = destino.with_name(f"{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temporal, 'wb') as f:
+            escribir(f)
+        os.replace(temporal, destino)
+    finally:
+        if temporal.exists():
+            temporal.unlink()
+
+
+def compilar_banco(ruta_json: Union[str, Path], salida: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Compila un banco de preguntas JSON a formato binario
+
+    Los índices se construyen con el propio QuestionManager, así que el
+    artefacto contiene exactamente lo que produciría la carga desde JSON.
+    El artefacto y su manifiesto se publican de forma atómica: un proceso que
+    los lea en paralelo ve la versión anterior o la nueva, nunca una a medias.
+
+    Args:
+        ruta_json: Ruta al banco JSON
+        salida: Ruta del artefacto (por defecto junto al JSON)
+
+    Returns:
+        Ruta del artefacto generado
+
+    Raises:
+        FileNotFoundError: Si el banco no existe
+        ValueError: Si el formato del banco es inválido o una dificultad no
+            es un entero de 16 bits
+    """
+    from question_manager import QuestionManager
+
+    ruta_json = Path(ruta_json)
+    salida = Path(salida) if salida else ruta_compilado(ruta_json)
+    info = ruta_json.stat()
+    origen_sha256 = _hash_archivo(ruta_json)
+    gestor = QuestionManager(str(ruta_json), usar_compilado=False)
+
+    # La columna de dificultad es un array de enteros de 16 bits: un banco con
+    # otros valores se sigue cargando desde JSON, que los admite tal cual
+    limite = 1 << (8 * array(TIPO_DIFICULTAD).itemsize - 1)
+    for pregunta, nivel in zip(gestor.preguntas, gestor.nivel_por_slot):
+        if type(nivel) is not int or not -limite <= nivel < limite:
+            raise ValueError(
+                f"Dificultad {nivel!r} de la pregunta {pregunta.get('id')}: "
+                f"se esperaba un entero de 16 bits"
+            )
+
+    nombres_categoria = gestor.obtener_categorias()
+    indice_categoria = {nombre: i for i, nombre in enumerate(nombres_categoria)}
+
+    meta = {
+        'ids': [p['id'] for p in gestor.preguntas],
+        'categorias': nombres_categoria,
+        'slots_por_categoria': gestor.slots_por_categoria,
+        'slots_por_nivel': gestor.slots_por_nivel,
+        'valores_b': gestor.valores_b,
+        'slots_por_b': gestor.slots_por_b,
+        'estadisticas': gestor.obtener_estadisticas_banco()
+    }
+
+    cuerpos = [marshal.dumps(p) for p in gestor.preguntas]
+    offsets = array(TIPO_OFFSET, [0])
+    for cuerpo in cuerpos:
+        offsets.append(offsets[-1] + len(cuerpo))
+
+    secciones = [
+        marshal.dumps(meta),
+        array(TIPO_DIFICULTAD, gestor.nivel_por_slot).tobytes(),
+        array(TIPO_CATEGORIA, [
+            indice_categoria[p.get('categoria', 'Sin categoría')] for p in gestor.preguntas
+        ]).tobytes(),
+        offsets.tobytes(),
+        b''.join(cuerpos)
+    ]
+
+    # Secciones alineadas a 8 bytes tras la cabecera
+    posiciones = []
+    posicion = _CABECERA.size
+    for datos in secciones:
+        posicion += -posicion % 8
+        posiciones.extend([posicion, len(datos)])
+        posicion += len(datos)
+
+    def escribir_artefacto(f):
+        f.write(_CABECERA.pack(MAGIC, FORMATO_VERSION, len(gestor.preguntas), *posiciones))
+        for i, datos in enumerate(secciones):
+            f.seek(posiciones[2 * i])
+            f.write(datos)
+
+    _publicar(salida, escribir_artefacto)
+
+    manifiesto = {
+        'formato_version': FORMATO_VERSION,
+        'origen': ruta_json.name,
+        'origen_tamano': info.st_size,
+        'origen_mtime_ns': info.st_mtime_ns,
+        'origen_sha256': origen_sha256,
+        'artefacto': salida.name,
+        'artefacto_tamano': salida.stat().st_size,
+        'total_preguntas': len(gestor.preguntas),
+        **_entorno()
+    }
+    contenido = json.dumps(manifiesto, ensure_ascii=False, indent=2).encode('utf-8')
+    _publicar(ruta_manifiesto(salida), lambda f: f.write(contenido))
+
+    return salida
+
+
+def manifiesto_vigente(
+    ruta_json: Union[str, Path],
+    artefacto: Optional[Union[str, Path]] = None,
+    origen_sha256: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Lee el manifiesto y verifica que corresponda al banco JSON actual
+
+    El artefacto solo es vigente si el manifiesto registra el hash del
+    contenido actual del banco (el tamaño se compara antes, para descartar
+    sin leerlo un banco que cambió).
+
+    Args:
+        ruta_json: Ruta al banco JSON
+        artefacto: Ruta del artefacto (por defecto junto al JSON)
+        origen_sha256: SHA-256 del banco, si quien llama ya lo calculó
+
+    Returns:
+        Manifiesto si el artefacto es utilizable, None en caso contrario
+    """
+    ruta_json = Path(ruta_json)
+    artefacto = Path(artefacto) if artefacto else ruta_compilado(ruta_json)
+    try:
+        with open(ruta_manifiesto(artefacto), 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+        info = ruta_json.stat()
+        info_artefacto = artefacto.stat()
+    except (OSError, ValueError):
+        return None
+
+    if manifiesto.get('formato_version') != FORMATO_VERSION:
+        return None
+    if any(manifiesto.get(clave) != valor for clave, valor in _entorno().items()):
+        return None
+    if manifiesto.get('artefacto_tamano') != info_artefacto.st_size:
+        return None
+    if manifiesto.get('origen_tamano') != info.st_size:
+        return None
+    if manifiesto.get('origen_sha256') != (origen_sha256 or _hash_archivo(ruta_json)):
+        return None
+
+    return manifiesto
+
+
+def leer_secciones(datos: bytes) -> Dict[str, Any]:
+    """
+    Separa las secciones de un artefacto binario
+
+    Args:
+        datos: Contenido del artefacto (bytes, mmap o memoryview)
+
+    Returns:
+        Diccionario con 'total' y una vista por sección
+
+    Raises:
+        ValueError: Si el artefacto no tiene el formato esperado
+    """
+    if len(datos) < _CABECERA.size:
+        raise ValueError("Artefacto de banco truncado")
+
+    campos = _CABECERA.unpack_from(datos, 0)
+    magic, version, total = campos[:3]
+    if magic != MAGIC or version != FORMATO_VERSION:
+        raise ValueError("Artefacto de banco con formato desconocido")
+
+    vista = memoryview(datos)
+    secciones = {'total': total}
+    for i, nombre in enumerate(SECCIONES):
+        inicio, longitud = campos[3 + 2 * i], campos[4 + 2 * i]
+        if inicio + longitud > len(datos):
+            raise ValueError("Artefacto de banco truncado")
+        secciones[nombre] = vista[inicio:inicio + longitud]
+
+    return secciones
+
+
+class BancoCompilado:
+    """
+    Banco compilado abierto con mmap
+
+    Las columnas de dificultad y categoría y la tabla de offsets son vistas
+    directas sobre el archivo mapeado; en memoria propia del proceso quedan
+    solo los metadatos (IDs, índices y estadísticas). Cada pregunta
+    completa (texto, opciones, explicación) se decodifica bajo demanda desde
+    el archivo mapeado y se guarda en una caché LRU pequeña.
+    """
+
+    def __init__(self, ruta_artefacto: Union[str, Path], capacidad_cache: int = 256):
+        """
+        Abre el artefacto
+
+        Args:
+            ruta_artefacto: Ruta al archivo .qbank
+            capacidad_cache: Máximo de preguntas decodificadas en caché
+
+        Raises:
+            OSError: Si no se puede abrir el archivo
+            ValueError: Si el artefacto no tiene el formato esperado
+        """
+        with open(ruta_artefacto, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        secciones = leer_secciones(self._mmap)
+        self.total = secciones['total']
+        self.meta = marshal.loads(secciones['meta'])
+
+        # Vistas sin copia sobre el mapa: las páginas las comparte el sistema
+        # operativo entre todos los procesos que abren el mismo archivo
+        self.nivel_por_slot = secciones['dificultad'].cast(TIPO_DIFICULTAD)
+        self.categoria_por_slot = secciones['categoria'].cast(TIPO_CATEGORIA)
+        self._offsets = secciones['offsets'].cast(TIPO_OFFSET)
+        self._cuerpos = secciones['cuerpos']
+
+        if len(self.nivel_por_slot) != self.total or len(self._offsets) != self.total + 1:
+            raise ValueError("Artefacto de banco inconsistente")
+
+        self.capacidad_cache = capacidad_cache
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pregunta(self, slot: int) -> Dict[str, Any]:
+        """
+        Obtiene la pregunta completa de un slot
+
+        Args:
+            slot: Posición de la pregunta en el banco
+
+        Returns:
+            Diccionario con la pregunta (compartido, no modificar)
+        """
+        with self._lock:
+            pregunta = self._cache.get(slot)
+            if pregunta is not None:
+                self._cache.move_to_end(slot)
+                return pregunta
+
+        if not 0 <= slot < self.total:
+            raise IndexError(f"Slot fuera de rango: {slot}")
+        pregunta = marshal.loads(self._cuerpos[self._offsets[slot]:self._offsets[slot + 1]])
+
+        with self._lock:
+            self._cache[slot] = pregunta
+            if len(self._cache) > self.capacidad_cache:
+                self._cache.popitem(last=False)
+        return pregunta
+
+
+class VistaPreguntas(Sequence):
+    """
+    Secuencia de solo lectura de preguntas de un banco compilado
+
+    Se comporta como la lista de preguntas (len, índice, iteración) pero
+    decodifica cada pregunta solo cuando se accede a ella.
+    """
+
+    def __init__(self, banco: BancoCompilado, slots: Union[List[int], range]):
+        """
+        Args:
+            banco: Banco compilado del que se leen las preguntas
+            slots: Slots que forman la vista, en orden
+        """
+        self._banco = banco
+        self._slots = slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._banco.pregunta(slot) for slot in self._slots[indice]]
+        return self._banco.pregunta(self._slots[indice])
+
+    def __repr__(self) -> str:
+        return f"VistaPreguntas({len(self)} preguntas)"
+
+
+def obtener_imagen(ruta_json: Union[str, Path]) -> Optional[Path]:
+    """
+    Devuelve la imagen de un banco en el directorio privado, compilándola si aún no existe
+
+    El primer proceso que la necesita la compila y la publica; los demás
+    procesos del usuario la encuentran ya hecha. Si dos procesos compilan a
+    la vez, ambos publican el mismo contenido de forma atómica. Las imágenes
+    antiguas del mismo banco se eliminan (los procesos que aún las tengan
+    mapeadas no se ven afectados). Una imagen o manifiesto que no pertenezca
+    al usuario actual no se abre.
+
+    Args:
+        ruta_json: Ruta al banco JSON
+
+    Returns:
+        Ruta de la imagen o None si no se pudo usar el directorio
+    """
+    try:
+        origen_sha256 = _hash_archivo(Path(ruta_json))
+        imagen = ruta_imagen(ruta_json, origen_sha256, directorio_imagenes())
+        if imagen.exists() or ruta_manifiesto(imagen).exists():
+            if not (es_propio(imagen) and es_propio(ruta_manifiesto(imagen))):
+                return None
+            if manifiesto_vigente(ruta_json, imagen, origen_sha256) is not None:
+                return imagen
+
+        compilar_banco(ruta_json, imagen)
+
+        prefijo = imagen.name.rsplit('-', 1)[0] + '-'
+        for anterior in imagen.parent.glob(f"{prefijo}*"):
+            if not anterior.name.startswith(imagen.stem):
+                try:
+                    anterior.unlink()
+                except OSError:
+                    pass
+        return imagen
+    except (OSError, ValueError):
+        return None
+
+
+def cargar_banco_compilado(
+    ruta_json: Union[str, Path],
+    capacidad_cache: int = 256,
+    usar_imagen: bool = True
+) -> Optional[BancoCompilado]:
+    """
+    Abre el artefacto binario de un banco si existe y está vigente
+
+    Primero busca el artefacto junto al JSON; si no existe y usar_imagen es
+    True, usa (o compila) la imagen del directorio privado del usuario.
+
+    Args:
+        ruta_json: Ruta al banco JSON
+        capacidad_cache: Máximo de preguntas decodificadas en caché
+        usar_imagen: Si se puede compilar una imagen en el directorio privado
+
+    Returns:
+        BancoCompilado o None si no hay artefacto utilizable
+    """
+    if manifiesto_vigente(ruta_json) is not None:
+        artefacto = ruta_compilado(ruta_json)
+    elif usar_imagen:
+        artefacto = obtener_imagen(ruta_json)
+    else:
+        artefacto = None
+
+    if artefacto is None:
+        return None
+
+    try:
+        return BancoCompilado(artefacto, capacidad_cache)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
+
+
+def main():
+    """Punto de entrada de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Compila bancos de preguntas JSON a formato binario")
+    parser.add_argument('bancos', nargs='+', help="Rutas a los bancos JSON")
+    args = parser.parse_args()
+
+    for banco in args.bancos:
+        salida = compilar_banco(banco)
+        print(f"✅ {banco} → {salida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+"""
+Calificación por Cohorte
+Calcula theta, rating Elo, consistencia y nota de muchos estudiantes a la vez
+con operaciones vectorizadas de NumPy (recalificación masiva, importación de CSV)
+"""
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+from scoring_systems import (
+    IRTBayesiano,
+    IRTSimplificado,
+    SistemaElo,
+    SistemaHibrido,
+    crear_sistema_calificacion
+)
+
+
+def construir_matrices(
+    respuestas_por_estudiante: List[List[Dict[str, Any]]]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte las listas de respuestas de cada estudiante en matrices
+    
+    La columna j corresponde a la j-ésima respuesta del estudiante, de modo que
+    exámenes adaptativos de distinta longitud quedan alineados por orden.
+    
+    Args:
+        respuestas_por_estudiante: Una lista de respuestas (con 'dificultad' y
+            'correcta') por estudiante
+    
+    Returns:
+        Tupla (correctas, dificultades) de forma (estudiantes, preguntas),
+        con NaN donde el estudiante no respondió
+    """
+    n_estudiantes = len(respuestas_por_estudiante)
+    n_preguntas = max((len(r) for r in respuestas_por_estudiante), default=0)
+    
+    correctas = np.full((n_estudiantes, n_preguntas), np.nan)
+    dificultades = np.full((n_estudiantes, n_preguntas), np.nan)
+    
+    for i, respuestas in enumerate(respuestas_por_estudiante):
+        for j, respuesta in enumerate(respuestas):
+            correctas[i, j] = 1.0 if respuesta['correcta'] else 0.0
+            dificultades[i, j] = respuesta['dificultad']
+    
+    return correctas, dificultades
+
+
+def estimar_theta_cohorte(
+    correctas: np.ndarray,
+    dificultades: np.ndarray,
+    irt: IRTSimplificado = None
+) -> np.ndarray:
+    """
+    Estima theta por máxima verosimilitud para todos los estudiantes
+    
+    Aplica las mismas iteraciones Newton-Raphson que IRTSimplificado.estimar_theta
+    (mismos límites y criterio de convergencia), pero sobre toda la matriz.
+    
+    Args:
+        correctas: Matriz (estudiantes, preguntas) con 1/0 y NaN si no respondió
+        dificultades: Dificultades (1-5) con la misma forma o una por columna
+        irt: Sistema IRT del que se toman los parámetros
+    
+    Returns:
+        Vector con theta de cada estudiante
+    """
+    irt = irt or IRTSimplificado()
+    correctas, dificultades, respondidas = _normalizar_entradas(correctas, dificultades)
+    
+    b = (dificultades - 3) * 0.8
+    y = np.where(respondidas, correctas, 0.0)
+    
+    theta = np.zeros(correctas.shape[0])
+    # Los estudiantes sin respuestas conservan theta = 0, igual que la versión escalar
+    activos = respondidas.any(axis=1)
+    
+    for _ in range(irt.max_iteraciones):
+        if not activos.any():
+            break
+        
+        p = _logistica(theta[:, None] - b)
+        p = np.clip(p, 0.001, 0.999)
+        
+        primera_derivada = np.where(respondidas, y - p, 0.0).sum(axis=1)
+        segunda_derivada = -np.where(respondidas, p * (1 - p), 0.0).sum(axis=1)
+        
+        # Evitar división por cero
+        activos &= np.abs(segunda_derivada) >= 0.001
+        
+        paso = np.divide(
+            primera_derivada, segunda_derivada,
+            out=np.zeros_like(theta), where=activos
+        )
+        theta_nuevo = np.clip(theta - paso, irt.theta_min, irt.theta_max)
+        
+        theta = np.where(activos, theta_nuevo, theta)
+        
+        # Los que convergieron dejan de actualizarse
+        activos &= np.abs(paso) >= 0.01
+    
+    return theta
+
+
+def error_estandar_cohorte(
+    correctas: np.ndarray,
+    dificultades: np.ndarray,
+    theta: np.ndarray
+) -> np.ndarray:
+    """
+    Error estándar de theta (inverso de la raíz de la información de Fisher),
+    igual que IRTSimplificado.error_estandar
+    
+    Args:
+        correctas: Matriz (estudiantes, preguntas) con 1/0 y NaN si no respondió
+        dificultades: Dificultades con la misma forma o una por columna
+        theta: Habilidad estimada de cada estudiante
+    
+    Returns:
+        Vector con el error estándar (infinito si no hay respuestas)
+    """
+    correctas, dificultades, respondidas = _normalizar_entradas(correctas, dificultades)
+    
+    p = _logistica(np.asarray(theta, dtype=float)[:, None] - (dificultades - 3) * 0.8)
+    p = np.clip(p, 0.001, 0.999)
+    informacion = np.where(respondidas, p * (1 - p), 0.0).sum(axis=1)
+    
+    with np.errstate(divide='ignore'):
+        return 1.0 / np.sqrt(informacion)
+
+
+def estimar_theta_bayesiano_cohorte(
+    correctas: np.ndarray,
+    dificultades: np.ndarray,
+    sistema: IRTBayesiano
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calcula la posterior de theta sobre la malla de cuadratura para todos los
+    estudiantes, con la misma previa y estimador que IRTBayesiano
+    
+    Args:
+        correctas: Matriz (estudiantes, preguntas) con 1/0 y NaN si no respondió
+        dificultades: Dificultades con la misma forma o una por columna
+        sistema: Sistema bayesiano del que se toman malla, previa y estimador
+    
+    Returns:
+        Tupla (theta, error estándar posterior) de cada estudiante
+    """
+    correctas, dificultades, respondidas = _normalizar_entradas(correctas, dificultades)
+    
+    nodos = np.asarray(sistema.nodos)
+    p = _logistica(nodos[None, None, :] - (dificultades[:, :, None] - 3) * 0.8)
+    y = np.where(respondidas, correctas, 0.0)[:, :, None]
+    
+    # Log-posterior: log previa + suma de log-verosimilitudes de cada respuesta
+    with np.errstate(divide='ignore'):
+        log_verosimilitud = y * np.log(p) + (1 - y) * np.log1p(-p)
+    log_posterior = np.log(sistema.previa)[None, :] + np.where(
+        respondidas[:, :, None], log_verosimilitud, 0.0
+    ).sum(axis=1)
+    
+    posterior = np.exp(log_posterior - log_posterior.max(axis=1, keepdims=True))
+    posterior /= posterior.sum(axis=1, keepdims=True)
+    
+    media = posterior @ nodos
+    error = np.sqrt(np.maximum(posterior @ nodos ** 2 - media ** 2, 0.0))
+    
+    if sistema.estimador == 'eap':
+        return media, error
+    
+    # MAP: máximo de la malla refinado con una parábola, como en la versión escalar
+    filas = np.arange(len(media))
+    i = log_posterior.argmax(axis=1)
+    theta = nodos[i]
+    interior = (i > 0) & (i < len(nodos) - 1)
+    izq = log_posterior[filas, np.clip(i - 1, 0, None)]
+    centro = log_posterior[filas, i]
+    der = log_posterior[filas, np.clip(i + 1, None, len(nodos) - 1)]
+    curvatura = izq - 2 * centro + der
+    refinar = interior & (curvatura < 0)
+    paso = nodos[1] - nodos[0]
+    theta = theta + np.divide(
+        0.5 * paso * (izq - der), curvatura,
+        out=np.zeros_like(theta), where=refinar
+    )
+    
+    return theta, error
+
+
+def calcular_consistencia_cohorte(
+    correctas: np.ndarray,
+    dificultades: np.ndarray,
+    theta: np.ndarray
+) -> np.ndarray:
+    """
+    Calcula la consistencia de cada estudiante con su theta estimado
+    
+    Args:
+        correctas: Matriz (estudiantes, preguntas) con 1/0 y NaN si no respondió
+        dificultades: Dificultades con la misma forma o una por columna
+        theta: Habilidad estimada de cada estudiante
+    
+    Returns:
+        Vector con valores entre 0 y 1
+    """
+    correctas, dificultades, respondidas = _normalizar_entradas(correctas, dificultades)
+    
+    p = _logistica(np.asarray(theta, dtype=float)[:, None] - (dificultades - 3) * 0.8)
+    diferencias = np.where(respondidas, np.abs(p - np.where(respondidas, correctas, 0.0)), 0.0)
+    
+    total = respondidas.sum(axis=1)
+    consistencia = 1.0 - np.divide(
+        diferencias.sum(axis=1), total,
+        out=np.ones(len(total)), where=total > 0
+    )
+    
+    # Sin respuestas la consistencia es 0, como en _calcular_consistencia
+    return np.where(total > 0, np.clip(consistencia, 0.0, 1.0), 0.0)
+
+
+def calcular_rating_cohorte(
+    correctas: np.ndarray,
+    dificultades: np.ndarray,
+    elo: SistemaElo = None
+) -> np.ndarray:
+    """
+    Calcula el rating Elo final de cada estudiante
+    
+    Elo depende del orden de las respuestas, así que se recorre columna por
+    columna, actualizando a todos los estudiantes en cada paso.
+    
+    Args:
+        correctas: Matriz (estudiantes, preguntas) con 1/0 y NaN si no respondió
+        dificultades: Dificultades con la misma forma o una por columna
+        elo: Sistema Elo del que se toman los parámetros
+    
+    Returns:
+        Vector con el rating de cada estudiante
+    """
+    elo = elo or SistemaElo()
+    correctas, dificultades, respondidas = _normalizar_entradas(correctas, dificultades)
+    
+    rating = np.full(correctas.shape[0], float(elo.rating_inicial))
+    rating_preguntas = 1200 + (dificultades - 1) * 150
+    
+    for j in range(correctas.shape[1]):
+        respondida = respondidas[:, j]
+        prob_esperada = 1.0 / (1.0 + 10 ** ((rating_preguntas[:, j] - rating) / 400))
+        resultado = np.where(respondida, correctas[:, j], 0.0)
+        rating = np.where(respondida, rating + elo.k_factor * (resultado - prob_esperada), rating)
+    
+    return rating
+
+
+def theta_a_nota_cohorte(theta: np.ndarray) -> np.ndarray:
+    """Versión vectorizada de IRTSimplificado.theta_a_nota"""
+    theta_limitado = np.clip(theta, -2.0, 2.5)
+    nota = (theta_limitado + 2.0) / 4.5 * 5.0
+    return np.round(np.clip(nota, 0.0, 5.0), 2)
+
+
+def rating_a_nota_cohorte(rating: np.ndarray) -> np.ndarray:
+    """Versión vectorizada de SistemaElo.rating_a_nota"""
+    return np.select(
+        [rating < 1200, rating > 1800],
+        [np.maximum(0.0, (rating - 900) / 300), np.minimum(5.0, 5.0 + (rating - 1800) / 200)],
+        default=1.0 + (rating - 1200) / 600 * 4.0
+    )
+
+
+def nivel_habilidad_cohorte(theta: np.ndarray) -> np.ndarray:
+    """Clasifica theta con los mismos cortes que IRTSimplificado.obtener_estadisticas"""
+    niveles = np.array(['Básico', 'Fundamental', 'Intermedio', 'Avanzado', 'Experto'])
+    return niveles[np.digitize(theta, [-1.5, -0.5, 0.5, 1.5])]
+
+
+def calificar_cohorte(
+    config: Dict[str, Any],
+    correctas: np.ndarray,
+    dificultades: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Califica una cohorte completa con el sistema configurado en el examen
+    
+    Args:
+        config: Configuración del examen (usa 'sistema_calificacion')
+        correctas: Matriz (estudiantes, preguntas) con 1/0 y NaN si no respondió
+        dificultades: Dificultades con la misma forma o una por columna
+    
+    Returns:
+        Diccionario de vectores (uno por estudiante): theta, error_estandar,
+        consistencia, nivel_habilidad, rating, cambio_rating,
+        preguntas_respondidas, correctas y nota
+    """
+    sistema = crear_sistema_calificacion(config)
+    
+    if isinstance(sistema, IRTBayesiano):
+        irt, elo = sistema, SistemaElo()
+    elif isinstance(sistema, SistemaHibrido):
+        irt, elo = sistema.irt, sistema.elo
+    elif isinstance(sistema, IRTSimplificado):
+        irt, elo = sistema, SistemaElo()
+    elif isinstance(sistema, SistemaElo):
+        irt, elo = IRTSimplificado(), sistema
+    else:
+        raise ValueError(f"Sistema sin versión por cohorte: {type(sistema).__name__}")
+    
+    correctas, dificultades, respondidas = _normalizar_entradas(correctas, dificultades)
+    
+    if isinstance(irt, IRTBayesiano):
+        theta, error_estandar = estimar_theta_bayesiano_cohorte(correctas, dificultades, irt)
+    else:
+        theta = estimar_theta_cohorte(correctas, dificultades, irt)
+        error_estandar = error_estandar_cohorte(correctas, dificultades, theta)
+    rating = calcular_rating_cohorte(correctas, dificultades, elo)
+    preguntas_respondidas = respondidas.sum(axis=1)
+    
+    if isinstance(sistema, SistemaHibrido):
+        nota = (theta_a_nota_cohorte(theta) * sistema.peso_irt +
+                rating_a_nota_cohorte(rating) * sistema.peso_elo)
+    elif isinstance(sistema, IRTSimplificado):
+        nota = theta_a_nota_cohorte(theta)
+    else:
+        nota = rating_a_nota_cohorte(rating)
+    
+    # Sin respuestas la nota es 0, como en calcular_nota
+    nota = np.where(preguntas_respondidas > 0, nota, 0.0)
+    
+    return {
+        'theta': theta,
+        'error_estandar': error_estandar,
+        'consistencia': calcular_consistencia_cohorte(correctas, dificultades, theta),
+        'nivel_habilidad': np.where(
+            preguntas_respondidas > 0, nivel_habilidad_cohorte(theta), 'Sin datos'
+        ),
+        'rating': rating,
+        'cambio_rating': rating - elo.rating_inicial,
+        'preguntas_respondidas': preguntas_respondidas,
+        'correctas': np.where(respondidas, correctas, 0.0).sum(axis=1).astype(int),
+        'nota': nota
+    }
+
+
+def _normalizar_entradas(
+    correctas: np.ndarray,
+    dificultades: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convierte las entradas a float, expande dificultades por columna y
+    calcula la máscara de respuestas presentes
+    """
+    correctas = np.atleast_2d(np.asarray(correctas, dtype=float))
+    dificultades = np.broadcast_to(np.asarray(dificultades, dtype=float), correctas.shape)
+    respondidas = ~np.isnan(correctas) & ~np.isnan(dificultades)
+    
+    # Rellenar huecos para que no propaguen NaN en las operaciones
+    dificultades = np.where(respondidas, dificultades, 3.0)
+    
+    return correctas, dificultades, respondidas
+
+
+def _logistica(x: np.ndarray) -> np.ndarray:
+    """Función logística sin desbordamientos para argumentos grandes"""
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
@@ -21,7 +21,7 @@ class ConfigLoader:
         ],
         'sistema_calificacion': ['tipo', 'parametros'],
         'instrucciones': ['titulo', 'descripcion', 'temas'],
-        'persistencia': ['metodo', 'spreadsheet_id'],
+        'persistencia': ['metodo'],
         'archivo_preguntas': None  # Es un string directo
     }
     
@@ -107,15 +107,66 @@ class ConfigLoader:
             raise ValueError("ventana_estabilizacion debe ser al menos 2")
         
         # Validar sistema de calificación
-        tipos_validos = ['irt_simplificado', 'elo', 'hibrido']
+        tipos_validos = ['irt_simplificado', 'irt_bayesiano', 'elo', 'hibrido']
         if config['sistema_calificacion']['tipo'] not in tipos_validos:
             raise ValueError(
                 f"tipo de calificación debe ser uno de: {', '.join(tipos_validos)}"
             )
         
+        # Validar estrategia de selección de preguntas (opcional)
+        selecciones_validas = ['nivel', 'maxima_informacion']
+        if params.get('seleccion_preguntas', 'nivel') not in selecciones_validas:
+            raise ValueError(
+                f"seleccion_preguntas debe ser uno de: {', '.join(selecciones_validas)}"
+            )
+        
+        # Validar criterios de terminación (opcionales)
+        criterios_validos = ['estabilizacion', 'error_estandar', 'sprt']
+        criterios = params.get('criterios_terminacion', ['estabilizacion'])
+        for criterio in criterios:
+            if criterio not in criterios_validos:
+                raise ValueError(
+                    f"criterios_terminacion debe contener solo: {', '.join(criterios_validos)}"
+                )
+        
+        if 'error_estandar' in criterios:
+            if config['sistema_calificacion']['tipo'] == 'elo':
+                raise ValueError("el criterio 'error_estandar' requiere un sistema basado en IRT")
+            
+            if params.get('error_estandar_objetivo', 0.5) <= 0:
+                raise ValueError("error_estandar_objetivo debe ser positivo")
+        
+        if 'sprt' in criterios:
+            sprt = params.get('sprt', {})
+            
+            if not (0 < sprt.get('nota_corte', 3.0) < 5):
+                raise ValueError("sprt.nota_corte debe estar entre 0 y 5")
+            
+            if sprt.get('delta', 0.5) <= 0:
+                raise ValueError("sprt.delta debe ser positivo")
+            
+            for error in ('alfa', 'beta'):
+                if not (0 < sprt.get(error, 0.05) < 0.5):
+                    raise ValueError(f"sprt.{error} debe estar entre 0 y 0.5")
+        
         # Validar método de persistencia
-        if config['persistencia']['metodo'] != 'google_sheets':
-            raise ValueError("método de persistencia debe ser 'google_sheets'")
+        metodo = config['persistencia']['metodo']
+        if metodo not in ('google_sheets', 'sqlite'):
+            raise ValueError("método de persistencia debe ser 'google_sheets' o 'sqlite'")
+        
+        if metodo == 'google_sheets' and 'spreadsheet_id' not in config['persistencia']:
+            raise ValueError("Falta la subclave requerida: persistencia.spreadsheet_id")
+        
+        for campo in ('intervalo_progreso', 'vigencia_espejo', 'cuota_por_minuto'):
+            valor = config['persistencia'].get(campo, 1)
+            if not isinstance(valor, (int, float)) or valor <= 0:
+                raise ValueError(f"{campo} debe ser un número mayor que 0")
+        
+        periodo = config['persistencia'].get('periodo')
+        if periodo is not None and (
+            not isinstance(periodo, str) or not periodo or any(c in periodo for c in "[]*?/\\:'")
+        ):
+            raise ValueError("persistencia.periodo debe ser un texto sin los caracteres [ ] * ? / \\ : '")
     
     def crear_template_config(self, output_file: str = "config/examen_template.json") -> None:
         """
@@ -158,7 +209,8 @@ class ConfigLoader:
             },
             "persistencia": {
                 "metodo": "google_sheets",
-                "spreadsheet_id": "TU_SPREADSHEET_ID_AQUI"
+                "spreadsheet_id": "TU_SPREADSHEET_ID_AQUI",
+                "periodo": "2025-1"
             },
             "archivo_preguntas": "data/preguntas_[ASIGNATURA].json"
         }
@@ -2,50 +2,579 @@
 Persistencia de Datos
 Maneja el guardado de resultados en Google Sheets
 """
+import itertools
+import logging
+import math
+import re
+import threading
+import zlib
+
 import streamlit as st
 from datetime import datetime
-from typing import Dict, Any, List
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from googleapiclient.errors import HttpError
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+from persistence_base import PersistenciaBase
+from progress_queue import ColaProgreso
+from quota_scheduler import (
+    PRIORIDAD_FINAL,
+    PRIORIDAD_INICIO,
+    PlanificadorCuota,
+    con_prioridad,
+    prioridad_actual
+)
+from results_mirror import EspejoResultados
+from sheets_client import obtener_servicio_sheets
+
+logger = logging.getLogger(__name__)
+
+# Hoja de resultados sin particionar (y prefijo de las hojas por examen)
+HOJA_RESULTADOS = 'Resultados'
+
+# Encabezados de la hoja de resultados (columnas A-P)
+ENCABEZADOS = [
+    'Fecha_Hora',
+    'Codigo_Estudiante',
+    'Preguntas_Respondidas',
+    'Correctas',
+    'Incorrectas',
+    'Porcentaje_Correctas',
+    'Nivel_Final',
+    'Nota_Final',
+    'Preguntas_IDs',
+    'Theta_IRT',
+    'Consistencia_IRT',
+    'Nivel_Habilidad_IRT',
+    'Rating_Elo',
+    'Cambio_Rating_Elo',
+    'Razon_Terminacion',
+    'Sistema_Calificacion'
+]
+
+# Encabezados de la hoja Resumen (agregados por examen y sistema, columnas A-H)
+ENCABEZADOS_RESUMEN = [
+    'Examen_Id',
+    'Sistema_Calificacion',
+    'Total',
+    'Suma_Nota',
+    'Suma_Cuadrados_Nota',
+    'Nota_Minima',
+    'Nota_Maxima',
+    'Suma_Preguntas'
+]
+
+# La hoja Resumen tiene además el origen de cada fila (columna I): cada espejo
+# local publica solo sus propias filas y las estadísticas suman las de todos
+ENCABEZADOS_HOJA_RESUMEN = ENCABEZADOS_RESUMEN + ['Origen']
+
+# Columna de Codigo_Estudiante: se lee siempre para saber dónde termina la hoja
+_COLUMNA_CODIGO = ENCABEZADOS.index('Codigo_Estudiante')
+
+# Base de datos por defecto del backend sqlite
+RUTA_SQLITE = 'data/resultados.sqlite3'
+
+
+def examen_id_de(config: Dict[str, Any]) -> str:
+    """
+    Identificador del examen (nombre del archivo de configuración)
+    
+    Args:
+        config: Configuración del examen
+        
+    Returns:
+        ID del examen
+    """
+    return config.get('_examen_id') or config.get('metadata', {}).get('codigo_asignatura', 'examen')
+
+
+def particion_de(config: Dict[str, Any]) -> str:
+    """
+    Partición de resultados del examen: su ID y, si se configura, el periodo
+    
+    Args:
+        config: Configuración del examen
+        
+    Returns:
+        Por ejemplo 'programacion_2025-1' (o 'programacion' sin periodo)
+    """
+    periodo = config['persistencia'].get('periodo')
+    examen_id = examen_id_de(config)
+    return f"{examen_id}_{periodo}" if periodo else examen_id
+
+
+def resultados_particionados(config: Dict[str, Any]) -> bool:
+    """
+    Si el examen guarda sus resultados en una hoja propia
+    
+    Por defecto solo cuando se configura persistencia.periodo: los exámenes
+    sin periodo siguen usando la hoja única 'Resultados' (y su historial).
+    
+    Args:
+        config: Configuración del examen
+        
+    Returns:
+        persistencia.particionar, o si hay persistencia.periodo
+    """
+    persistencia = config['persistencia']
+    return persistencia.get('particionar', bool(persistencia.get('periodo')))
+
+
+def hoja_resultados(config: Dict[str, Any], particion: str = None) -> str:
+    """
+    Hoja de Google Sheets donde se guardan los resultados del examen
+    
+    Args:
+        config: Configuración del examen
+        particion: Partición a usar en lugar de la de config (p. ej. para archivar)
+        
+    Returns:
+        'Resultados_<partición>', o 'Resultados' si no se particiona
+    """
+    if not resultados_particionados(config):
+        return HOJA_RESULTADOS
+    return f"{HOJA_RESULTADOS}_{particion or particion_de(config)}"
+
+
+def rango_hoja(hoja: str, celdas: str) -> str:
+    """
+    Rango A1 con el nombre de la hoja entre comillas (admite espacios y guiones)
+    
+    Args:
+        hoja: Nombre de la hoja
+        celdas: Celdas, p. ej. 'A1:P1'
+        
+    Returns:
+        Por ejemplo "'Resultados_control_2025-1'!A1:P1"
+    """
+    return "'" + hoja.replace("'", "''") + "'!" + celdas
+
+
+def registro_resumen(fila: List[Any]) -> Tuple[str, float, int]:
+    """
+    Aporte de una fila de resultados (columnas A-P) al resumen
+    
+    Args:
+        fila: Fila finalizada
+        
+    Returns:
+        (sistema_calificacion, nota_final, preguntas_respondidas)
+    """
+    return (fila[15] or '', float(fila[7] or 0), int(fila[2] or 0))
+
+
+def fila_resumen_vacia(examen_id: str, sistema: str) -> Tuple:
+    """Fila del resumen (en el orden de ENCABEZADOS_RESUMEN) sin resultados"""
+    return (examen_id, sistema, 0, 0.0, 0.0, 0.0, 0.0, 0)
+
+
+def clave_resultado(fila: List[Any]) -> str:
+    """Identifica un resultado (columnas A-P) para contarlo una sola vez en el resumen"""
+    return f"{fila[1]}|{fila[0]}"
+
+
+def combinar_resumen(filas: List[Tuple]) -> List[Tuple]:
+    """
+    Combina filas del resumen de varios orígenes en una por sistema de calificación
+    
+    Args:
+        filas: Filas en el orden de ENCABEZADOS_RESUMEN
+        
+    Returns:
+        Una fila por (examen, sistema), en el mismo orden de columnas
+    """
+    combinadas = {}
+    for fila in filas:
+        if not fila[2]:
+            continue
+        clave = (fila[0], fila[1])
+        previa = combinadas.get(clave)
+        if previa is None:
+            combinadas[clave] = tuple(fila)
+        else:
+            combinadas[clave] = (
+                fila[0], fila[1], previa[2] + fila[2], previa[3] + fila[3], previa[4] + fila[4],
+                min(previa[5], fila[5]), max(previa[6], fila[6]), previa[7] + fila[7]
+            )
+    return [combinadas[clave] for clave in sorted(combinadas)]
+
+
+def estadisticas_de_resumen(filas: List[Tuple]) -> Dict[str, Any]:
+    """
+    Estadísticas globales a partir de las filas del resumen de un examen
+    
+    Args:
+        filas: Filas en el orden de ENCABEZADOS_RESUMEN (una por sistema de calificación)
+        
+    Returns:
+        Diccionario con estadísticas (total y por sistema de calificación)
+    """
+    def calcular(total, suma, suma_cuadrados, minima, maxima, suma_preguntas):
+        promedio = suma / total
+        return {
+            'total_examenes': total,
+            'promedio_nota': promedio,
+            'desviacion_nota': math.sqrt(max(0.0, suma_cuadrados / total - promedio ** 2)),
+            'nota_maxima': maxima,
+            'nota_minima': minima,
+            'promedio_preguntas': suma_preguntas / total
+        }
+    
+    filas = [fila for fila in filas if fila[2]]
+    if not filas:
+        return {
+            'total_examenes': 0,
+            'promedio_nota': 0,
+            'promedio_preguntas': 0
+        }
+    
+    columnas = list(zip(*(fila[2:] for fila in filas)))
+    estadisticas = calcular(
+        sum(columnas[0]), sum(columnas[1]), sum(columnas[2]),
+        min(columnas[3]), max(columnas[4]), sum(columnas[5])
+    )
+    estadisticas['por_sistema'] = {fila[1]: calcular(*fila[2:]) for fila in filas}
+    return estadisticas
+
+
+def tramos_columnas(columnas: Optional[List[str]] = None) -> List[Tuple[int, int]]:
+    """
+    Agrupa las columnas pedidas en tramos contiguos de la hoja
+    
+    Incluye siempre Codigo_Estudiante. Por ejemplo, ['Nota_Final',
+    'Theta_IRT'] da [(1, 1), (7, 7), (9, 9)] (columnas B, H y J).
+    
+    Args:
+        columnas: Encabezados a leer (por defecto, todos)
+        
+    Returns:
+        Lista de (índice inicial, índice final) en ENCABEZADOS
+    """
+    if columnas is None:
+        return [(0, len(ENCABEZADOS) - 1)]
+    
+    desconocidas = set(columnas) - set(ENCABEZADOS)
+    if desconocidas:
+        raise ValueError(f"Columnas desconocidas: {', '.join(sorted(desconocidas))}")
+    
+    indices = sorted({ENCABEZADOS.index(c) for c in columnas} | {_COLUMNA_CODIGO})
+    tramos = []
+    for indice in indices:
+        if tramos and tramos[-1][1] == indice - 1:
+            tramos[-1] = (tramos[-1][0], indice)
+        else:
+            tramos.append((indice, indice))
+    return tramos
+
+
+def fila_inicio_examen(config: Dict[str, Any], codigo_estudiante: str) -> List[Any]:
+    """
+    Fila (columnas A-P) que registra el inicio de un examen
+    
+    Args:
+        config: Configuración del examen
+        codigo_estudiante: Código del estudiante
+        
+    Returns:
+        Lista con los datos de la fila
+    """
+    fecha_hora = datetime.now(ZoneInfo("America/Bogota")).strftime("%Y-%m-%d %H:%M:%S")
+    
+    return [
+        fecha_hora,
+        codigo_estudiante,
+        0,  # preguntas_respondidas
+        0,  # correctas
+        0,  # incorrectas
+        0,  # porcentaje
+        config['parametros']['nivel_inicial'],  # nivel_final
+        0.0,  # nota_final
+        '',  # preguntas_ids
+        '',  # theta
+        '',  # consistencia
+        '',  # nivel_habilidad
+        '',  # rating
+        '',  # cambio_rating
+        'EN_CURSO',  # razon_terminacion
+        config['sistema_calificacion']['tipo']  # sistema
+    ]
+
+
+def preparar_fila_resultados(
+    config: Dict[str, Any],
+    codigo_estudiante: str,
+    stats: Dict[str, Any]
+) -> List[Any]:
+    """
+    Fila (columnas A-P) con el resultado final de un examen
+    
+    Args:
+        config: Configuración del examen
+        codigo_estudiante: Código del estudiante
+        stats: Estadísticas del examen
+        
+    Returns:
+        Lista con los datos de la fila
+    """
+    # Fecha y hora actual
+    fecha_hora = datetime.now(ZoneInfo("America/Bogota")).strftime("%Y-%m-%d %H:%M:%S")
+    
+    # IDs de preguntas separados por coma
+    preguntas_ids = ",".join(stats['preguntas_ids'])
+    
+    # Datos básicos
+    datos = [
+        fecha_hora,
+        codigo_estudiante,
+        stats['preguntas_respondidas'],
+        stats['correctas'],
+        stats['incorrectas'],
+        stats['porcentaje_correctas'],
+        stats['nivel_final'],
+        stats['nota_final'],
+        preguntas_ids
+    ]
+    
+    # Agregar estadísticas del sistema de calificación
+    stats_sistema = stats.get('stats_sistema', {})
+    
+    # Theta (IRT)
+    datos.append(stats_sistema.get('theta', ''))
+    
+    # Consistencia (IRT)
+    datos.append(stats_sistema.get('consistencia', ''))
+    
+    # Nivel de habilidad (IRT)
+    datos.append(stats_sistema.get('nivel_habilidad', ''))
+    
+    # Rating (Elo)
+    datos.append(stats_sistema.get('rating', ''))
+    
+    # Cambio de rating (Elo)
+    datos.append(stats_sistema.get('cambio_rating', ''))
+    
+    # Razón de terminación
+    datos.append(stats['razon_terminacion'])
+    
+    # Sistema de calificación usado
+    datos.append(config['sistema_calificacion']['tipo'])
+    
+    return datos
+
+
+def crear_persistencia(config: Dict[str, Any], service=None) -> PersistenciaBase:
+    """
+    Crea el backend de persistencia según persistencia.metodo
+    
+    Args:
+        config: Configuración del examen
+        service: Cliente de Sheets ya creado (solo para google_sheets)
+        
+    Returns:
+        DataPersistence ('google_sheets') o SQLitePersistence ('sqlite')
+    """
+    if config['persistencia']['metodo'] == 'sqlite':
+        from sqlite_persistence import SQLitePersistence
+        return SQLitePersistence(config)
+    
+    return DataPersistence(config, service=service)
+
+
+def obtener_cola_progreso(config: Dict[str, Any]) -> ColaProgreso:
+    """
+    Obtiene la cola de progreso compartida de la partición del examen
+    
+    Debe llamarse desde el hilo de Streamlit: lee aquí los secrets y el hilo
+    de la cola obtiene con ellos el cliente compartido de Sheets.
+    
+    Args:
+        config: Configuración del examen
+        
+    Returns:
+        ColaProgreso de la hoja (o partición SQLite) del examen
+    """
+    persistencia = config['persistencia']
+    
+    if persistencia['metodo'] == 'sqlite':
+        return ColaProgreso.obtener(
+            f"sqlite:{persistencia.get('ruta_sqlite', RUTA_SQLITE)}:{particion_de(config)}",
+            lambda: crear_persistencia(config),
+            persistencia.get('intervalo_progreso', 3.0)
+        )
+    
+    credenciales = dict(st.secrets["gcp_service_account"])
+    return ColaProgreso.obtener(
+        f"{persistencia['spreadsheet_id']}:{hoja_resultados(config)}",
+        lambda: DataPersistence(config, service=obtener_servicio_sheets(credenciales)),
+        persistencia.get('intervalo_progreso', 3.0)
+    )
+
 
-class DataPersistence:
+class DataPersistence(PersistenciaBase):
     """Clase para manejar la persistencia en Google Sheets"""
     
-    def __init__(self, config: Dict[str, Any]):
+    # (spreadsheet, hoja de resultados) ya verificadas en este proceso
+    _hojas_verificadas = set()
+    _lock_hojas = threading.Lock()
+    
+    # Evita que varios hilos del proceso recorran la hoja para sembrar el mismo resumen
+    _lock_siembra = threading.Lock()
+    
+    # (spreadsheet, examen) cuyo resumen está publicando un hilo -> si debe publicar otra vez
+    _publicando: Dict[Tuple[str, str], bool] = {}
+    _lock_publicacion = threading.Lock()
+    
+    def __init__(self, config: Dict[str, Any], service=None, planificador: PlanificadorCuota = None):
         """
         Inicializa el sistema de persistencia
         
         Args:
             config: Configuración del examen
+            service: Cliente de Sheets ya creado, o uno que emule su interfaz como
+                ServicioSheetsFalso (si no, se usa el compartido de st.secrets)
+            planificador: Planificador de cuota (por defecto, el del proceso)
         """
         self.config = config
+        self.examen_id = particion_de(config)
+        self.hoja = hoja_resultados(config)
         self.spreadsheet_id = config['persistencia']['spreadsheet_id']
-        self.service = None
-        self._inicializar_servicio()
+        self.service = service
+        if self.service is None:
+            self._inicializar_servicio()
+        
+        # Espejo local de las filas de la hoja del examen (compartido por los
+        # procesos de la máquina)
+        self.indice = EspejoResultados.para(self.spreadsheet_id, self.hoja)
+        self.vigencia_espejo = config['persistencia'].get('vigencia_espejo', 60)
+        
+        # Todas las llamadas a la API pasan por el planificador de cuota del proceso
+        self.planificador = planificador or PlanificadorCuota.compartido(
+            config['persistencia'].get('cuota_por_minuto', 60)
+        )
+    
+    def _ejecutar(self, solicitud):
+        """
+        Ejecuta una solicitud de la API a través del planificador de cuota
+        
+        La prioridad es la del contexto (ver con_prioridad); las lecturas y
+        escrituras consumen cuotas separadas.
+        
+        Args:
+            solicitud: Solicitud de googleapiclient (o del servicio falso)
+            
+        Returns:
+            Respuesta de la API
+        """
+        return self.planificador.ejecutar(
+            solicitud.execute,
+            prioridad_actual(),
+            escritura=getattr(solicitud, 'method', 'GET') != 'GET'
+        )
+    
+    def _sincronizar_indice(self, inicio: Optional[int] = None):
+        """
+        Lee de la hoja solo las filas agregadas desde la última sincronización
+        
+        La lectura se hace sin tomar el lock del espejo (las consultas de
+        otros hilos no esperan a la API); procesar_filas incorpora el
+        resultado en una sola transacción.
+        
+        Args:
+            inicio: Primera fila a leer (por defecto, la siguiente a las ya leídas)
+        """
+        inicio = inicio or self.indice.filas_leidas + 1
+        result = self._ejecutar(self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=rango_hoja(self.hoja, f'B{inicio}:O')
+        ))
+        self.indice.procesar_filas(inicio, result.get('values', []))
+    
+    def _sincronizar_si_vencido(self):
+        """
+        Pone al día el espejo si su última sincronización superó la vigencia
+        
+        Lee la cola de filas nuevas y la columna O desde la fila EN_CURSO más
+        antigua (solo esas filas pueden cambiar de estado). Las filas que
+        agregan o finalizan los procesos de esta máquina ya están en el espejo;
+        la lectura solo recoge las de otras máquinas o cambios manuales.
+        """
+        if not self.indice.reclamar_sincronizacion(self.vigencia_espejo):
+            return
+        
+        try:
+            self._sincronizar_indice()
+            
+            primera = self.indice.primera_fila_en_curso()
+            if primera is None:
+                return
+            
+            result = self._ejecutar(self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=rango_hoja(self.hoja, f'O{primera}:O{self.indice.filas_leidas}')
+            ))
+            estados = [fila[0] if fila else '' for fila in result.get('values', [])]
+            self.indice.actualizar_estados(primera, estados)
+            
+        except Exception:
+            self.indice.marcar_vencido()
+            raise
+    
+    def _buscar_fila_en_curso(self, codigo_estudiante: str) -> Optional[int]:
+        """
+        Fila EN_CURSO del estudiante según el índice (sincroniza solo si no la conoce)
+        
+        Args:
+            codigo_estudiante: Código del estudiante
+            
+        Returns:
+            Número de fila o None
+        """
+        fila = self.indice.fila_en_curso(codigo_estudiante)
+        if fila is None:
+            self._sincronizar_indice()
+            fila = self.indice.fila_en_curso(codigo_estudiante)
+        return fila
+    
+    def _confirmar_fila(self, fila: int, codigo_estudiante: str) -> Optional[int]:
+        """
+        Comprueba en la hoja que la fila indexada siga siendo la del estudiante
+        
+        Si la columna B ya no tiene su código (filas ordenadas, borradas o
+        insertadas a mano), el espejo dejó de ser válido: se vuelve a indexar
+        la hoja completa y se busca de nuevo la fila EN_CURSO.
+        
+        Args:
+            fila: Número de fila según el índice
+            codigo_estudiante: Código del estudiante
+            
+        Returns:
+            Número de fila confirmado o None (hay que agregar una fila nueva)
+        """
+        result = self._ejecutar(self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=rango_hoja(self.hoja, f'B{fila}')
+        ))
+        valores = result.get('values', [])
+        if valores and valores[0] and valores[0][0] == codigo_estudiante:
+            return fila
+        
+        logger.warning("La fila %s de %s no es de %s: se reindexa la hoja", fila, self.hoja, codigo_estudiante)
+        self.indice.reiniciar()
+        self._sincronizar_indice(inicio=1)
+        return self.indice.fila_en_curso(codigo_estudiante)
     
     def _inicializar_servicio(self):
         """Inicializa el servicio de Google Sheets"""
         try:
-            # Obtener credenciales desde secrets
-            credentials = service_account.Credentials.from_service_account_info(
-                st.secrets["gcp_service_account"],
-                scopes=[
-                    "https://www.googleapis.com/auth/spreadsheets",
-                    "https://www.googleapis.com/auth/drive"
-                ]
-            )
-            
-            # Crear servicio
-            self.service = build('sheets', 'v4', credentials=credentials)
+            # Cliente compartido del proceso para las credenciales de secrets
+            self.service = obtener_servicio_sheets(st.secrets["gcp_service_account"])
             
         except Exception as e:
             st.error(f"⚠️ Error al inicializar Google Sheets: {str(e)}")
             raise
     
+    @con_prioridad(PRIORIDAD_INICIO)
     def guardar_inicio_examen(self, codigo_estudiante: str) -> bool:
         """
         Guarda el registro de inicio de examen
@@ -57,33 +586,17 @@ class DataPersistence:
             True si se guardó exitosamente
         """
         try:
-            fecha_hora = datetime.now(ZoneInfo("America/Bogota")).strftime("%Y-%m-%d %H:%M:%S")
-            
-            datos = [
-                fecha_hora,
-                codigo_estudiante,
-                0,  # preguntas_respondidas
-                0,  # correctas
-                0,  # incorrectas
-                0,  # porcentaje
-                self.config['parametros']['nivel_inicial'],  # nivel_final
-                0.0,  # nota_final
-                '',  # preguntas_ids
-                '',  # theta
-                '',  # consistencia
-                '',  # nivel_habilidad
-                '',  # rating
-                '',  # cambio_rating
-                'EN_CURSO',  # razon_terminacion
-                self.config['sistema_calificacion']['tipo']  # sistema
-            ]
+            datos = fila_inicio_examen(self.config, codigo_estudiante)
             
             self._verificar_o_crear_hoja()
-            self._agregar_fila(datos)
+            fila = self._agregar_fila(datos)
+            if fila:
+                self.indice.registrar(fila, codigo_estudiante, 'EN_CURSO')
             
             return True
             
         except Exception as e:
+            self._invalidar_hoja()
             st.warning(f"⚠️ No se pudo guardar el inicio del examen: {str(e)}")
             return False
     
@@ -107,59 +620,92 @@ class DataPersistence:
             True si se actualizó exitosamente
         """
         try:
-            # Buscar la última fila del estudiante con estado EN_CURSO
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range='Resultados!A:P'
-            ).execute()
-            
-            values = result.get('values', [])
-            
-            # Encontrar la última fila EN_CURSO de este estudiante
-            fila_a_actualizar = None
-            for i in range(len(values) - 1, 0, -1):  # Buscar desde el final
-                if len(values[i]) > 1 and values[i][1] == codigo_estudiante:
-                    if len(values[i]) > 14 and values[i][14] == 'EN_CURSO':
-                        fila_a_actualizar = i + 1  # +1 porque sheets es 1-indexed
-                        break
-            
-            if fila_a_actualizar:
-                # Actualizar solo las columnas de progreso
-                porcentaje = (correctas / preguntas_respondidas * 100) if preguntas_respondidas > 0 else 0
-                
-                updates = [
-                    {
-                        'range': f'Resultados!C{fila_a_actualizar}',
-                        'values': [[preguntas_respondidas]]
-                    },
-                    {
-                        'range': f'Resultados!D{fila_a_actualizar}',
-                        'values': [[correctas]]
-                    },
-                    {
-                        'range': f'Resultados!E{fila_a_actualizar}',
-                        'values': [[incorrectas]]
-                    },
-                    {
-                        'range': f'Resultados!F{fila_a_actualizar}',
-                        'values': [[round(porcentaje, 1)]]
-                    }
-                ]
-                
-                body = {'data': updates, 'valueInputOption': 'RAW'}
-                self.service.spreadsheets().values().batchUpdate(
-                    spreadsheetId=self.spreadsheet_id,
-                    body=body
-                ).execute()
-                
-                return True
-            
-            return False
+            actualizados = self.actualizar_progreso_lote({
+                codigo_estudiante: (preguntas_respondidas, correctas, incorrectas)
+            })
+            return codigo_estudiante in actualizados
             
         except Exception as e:
             # No mostrar error al usuario, solo registrar
+            logger.warning("No se pudo actualizar el progreso de %s: %s", codigo_estudiante, e)
             return False
     
+    def actualizar_progreso_lote(self, progresos: Dict[str, Tuple[int, int, int]]) -> List[str]:
+        """
+        Actualiza el progreso de varios estudiantes con un batchGet y un batchUpdate
+        
+        Antes de escribir se lee la columna B de todas las filas del lote; las
+        que ya no tienen el código del estudiante se omiten y el espejo se
+        vuelve a indexar en la próxima consulta. No usa Streamlit (se llama
+        desde el hilo de ColaProgreso); los errores de la API se propagan al
+        llamador.
+        
+        Args:
+            progresos: Código del estudiante -> (respondidas, correctas, incorrectas)
+            
+        Returns:
+            Códigos cuya fila EN_CURSO se encontró, confirmó y actualizó
+        """
+        if not progresos:
+            return []
+        
+        # Filas desde el índice; solo se lee la cola de la hoja si falta alguna
+        filas = {}
+        for codigo in progresos:
+            fila = self.indice.fila_en_curso(codigo)
+            if fila is not None:
+                filas[codigo] = fila
+        
+        if len(filas) < len(progresos):
+            self._sincronizar_indice()
+            for codigo in progresos:
+                fila = self.indice.fila_en_curso(codigo)
+                if fila is not None:
+                    filas[codigo] = fila
+        
+        if not filas:
+            return []
+        
+        # Una lectura de la columna B confirma que cada fila sigue siendo del estudiante
+        codigos = list(filas)
+        result = self._ejecutar(self.service.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id,
+            ranges=[rango_hoja(self.hoja, f'B{filas[codigo]}') for codigo in codigos]
+        ))
+        rangos = result.get('valueRanges', [])
+        for i, codigo in enumerate(codigos):
+            valores = rangos[i].get('values', []) if i < len(rangos) else []
+            if not (valores and valores[0] and valores[0][0] == codigo):
+                logger.warning("La fila %s de %s no es de %s: se omite su progreso", filas[codigo], self.hoja, codigo)
+                del filas[codigo]
+        
+        if len(filas) < len(codigos):
+            # Filas ordenadas, borradas o insertadas a mano: se reindexa en la próxima consulta
+            self.indice.reiniciar()
+            self.indice.marcar_vencido()
+        
+        if not filas:
+            return []
+        
+        # Una sola actualización C:F por estudiante
+        updates = []
+        for codigo, fila_a_actualizar in filas.items():
+            preguntas_respondidas, correctas, incorrectas = progresos[codigo]
+            porcentaje = (correctas / preguntas_respondidas * 100) if preguntas_respondidas > 0 else 0
+            updates.append({
+                'range': rango_hoja(self.hoja, f'C{fila_a_actualizar}:F{fila_a_actualizar}'),
+                'values': [[preguntas_respondidas, correctas, incorrectas, round(porcentaje, 1)]]
+            })
+        
+        body = {'data': updates, 'valueInputOption': 'RAW'}
+        self._ejecutar(self.service.spreadsheets().values().batchUpdate(
+            spreadsheetId=self.spreadsheet_id,
+            body=body
+        ))
+        
+        return list(filas)
+    
+    @con_prioridad(PRIORIDAD_INICIO)
     def verificar_examen_en_curso(self, codigo_estudiante: str) -> bool:
         """
         Verifica si el estudiante tiene un examen en curso
@@ -171,24 +717,13 @@ class DataPersistence:
             True si tiene un examen EN_CURSO
         """
         try:
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range='Resultados!A:P'
-            ).execute()
-            
-            values = result.get('values', [])
-            
-            # Buscar si hay alguna fila EN_CURSO para este estudiante
-            for row in reversed(values[1:]):  # Skip header, buscar desde el final
-                if len(row) > 14 and len(row) > 1:
-                    if row[1] == codigo_estudiante and row[14] == 'EN_CURSO':
-                        return True
-            
-            return False
+            self._sincronizar_si_vencido()
+            return self.indice.fila_en_curso(codigo_estudiante) is not None
             
         except Exception:
             return False
     
+    @con_prioridad(PRIORIDAD_INICIO)
     def verificar_examen_completado(self, codigo_estudiante: str) -> bool:
         """
         Verifica si el estudiante ya completó el examen
@@ -200,30 +735,18 @@ class DataPersistence:
             True si ya completó el examen (tiene registro con razón_terminacion diferente a EN_CURSO)
         """
         try:
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range='Resultados!A:P'
-            ).execute()
-            
-            values = result.get('values', [])
-            
-            # Buscar si hay alguna fila COMPLETADA para este estudiante
-            for row in values[1:]:  # Skip header
-                if len(row) > 14 and len(row) > 1:
-                    if row[1] == codigo_estudiante:
-                        # Si el estado NO es EN_CURSO, significa que completó
-                        if row[14] != 'EN_CURSO' and row[14] != '':
-                            return True
-            
-            return False
+            self._sincronizar_si_vencido()
+            return self.indice.tiene_completado(codigo_estudiante)
             
         except Exception:
             return False
     
+    @con_prioridad(PRIORIDAD_FINAL)
     def guardar_resultados(self, codigo_estudiante: str, stats: Dict[str, Any]) -> bool:
         """
         Guarda los resultados del examen en Google Sheets
-        Actualiza la fila EN_CURSO si existe, o crea una nueva
+        Actualiza la fila EN_CURSO si existe (tras confirmar que sigue siendo
+        del estudiante), o crea una nueva
         
         Args:
             codigo_estudiante: Código del estudiante
@@ -241,38 +764,32 @@ class DataPersistence:
             
             # Buscar si hay una fila EN_CURSO para este estudiante
             try:
-                result = self.service.spreadsheets().values().get(
-                    spreadsheetId=self.spreadsheet_id,
-                    range='Resultados!A:P'
-                ).execute()
-                
-                values = result.get('values', [])
-                fila_a_actualizar = None
-                
-                # Buscar la última fila EN_CURSO de este estudiante
-                for i in range(len(values) - 1, 0, -1):
-                    if len(values[i]) > 1 and values[i][1] == codigo_estudiante:
-                        if len(values[i]) > 14 and values[i][14] == 'EN_CURSO':
-                            fila_a_actualizar = i + 1  # +1 porque sheets es 1-indexed
-                            break
+                fila_a_actualizar = self._buscar_fila_en_curso(codigo_estudiante)
+                if fila_a_actualizar:
+                    fila_a_actualizar = self._confirmar_fila(fila_a_actualizar, codigo_estudiante)
                 
                 if fila_a_actualizar:
                     # Actualizar la fila existente
-                    range_to_update = f'Resultados!A{fila_a_actualizar}:P{fila_a_actualizar}'
+                    range_to_update = rango_hoja(self.hoja, f'A{fila_a_actualizar}:P{fila_a_actualizar}')
                     body = {'values': [datos]}
-                    self.service.spreadsheets().values().update(
+                    self._ejecutar(self.service.spreadsheets().values().update(
                         spreadsheetId=self.spreadsheet_id,
                         range=range_to_update,
                         valueInputOption='RAW',
                         body=body
-                    ).execute()
+                    ))
                 else:
                     # Agregar nueva fila
-                    self._agregar_fila(datos)
+                    fila_a_actualizar = self._agregar_fila(datos)
+                
+                if fila_a_actualizar:
+                    self.indice.registrar(fila_a_actualizar, codigo_estudiante, stats['razon_terminacion'])
                 
+                self._acumular_resumen([datos])
                 return True
                 
             except HttpError as e:
+                self._invalidar_hoja()
                 st.error(f"⚠️ Error HTTP al acceder a Google Sheets: {e.status_code}")
                 return False
             
@@ -291,261 +808,603 @@ class DataPersistence:
         Returns:
             Lista con los datos a guardar
         """
-        # Fecha y hora actual
-        fecha_hora = datetime.now(ZoneInfo("America/Bogota")).strftime("%Y-%m-%d %H:%M:%S")
-        
-        # IDs de preguntas separados por coma
-        preguntas_ids = ",".join(stats['preguntas_ids'])
-        
-        # Datos básicos
-        datos = [
-            fecha_hora,
-            codigo_estudiante,
-            stats['preguntas_respondidas'],
-            stats['correctas'],
-            stats['incorrectas'],
-            stats['porcentaje_correctas'],
-            stats['nivel_final'],
-            stats['nota_final'],
-            preguntas_ids
-        ]
-        
-        # Agregar estadísticas del sistema de calificación
-        stats_sistema = stats.get('stats_sistema', {})
-        
-        # Theta (IRT)
-        datos.append(stats_sistema.get('theta', ''))
-        
-        # Consistencia (IRT)
-        datos.append(stats_sistema.get('consistencia', ''))
-        
-        # Nivel de habilidad (IRT)
-        datos.append(stats_sistema.get('nivel_habilidad', ''))
-        
-        # Rating (Elo)
-        datos.append(stats_sistema.get('rating', ''))
-        
-        # Cambio de rating (Elo)
-        datos.append(stats_sistema.get('cambio_rating', ''))
-        
-        # Razón de terminación
-        datos.append(stats['razon_terminacion'])
-        
-        # Sistema de calificación usado
-        datos.append(self.config['sistema_calificacion']['tipo'])
-        
-        return datos
+        return preparar_fila_resultados(self.config, codigo_estudiante, stats)
     
     def _verificar_o_crear_hoja(self):
-        """Verifica si existe la hoja de resultados, si no, la crea con encabezados"""
-        try:
-            # Intentar obtener información de la hoja
-            sheet_metadata = self.service.spreadsheets().get(
-                spreadsheetId=self.spreadsheet_id
-            ).execute()
-            
-            # Verificar si existe la hoja "Resultados"
-            sheets = sheet_metadata.get('sheets', [])
-            existe_hoja = any(
-                sheet['properties']['title'] == 'Resultados' 
-                for sheet in sheets
-            )
+        """
+        Verifica que exista la hoja de resultados con encabezados, si no, la crea
+        
+        La verificación se hace una sola vez por proceso y spreadsheet: una
+        lectura de la fila de encabezados y, solo si falta algo, una escritura.
+        Si una escritura posterior falla, se invalida con _invalidar_hoja().
+        """
+        if (self.spreadsheet_id, self.hoja) in DataPersistence._hojas_verificadas:
+            return
+        
+        with DataPersistence._lock_hojas:
+            if (self.spreadsheet_id, self.hoja) in DataPersistence._hojas_verificadas:
+                return
             
-            if not existe_hoja:
-                # Crear la hoja
+            try:
+                # Leer la fila de encabezados (falla con 400 si la hoja no existe)
+                result = self._ejecutar(self.service.spreadsheets().values().get(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=rango_hoja(self.hoja, 'A1:Q1')
+                ))
+            except HttpError as e:
+                if e.resp.status != 400:
+                    raise Exception(f"Error al verificar hoja: {str(e)}")
                 self._crear_hoja_resultados()
             else:
-                # Verificar si tiene encabezados
-                self._verificar_encabezados()
+                values = result.get('values', [])
                 
-        except HttpError as e:
-            raise Exception(f"Error al verificar hoja: {str(e)}")
+                # Si está vacía, escribir encabezados
+                if not values or not values[0]:
+                    self._escribir_encabezados()
+            
+            DataPersistence._hojas_verificadas.add((self.spreadsheet_id, self.hoja))
+    
+    def _invalidar_hoja(self):
+        """Fuerza a verificar de nuevo la hoja en la próxima escritura"""
+        DataPersistence._hojas_verificadas.discard((self.spreadsheet_id, self.hoja))
     
     def _crear_hoja_resultados(self):
-        """Crea la hoja de Resultados con encabezados"""
+        """Crea la hoja de resultados del examen con sus encabezados"""
+        self._crear_hoja(self.hoja, ENCABEZADOS)
+    
+    def _crear_hoja(self, titulo: str, encabezados: List[str]):
+        """
+        Crea una hoja y escribe sus encabezados en un solo batchUpdate
+        
+        Args:
+            titulo: Nombre de la hoja
+            encabezados: Valores de la primera fila
+        """
+        # ID de hoja fijo para poder referenciarlo en la misma solicitud
+        sheet_id = zlib.crc32(titulo.encode('utf-8')) & 0x7FFFFFFF
+        
         try:
-            # Crear nueva hoja
             body = {
-                'requests': [{
-                    'addSheet': {
-                        'properties': {
-                            'title': 'Resultados',
-                            'gridProperties': {
-                                'rowCount': 1000,
-                                'columnCount': 20
+                'requests': [
+                    {
+                        'addSheet': {
+                            'properties': {
+                                'sheetId': sheet_id,
+                                'title': titulo,
+                                'gridProperties': {
+                                    'rowCount': 1000,
+                                    'columnCount': 20
+                                }
                             }
                         }
+                    },
+                    {
+                        'updateCells': {
+                            'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': 0},
+                            'rows': [{
+                                'values': [
+                                    {'userEnteredValue': {'stringValue': encabezado}}
+                                    for encabezado in encabezados
+                                ]
+                            }],
+                            'fields': 'userEnteredValue'
+                        }
                     }
-                }]
+                ]
             }
             
-            self.service.spreadsheets().batchUpdate(
+            self._ejecutar(self.service.spreadsheets().batchUpdate(
                 spreadsheetId=self.spreadsheet_id,
                 body=body
-            ).execute()
-            
-            # Agregar encabezados
-            self._escribir_encabezados()
+            ))
             
         except HttpError as e:
             raise Exception(f"Error al crear hoja: {str(e)}")
     
-    def _verificar_encabezados(self):
-        """Verifica si la primera fila tiene encabezados, si no, los agrega"""
-        try:
-            # Leer primera fila
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range='Resultados!A1:Q1'
-            ).execute()
-            
-            values = result.get('values', [])
-            
-            # Si está vacía, escribir encabezados
-            if not values or not values[0]:
-                self._escribir_encabezados()
-                
-        except HttpError:
-            # Si hay error, intentar escribir encabezados
-            self._escribir_encabezados()
-    
     def _escribir_encabezados(self):
         """Escribe los encabezados en la primera fila"""
-        encabezados = [
-            'Fecha_Hora',
-            'Codigo_Estudiante',
-            'Preguntas_Respondidas',
-            'Correctas',
-            'Incorrectas',
-            'Porcentaje_Correctas',
-            'Nivel_Final',
-            'Nota_Final',
-            'Preguntas_IDs',
-            'Theta_IRT',
-            'Consistencia_IRT',
-            'Nivel_Habilidad_IRT',
-            'Rating_Elo',
-            'Cambio_Rating_Elo',
-            'Razon_Terminacion',
-            'Sistema_Calificacion'
-        ]
-        
         body = {
-            'values': [encabezados]
+            'values': [ENCABEZADOS]
         }
         
-        self.service.spreadsheets().values().update(
+        self._ejecutar(self.service.spreadsheets().values().update(
             spreadsheetId=self.spreadsheet_id,
-            range='Resultados!A1',
+            range=rango_hoja(self.hoja, 'A1'),
             valueInputOption='RAW',
             body=body
-        ).execute()
+        ))
     
-    def _agregar_fila(self, datos: List[Any]):
+    def _agregar_fila(self, datos: List[Any]) -> Optional[int]:
         """
         Agrega una fila con datos al final de la hoja
         
         Args:
             datos: Lista con los datos a agregar
+            
+        Returns:
+            Número de la fila agregada (según updatedRange) o None
         """
         body = {
             'values': [datos]
         }
         
-        self.service.spreadsheets().values().append(
+        respuesta = self._ejecutar(self.service.spreadsheets().values().append(
             spreadsheetId=self.spreadsheet_id,
-            range='Resultados!A:Q',
+            range=rango_hoja(self.hoja, 'A:Q'),
             valueInputOption='RAW',
             insertDataOption='INSERT_ROWS',
             body=body
-        ).execute()
+        ))
+        
+        # updatedRange tiene la forma "'Resultados_programacion'!A57:P57"
+        rango = respuesta.get('updates', {}).get('updatedRange', '')
+        coincidencia = re.search(r'![A-Z]+(\d+)', rango)
+        return int(coincidencia.group(1)) if coincidencia else None
+    
+    def agregar_resultados(self, filas: List[List[Any]]) -> int:
+        """
+        Agrega varias filas finalizadas con un solo append (p. ej. al replicar otro backend)
+        
+        No usa Streamlit; los errores de la API se propagan al llamador.
+        
+        Args:
+            filas: Filas completas (columnas A-P)
+            
+        Returns:
+            Número de filas agregadas
+        """
+        if not filas:
+            return 0
+        
+        self._verificar_o_crear_hoja()
+        
+        respuesta = self._ejecutar(self.service.spreadsheets().values().append(
+            spreadsheetId=self.spreadsheet_id,
+            range=rango_hoja(self.hoja, 'A:Q'),
+            valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
+            body={'values': filas}
+        ))
+        
+        rango = respuesta.get('updates', {}).get('updatedRange', '')
+        coincidencia = re.search(r'![A-Z]+(\d+)', rango)
+        if coincidencia:
+            inicio = int(coincidencia.group(1))
+            for i, datos in enumerate(filas):
+                self.indice.registrar(inicio + i, datos[1], datos[14])
+        
+        self._acumular_resumen(filas)
+        return len(filas)
+    
+    def _leer_pagina(self, rangos_fila: List[Tuple[int, int]], tramos: List[Tuple[int, int]]) -> List[List[str]]:
+        """
+        Lee un bloque de filas proyectado a los tramos de columnas
+        
+        Args:
+            rangos_fila: (primera, última) fila de cada rango a leer
+            tramos: Tramos de columnas (ver tramos_columnas)
+            
+        Returns:
+            Una lista de ENCABEZADOS celdas por fila leída ('' en las no proyectadas)
+        """
+        rangos = [
+            rango_hoja(self.hoja, f'{chr(65 + c1)}{f1}:{chr(65 + c2)}{f2}')
+            for f1, f2 in rangos_fila
+            for c1, c2 in tramos
+        ]
+        result = self._ejecutar(self.service.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id,
+            ranges=rangos
+        ))
+        bloques = iter(result.get('valueRanges', []))
+        
+        filas = []
+        for f1, f2 in rangos_fila:
+            pagina = [[''] * len(ENCABEZADOS) for _ in range(f2 - f1 + 1)]
+            for c1, c2 in tramos:
+                for fila, valores in zip(pagina, next(bloques).get('values', [])):
+                    fila[c1:c1 + len(valores)] = valores
+            filas.extend(pagina)
+        return filas
     
-    def obtener_resultados(
+    def iterar_resultados(
         self,
         codigo_estudiante: str = None,
-        limite: int = 100
-    ) -> List[Dict[str, Any]]:
+        columnas: Optional[List[str]] = None,
+        tamano_pagina: int = 500
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Obtiene resultados de la hoja
+        Recorre los resultados de la hoja por páginas de filas
+        
+        Igual que recorrer_resultados, pero un error de la API se muestra en
+        la interfaz y termina el recorrido sin propagarse.
         
         Args:
-            codigo_estudiante: Si se proporciona, filtra por este código
-            limite: Número máximo de resultados a retornar
+            codigo_estudiante: Si se proporciona, solo los de este código
+            columnas: Encabezados a leer (por defecto, todos)
+            tamano_pagina: Filas por lectura
             
-        Returns:
-            Lista de diccionarios con resultados
+        Yields:
+            Diccionarios con los encabezados pedidos como claves
         """
         try:
-            # Leer datos
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range='Resultados!A:Q'
-            ).execute()
+            yield from self.recorrer_resultados(codigo_estudiante, columnas, tamano_pagina)
             
-            values = result.get('values', [])
+        except HttpError as e:
+            st.error(f"⚠️ Error al obtener resultados: {str(e)}")
+    
+    def recorrer_resultados(
+        self,
+        codigo_estudiante: str = None,
+        columnas: Optional[List[str]] = None,
+        tamano_pagina: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los resultados de la hoja por páginas de filas
+        
+        Cada página es una sola llamada batchGet con solo las columnas pedidas,
+        y no se lee la siguiente hasta que se consumió la anterior. Con
+        codigo_estudiante, el espejo indica qué filas leer. Los errores de la
+        API se propagan: lo usan los procesos que no deben seguir con una
+        lectura incompleta (replicación, recuento del resumen).
+        
+        Args:
+            codigo_estudiante: Si se proporciona, solo los de este código
+            columnas: Encabezados a leer (por defecto, todos)
+            tamano_pagina: Filas por lectura
             
-            if not values or len(values) < 2:
-                return []
+        Yields:
+            Diccionarios con los encabezados pedidos como claves
+        """
+        tramos = tramos_columnas(columnas)
+        claves = columnas if columnas is not None else ENCABEZADOS
+        indices = [ENCABEZADOS.index(c) for c in claves]
+        
+        if codigo_estudiante:
+            self._sincronizar_indice()
+            filas = self.indice.filas_de(codigo_estudiante)
+            paginas = (
+                [(fila, fila) for fila in filas[i:i + tamano_pagina]]
+                for i in range(0, len(filas), tamano_pagina)
+            )
+        else:
+            paginas = (
+                [(inicio, inicio + tamano_pagina - 1)]
+                for inicio in itertools.count(2, tamano_pagina)
+            )
+        
+        for rangos_fila in paginas:
+            pagina = self._leer_pagina(rangos_fila, tramos)
             
-            # Encabezados
-            encabezados = values[0]
+            for fila in pagina:
+                codigo = fila[_COLUMNA_CODIGO]
+                if not codigo or (codigo_estudiante and codigo != codigo_estudiante):
+                    continue
+                yield {clave: fila[i] for clave, i in zip(claves, indices)}
             
-            # Datos
-            resultados = []
-            for row in values[1:]:
-                # Asegurar que la fila tenga todos los campos
-                while len(row) < len(encabezados):
-                    row.append('')
-                
-                # Crear diccionario
-                resultado = dict(zip(encabezados, row))
-                
-                # Filtrar por código si se proporciona
-                if codigo_estudiante:
-                    if resultado.get('Codigo_Estudiante') == codigo_estudiante:
-                        resultados.append(resultado)
-                else:
-                    resultados.append(resultado)
-                
-                # Limitar resultados
-                if len(resultados) >= limite:
-                    break
+            # La API omite las filas vacías finales: una página incompleta
+            # más allá de lo que conoce el espejo es el final de la hoja
+            if (not codigo_estudiante and not pagina[-1][_COLUMNA_CODIGO]
+                    and rangos_fila[-1][1] >= self.indice.filas_leidas):
+                return
+    
+    def _leer_resumen(self) -> Tuple[Dict[Tuple[str, str], Tuple[int, Tuple]], bool]:
+        """
+        Lee de la hoja Resumen las filas de este examen
+        
+        Returns:
+            ((sistema_calificacion, origen) -> (número de fila, fila en el orden
+            de ENCABEZADOS_RESUMEN), si la hoja existe). Si una clave aparece
+            más de una vez, cuenta solo la primera fila.
+        """
+        try:
+            result = self._ejecutar(self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range='Resumen!A2:I',
+                valueRenderOption='UNFORMATTED_VALUE'
+            ))
+        except HttpError as e:
+            if e.resp.status != 400:
+                raise
+            return {}, False  # La hoja aún no existe
+        
+        filas = {}
+        for numero, valores in enumerate(result.get('values', []), start=2):
+            valores = list(valores) + [''] * (len(ENCABEZADOS_HOJA_RESUMEN) - len(valores))
+            if valores[0] != self.examen_id:
+                continue
+            fila = (
+                valores[0], valores[1] or '', int(valores[2] or 0), float(valores[3] or 0),
+                float(valores[4] or 0), float(valores[5] or 0), float(valores[6] or 0),
+                int(valores[7] or 0)
+            )
+            filas.setdefault((fila[1], str(valores[8])), (numero, fila))
+        return filas, True
+    
+    def _registros_finalizados(self) -> List[Tuple[str, str, float, int]]:
+        """Resultados finalizados del examen leídos de su hoja, en el formato de EspejoResultados.acumular"""
+        columnas = [
+            'Fecha_Hora', 'Codigo_Estudiante', 'Preguntas_Respondidas', 'Nota_Final',
+            'Razon_Terminacion', 'Sistema_Calificacion'
+        ]
+        return [
+            (
+                f"{r['Codigo_Estudiante']}|{r['Fecha_Hora']}", r['Sistema_Calificacion'] or '',
+                float(r['Nota_Final'] or 0), int(r['Preguntas_Respondidas'] or 0)
+            )
+            for r in self.recorrer_resultados(columnas=columnas)
+            if r['Razon_Terminacion'] not in ('EN_CURSO', '')
+        ]
+    
+    def _escribir_resumen(
+        self,
+        existentes: Dict[Tuple[str, str], Tuple[int, Tuple]],
+        nuevas: Dict[Tuple[str, str], Tuple],
+        hoja_existe: bool
+    ) -> int:
+        """
+        Escribe filas del resumen: actualiza en su lugar las que ya existen y agrega las demás
+        
+        Args:
+            existentes: Filas del examen leídas con _leer_resumen
+            nuevas: (sistema_calificacion, origen) -> fila a escribir
+            hoja_existe: Si la hoja Resumen existe
             
-            return resultados
+        Returns:
+            Número de filas agregadas
+        """
+        actualizaciones = [
+            {
+                'range': f'Resumen!A{existentes[clave][0]}:I{existentes[clave][0]}',
+                'values': [list(fila) + [clave[1]]]
+            }
+            for clave, fila in nuevas.items() if clave in existentes
+        ]
+        agregadas = [list(fila) + [clave[1]] for clave, fila in nuevas.items() if clave not in existentes]
+        
+        if actualizaciones:
+            self._ejecutar(self.service.spreadsheets().values().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'valueInputOption': 'RAW', 'data': actualizaciones}
+            ))
+        
+        if agregadas:
+            if not hoja_existe:
+                self._crear_hoja_resumen()
+            self._ejecutar(self.service.spreadsheets().values().append(
+                spreadsheetId=self.spreadsheet_id,
+                range='Resumen!A:I',
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body={'values': agregadas}
+            ))
+        return len(agregadas)
+    
+    def _crear_hoja_resumen(self):
+        """Crea la hoja Resumen una sola vez por proceso (si otro la creó antes, no hace nada)"""
+        with DataPersistence._lock_hojas:
+            if (self.spreadsheet_id, 'Resumen') in DataPersistence._hojas_verificadas:
+                return
+            try:
+                self._crear_hoja('Resumen', ENCABEZADOS_HOJA_RESUMEN)
+            except Exception as e:
+                # Con 400 ya existe (la creó otro proceso); si no, el append siguiente fallará
+                logger.info("No se creó la hoja Resumen: %s", e)
+            DataPersistence._hojas_verificadas.add((self.spreadsheet_id, 'Resumen'))
+    
+    def _publicar_resumen(self):
+        """
+        Publica en la hoja Resumen los agregados de este espejo (sus propias filas)
+        
+        Un solo hilo del proceso publica cada examen a la vez; si otro termina
+        un examen mientras tanto, solo le pide que vuelva a publicar (los
+        agregados ya están en el espejo), así una ráfaga de guardados se
+        resuelve con pocas escrituras.
+        """
+        clave = (self.spreadsheet_id, self.examen_id)
+        with DataPersistence._lock_publicacion:
+            if clave in DataPersistence._publicando:
+                DataPersistence._publicando[clave] = True
+                return
+            DataPersistence._publicando[clave] = False
+        
+        try:
+            while True:
+                self._publicar_filas_resumen()
+                with DataPersistence._lock_publicacion:
+                    if not DataPersistence._publicando[clave]:
+                        del DataPersistence._publicando[clave]
+                        return
+                    DataPersistence._publicando[clave] = False
+        except Exception:
+            with DataPersistence._lock_publicacion:
+                DataPersistence._publicando.pop(clave, None)
+            raise
+    
+    def _publicar_filas_resumen(self):
+        """
+        Escribe en la hoja Resumen las filas de este origen con los agregados del espejo
+        
+        La primera vez siembra los agregados recorriendo la hoja de resultados
+        del examen, salvo que Resumen ya tenga filas de otros orígenes (que ya
+        cuentan esos resultados). Como varios procesos publican las mismas
+        filas, después de escribir se comprueba que el espejo no haya cambiado
+        (ni se haya agregado una fila que otro proceso pudo duplicar); si
+        cambió, se vuelve a publicar, de modo que la última escritura lleva
+        siempre los agregados más recientes.
+        """
+        origen = self.indice.origen
+        for _ in range(3):
+            existentes, hoja_existe = self._leer_resumen()
+            if not self.indice.resumen_sembrado(self.examen_id):
+                ajenas = any(otro != origen for _, otro in existentes)
+                with DataPersistence._lock_siembra:
+                    if not self.indice.resumen_sembrado(self.examen_id):
+                        self.indice.acumular(
+                            self.examen_id,
+                            [] if ajenas else self._registros_finalizados(),
+                            sembrar=True
+                        )
             
+            propias = self.indice.agregados(self.examen_id)
+            nuevas = {
+                (fila[1], origen): fila for fila in propias
+                if existentes.get((fila[1], origen), (0, None))[1] != tuple(fila)
+            }
+            agregadas = self._escribir_resumen(existentes, nuevas, hoja_existe)
+            if not agregadas and self.indice.agregados(self.examen_id) == propias:
+                return
+    
+    @con_prioridad(PRIORIDAD_FINAL)
+    def _acumular_resumen(self, filas: List[List[Any]]):
+        """
+        Suma resultados finales al resumen del examen y lo publica en la hoja Resumen
+        
+        Los agregados se actualizan de forma atómica en el espejo local
+        (compartido por los procesos de la máquina), que cuenta cada resultado
+        una sola vez. No interrumpe el guardado: si la publicación falla, la
+        siguiente la pone al día.
+        
+        Args:
+            filas: Filas finalizadas (columnas A-P)
+        """
+        try:
+            self.indice.acumular(
+                self.examen_id,
+                [(clave_resultado(fila), *registro_resumen(fila)) for fila in filas]
+            )
+            self._publicar_resumen()
+        except Exception as e:
+            logger.warning("No se pudo actualizar el resumen de %s: %s", self.examen_id, e)
+    
+    def reconstruir_resumen(self) -> int:
+        """
+        Recalcula el resumen del examen recorriendo su hoja de resultados
+        
+        Atribuye a este examen todos los resultados finalizados de la hoja,
+        los publica como filas de este origen y deja en cero las filas de
+        otros orígenes. Es una reparación manual: ejecútela con el examen
+        cerrado, porque otra máquina que siga guardando volvería a publicar
+        sus propios agregados.
+        
+        Returns:
+            Número de resultados contados
+        """
+        registros = self._registros_finalizados()
+        self.indice.reemplazar_resumen(self.examen_id, registros)
+        
+        origen = self.indice.origen
+        existentes, hoja_existe = self._leer_resumen()
+        nuevas = {(fila[1], origen): fila for fila in self.indice.agregados(self.examen_id)}
+        for clave in existentes.keys() - nuevas.keys():
+            nuevas[clave] = fila_resumen_vacia(self.examen_id, clave[0])
+        self._escribir_resumen(existentes, nuevas, hoja_existe)
+        return len(registros)
+    
+    def archivar_particion(self, particion: str, destino_id: str = None, tamano_pagina: int = 1000) -> str:
+        """
+        Saca de la zona activa la hoja de resultados de una partición cerrada
+        
+        Con destino_id, copia la hoja por páginas a una hoja del mismo nombre en
+        ese spreadsheet (en las mismas filas, así que puede repetirse si se
+        interrumpe) y la elimina de este; sin él, la renombra a
+        'Archivo_<partición>' y la oculta. El resumen de la partición se conserva.
+        
+        Args:
+            particion: Partición cerrada, p. ej. 'programacion_2024-2'
+            destino_id: Spreadsheet de archivo (opcional)
+            tamano_pagina: Filas por lectura al copiar
+            
+        Returns:
+            Nombre de la hoja archivada
+        """
+        if not resultados_particionados(self.config):
+            raise ValueError("Los resultados no están particionados (configure persistencia.periodo)")
+        if particion == self.examen_id:
+            raise ValueError(f"{particion} es la partición activa del examen")
+        
+        hoja = hoja_resultados(self.config, particion)
+        metadata = self._ejecutar(self.service.spreadsheets().get(
+            spreadsheetId=self.spreadsheet_id,
+            fields='sheets.properties'
+        ))
+        propiedades = next(
+            (h['properties'] for h in metadata.get('sheets', []) if h['properties']['title'] == hoja),
+            None
+        )
+        if propiedades is None:
+            raise ValueError(f"No existe la hoja {hoja}")
+        
+        if destino_id is None:
+            archivo = f"Archivo_{particion}"
+            self._ejecutar(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=self.spreadsheet_id,
+                body={'requests': [{
+                    'updateSheetProperties': {
+                        'properties': {'sheetId': propiedades['sheetId'], 'title': archivo, 'hidden': True},
+                        'fields': 'title,hidden'
+                    }
+                }]}
+            ))
+            return archivo
+        
+        try:
+            self._ejecutar(self.service.spreadsheets().batchUpdate(
+                spreadsheetId=destino_id,
+                body={'requests': [{
+                    'addSheet': {
+                        'properties': {
+                            'title': hoja,
+                            'gridProperties': propiedades.get('gridProperties', {})
+                        }
+                    }
+                }]}
+            ))
         except HttpError as e:
-            st.error(f"⚠️ Error al obtener resultados: {str(e)}")
-            return []
+            if e.resp.status != 400:
+                raise  # Con 400 ya existe: se reanuda una copia interrumpida
+        
+        for inicio in itertools.count(1, tamano_pagina):
+            result = self._ejecutar(self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=rango_hoja(hoja, f'A{inicio}:P{inicio + tamano_pagina - 1}'),
+                valueRenderOption='UNFORMATTED_VALUE'
+            ))
+            valores = result.get('values', [])
+            if valores:
+                self._ejecutar(self.service.spreadsheets().values().update(
+                    spreadsheetId=destino_id,
+                    range=rango_hoja(hoja, f'A{inicio}'),
+                    valueInputOption='RAW',
+                    body={'values': valores}
+                ))
+            if len(valores) < tamano_pagina:
+                break
+        
+        self._ejecutar(self.service.spreadsheets().batchUpdate(
+            spreadsheetId=self.spreadsheet_id,
+            body={'requests': [{'deleteSheet': {'sheetId': propiedades['sheetId']}}]}
+        ))
+        return hoja
     
     def obtener_estadisticas_globales(self) -> Dict[str, Any]:
         """
-        Obtiene estadísticas globales de todos los exámenes
+        Obtiene estadísticas globales del examen desde el resumen
+        
+        Los agregados (total, suma, suma de cuadrados, mínimo y máximo por
+        sistema de calificación) se actualizan en cada guardar_resultados, así
+        que la consulta es una lectura de la hoja Resumen que no depende del
+        tamaño del historial.
         
         Returns:
             Diccionario con estadísticas
         """
         try:
-            resultados = self.obtener_resultados()
-            
-            if not resultados:
-                return {
-                    'total_examenes': 0,
-                    'promedio_nota': 0,
-                    'promedio_preguntas': 0
-                }
-            
-            # Calcular estadísticas
-            total = len(resultados)
-            notas = [float(r.get('Nota_Final', 0)) for r in resultados]
-            preguntas = [int(r.get('Preguntas_Respondidas', 0)) for r in resultados]
-            
-            return {
-                'total_examenes': total,
-                'promedio_nota': sum(notas) / len(notas) if notas else 0,
-                'nota_maxima': max(notas) if notas else 0,
-                'nota_minima': min(notas) if notas else 0,
-                'promedio_preguntas': sum(preguntas) / len(preguntas) if preguntas else 0
-            }
+            existentes, _ = self._leer_resumen()
+            if not self.indice.resumen_sembrado(self.examen_id):
+                self._publicar_resumen()
+                existentes, _ = self._leer_resumen()
+            return estadisticas_de_resumen(combinar_resumen([fila for _, fila in existentes.values()]))
             
         except Exception as e:
             st.error(f"⚠️ Error al calcular estadísticas globales: {str(e)}")
@@ -560,9 +1419,9 @@ class DataPersistence:
         """
         try:
             # Intentar obtener metadata del spreadsheet
-            self.service.spreadsheets().get(
+            self._ejecutar(self.service.spreadsheets().get(
                 spreadsheetId=self.spreadsheet_id
-            ).execute()
+            ))
             return True
         except Exception as e:
             st.error(f"⚠️ Error de conexión con Google Sheets: {str(e)}")
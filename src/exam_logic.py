@@ -3,10 +3,76 @@ Lógica del Examen Adaptativo
 Implementa la lógica CAT (Computerized Adaptive Testing)
 """
 import random
+import time
 from typing import Dict, List, Any, Optional
 
 from question_manager import QuestionManager
-from scoring_systems import crear_sistema_calificacion
+from scoring_systems import ClasificadorSPRT, crear_sistema_calificacion
+
+
+class RespuestaRegistrada:
+    """
+    Registro compacto de una respuesta
+    
+    Guarda solo el slot de la pregunta en el banco y datos numéricos; los textos
+    (enunciado, opciones, explicación) se recuperan del banco compartido al
+    mostrar los resultados. Admite acceso tipo diccionario (respuesta['correcta'])
+    para los sistemas de calificación.
+    """
+    
+    __slots__ = ('slot', 'dificultad', 'nivel_en_pregunta', 'correcta', 'opcion', 'timestamp')
+    
+    def __init__(
+        self,
+        slot: int,
+        dificultad: int,
+        nivel_en_pregunta: int,
+        correcta: bool,
+        opcion: int,
+        timestamp: float
+    ):
+        """
+        Args:
+            slot: Posición de la pregunta en el banco
+            dificultad: Nivel de la pregunta
+            nivel_en_pregunta: Nivel del examen al presentarla
+            correcta: Si la respuesta fue correcta
+            opcion: Índice de la opción elegida (en el orden de claves original)
+            timestamp: Momento de la respuesta (segundos desde epoch)
+        """
+        self.slot = slot
+        self.dificultad = dificultad
+        self.nivel_en_pregunta = nivel_en_pregunta
+        self.correcta = correcta
+        self.opcion = opcion
+        self.timestamp = timestamp
+    
+    def __getitem__(self, clave: str) -> Any:
+        if clave not in self.__slots__:
+            raise KeyError(clave)
+        return getattr(self, clave)
+    
+    def get(self, clave: str, default: Any = None) -> Any:
+        """Equivalente a dict.get"""
+        return getattr(self, clave) if clave in self.__slots__ else default
+
+
+class OpcionesMezcladas(dict):
+    """
+    Opciones mezcladas para mostrar: letra mostrada -> texto
+    
+    Conserva además, para cada letra mostrada, la clave de la opción en el
+    banco (claves_originales), de modo que la respuesta se evalúa y se
+    registra por clave y no por texto.
+    """
+    
+    def __init__(self, pares: List[tuple]):
+        """
+        Args:
+            pares: (letra mostrada, clave original, texto) por opción, en orden
+        """
+        super().__init__((letra, texto) for letra, _, texto in pares)
+        self.claves_originales = {letra: clave for letra, clave, _ in pares}
 
 
 class ExamLogic:
@@ -30,9 +96,24 @@ class ExamLogic:
         self.umbral_estabilizacion = config['parametros']['umbral_estabilizacion']
         self.ventana_estabilizacion = config['parametros']['ventana_estabilizacion']
         
+        # Criterios de terminación (además de mínimo/máximo), evaluados en orden
+        self.criterios_terminacion = config['parametros'].get(
+            'criterios_terminacion', ['estabilizacion']
+        )
+        self.error_estandar_objetivo = config['parametros'].get('error_estandar_objetivo', 0.5)
+        
+        # Selección de preguntas: 'nivel' (aleatoria en el nivel actual) o
+        # 'maxima_informacion' (la más informativa en el theta actual)
+        self.seleccion_preguntas = config['parametros'].get('seleccion_preguntas', 'nivel')
+        
         # Sistema de calificación
         self.scoring_system = crear_sistema_calificacion(config)
         
+        # Clasificación aprobado/reprobado (solo si se usa el criterio 'sprt')
+        self.sprt = None
+        if 'sprt' in self.criterios_terminacion:
+            self.sprt = ClasificadorSPRT(**config['parametros'].get('sprt', {}))
+        
         # Estado del examen
         self.nivel_actual = self.nivel_inicial
         self.pregunta_actual = 0
@@ -41,6 +122,8 @@ class ExamLogic:
         self.preguntas_respondidas = []
         self.historial_notas = []
         self.preguntas_usadas = []
+        self.registro_uso = question_manager.crear_registro_uso()
+        self.razon_terminacion = None
         
         # Pregunta actual
         self.pregunta_actual_obj = None
@@ -53,11 +136,17 @@ class ExamLogic:
         Returns:
             Diccionario con la pregunta o None si no hay más preguntas
         """
-        # Obtener pregunta del nivel actual
-        pregunta = self.question_manager.obtener_pregunta_por_nivel(
-            self.nivel_actual,
-            self.preguntas_usadas
-        )
+        if self.seleccion_preguntas == 'maxima_informacion':
+            pregunta = self.question_manager.obtener_pregunta_max_informacion(
+                self._theta_para_seleccion(),
+                self.registro_uso
+            )
+        else:
+            # Obtener pregunta del nivel actual
+            pregunta = self.question_manager.obtener_pregunta_por_nivel(
+                self.nivel_actual,
+                self.registro_uso
+            )
         
         if pregunta is None:
             return None
@@ -65,10 +154,28 @@ class ExamLogic:
         # Guardar pregunta actual
         self.pregunta_actual_obj = pregunta
         self.preguntas_usadas.append(pregunta['id'])
+        self.question_manager.marcar_usada(self.registro_uso, pregunta['id'])
         
         return pregunta
     
-    def mezclar_opciones(self, opciones: Dict[str, str]) -> Dict[str, str]:
+    def _theta_para_seleccion(self) -> float:
+        """
+        Theta con el que se elige la siguiente pregunta
+        
+        Returns:
+            Theta del sistema de calificación, o el b del nivel actual si
+            todavía no hay respuestas o el sistema no estima theta
+        """
+        theta = None
+        if self.preguntas_respondidas:
+            theta = self.scoring_system.theta_actual(self.preguntas_respondidas)
+        
+        if theta is None:
+            theta = QuestionManager.parametro_b({'dificultad': self.nivel_actual})
+        
+        return theta
+    
+    def mezclar_opciones(self, opciones: Dict[str, str]) -> OpcionesMezcladas:
         """
         Mezcla las opciones de respuesta aleatoriamente
         
@@ -76,18 +183,19 @@ class ExamLogic:
             opciones: Diccionario con opciones originales
             
         Returns:
-            Diccionario con opciones mezcladas
+            Opciones mezcladas (con la clave original de cada letra mostrada)
         """
         # Crear lista de pares (clave, valor)
         items = list(opciones.items())
         
-        # Mezclar los valores pero mantener las claves ordenadas
-        valores = [v for k, v in items]
-        random.shuffle(valores)
+        # Mezclar los pares pero mantener las letras mostradas ordenadas
+        random.shuffle(items)
         
-        # Crear nuevo diccionario con claves ordenadas y valores mezclados
+        # Crear nuevo diccionario con letras ordenadas y opciones mezcladas
         claves_ordenadas = sorted(opciones.keys())
-        opciones_mezcladas = {k: v for k, v in zip(claves_ordenadas, valores)}
+        opciones_mezcladas = OpcionesMezcladas([
+            (letra, clave, texto) for letra, (clave, texto) in zip(claves_ordenadas, items)
+        ])
         
         # Guardar opciones mezcladas actuales
         self.opciones_mezcladas_actual = opciones_mezcladas
@@ -98,7 +206,7 @@ class ExamLogic:
         self,
         pregunta: Dict[str, Any],
         respuesta_seleccionada: str,
-        opciones_mezcladas: Dict[str, str]
+        opciones_mezcladas: OpcionesMezcladas
     ) -> bool:
         """
         Procesa la respuesta del estudiante
@@ -106,18 +214,14 @@ class ExamLogic:
         Args:
             pregunta: Diccionario con la pregunta
             respuesta_seleccionada: Letra de la opción seleccionada
-            opciones_mezcladas: Opciones mezcladas mostradas
+            opciones_mezcladas: Opciones mezcladas mostradas (de mezclar_opciones)
             
         Returns:
             True si la respuesta es correcta
         """
-        # Determinar cuál era la respuesta correcta original
-        respuesta_correcta_original = pregunta['respuesta_correcta']
-        texto_correcto = pregunta['opciones'][respuesta_correcta_original]
-        
-        # Ver si el texto seleccionado coincide con el texto correcto
-        texto_seleccionado = opciones_mezcladas[respuesta_seleccionada]
-        es_correcta = (texto_seleccionado == texto_correcto)
+        # Clave en el banco de la opción que se mostró con esa letra
+        clave_seleccionada = opciones_mezcladas.claves_originales[respuesta_seleccionada]
+        es_correcta = (clave_seleccionada == pregunta['respuesta_correcta'])
         
         # Actualizar contadores
         if es_correcta:
@@ -125,20 +229,20 @@ class ExamLogic:
         else:
             self.incorrectas += 1
         
-        # Guardar respuesta con TODOS los detalles para retroalimentación final
-        respuesta_info = {
-            'pregunta_id': pregunta['id'],
-            'dificultad': pregunta['dificultad'],
-            'categoria': pregunta.get('categoria', 'Sin categoría'),
-            'correcta': es_correcta,
-            'nivel_en_pregunta': self.nivel_actual,
-            # NUEVO: Guardar detalles para retroalimentación
-            'pregunta_texto': pregunta['pregunta'],
-            'respuesta_correcta_texto': texto_correcto,
-            'respuesta_estudiante_texto': texto_seleccionado,
-            'explicacion': pregunta.get('explicacion', 'Sin explicación disponible')
-        }
+        # Guardar registro compacto; los textos se recuperan del banco al final
+        opcion = sorted(pregunta['opciones']).index(clave_seleccionada)
+        respuesta_info = RespuestaRegistrada(
+            slot=self.question_manager.slot_por_id[pregunta['id']],
+            dificultad=pregunta['dificultad'],
+            nivel_en_pregunta=self.nivel_actual,
+            correcta=es_correcta,
+            opcion=opcion,
+            timestamp=time.time()
+        )
         self.preguntas_respondidas.append(respuesta_info)
+        self.scoring_system.registrar_respuesta(respuesta_info)
+        if self.sprt:
+            self.sprt.registrar_respuesta(respuesta_info)
         
         # Actualizar nivel para la siguiente pregunta
         self._actualizar_nivel(es_correcta, pregunta['dificultad'])
@@ -192,42 +296,99 @@ class ExamLogic:
         
         # Si se alcanzó el máximo de preguntas
         if self.pregunta_actual >= self.preguntas_maximas:
+            self.razon_terminacion = "Máximo de preguntas alcanzado"
             return True
         
-        # Si no se ha alcanzado el mínimo, continuar
+        # Una decisión SPRT ya tiene acotados sus errores (alfa y beta), así
+        # que puede terminar el examen antes del mínimo de preguntas
         if self.pregunta_actual < self.preguntas_minimas:
+            razon = self._criterio_sprt() if 'sprt' in self.criterios_terminacion else None
+            if razon:
+                self.razon_terminacion = razon
+                return True
             return False
         
-        # Verificar estabilización de la nota
-        if len(self.historial_notas) >= self.ventana_estabilizacion:
-            ultimas_notas = self.historial_notas[-self.ventana_estabilizacion:]
-            
-            # Calcular rango de variación
-            max_nota = max(ultimas_notas)
-            min_nota = min(ultimas_notas)
-            variacion = max_nota - min_nota
-            
-            # Si la variación es menor al umbral, terminar
-            if variacion <= self.umbral_estabilizacion:
+        # Verificar los criterios configurados; el primero que se cumple termina
+        for criterio in self.criterios_terminacion:
+            razon = self._evaluar_criterio(criterio)
+            if razon:
+                self.razon_terminacion = razon
                 return True
         
         # Verificar si no hay más preguntas disponibles
         if not self.question_manager.hay_preguntas_disponibles(
             self.nivel_actual,
-            self.preguntas_usadas
+            self.registro_uso
         ):
             # Intentar otros niveles
             hay_preguntas = False
             for nivel in range(1, 6):
-                if self.question_manager.hay_preguntas_disponibles(nivel, self.preguntas_usadas):
+                if self.question_manager.hay_preguntas_disponibles(nivel, self.registro_uso):
                     hay_preguntas = True
                     break
             
             if not hay_preguntas:
+                self.razon_terminacion = "Sin preguntas disponibles"
                 return True
         
         return False
     
+    def _evaluar_criterio(self, criterio: str) -> Optional[str]:
+        """
+        Evalúa un criterio de terminación
+        
+        Args:
+            criterio: Nombre del criterio ('estabilizacion', 'error_estandar' o 'sprt')
+            
+        Returns:
+            Razón de terminación si el criterio se cumple, None si no
+        """
+        criterios = {
+            'estabilizacion': self._criterio_estabilizacion,
+            'error_estandar': self._criterio_error_estandar,
+            'sprt': self._criterio_sprt
+        }
+        
+        if criterio not in criterios:
+            raise ValueError(f"Criterio de terminación desconocido: {criterio}")
+        
+        return criterios[criterio]()
+    
+    def _criterio_estabilizacion(self) -> Optional[str]:
+        """Termina si la nota varió poco en las últimas preguntas"""
+        if len(self.historial_notas) >= self.ventana_estabilizacion:
+            ultimas_notas = self.historial_notas[-self.ventana_estabilizacion:]
+            
+            # Calcular rango de variación
+            max_nota = max(ultimas_notas)
+            min_nota = min(ultimas_notas)
+            variacion = max_nota - min_nota
+            
+            # Si la variación es menor al umbral, terminar
+            if variacion <= self.umbral_estabilizacion:
+                return "Nota estabilizada"
+        
+        return None
+    
+    def _criterio_error_estandar(self) -> Optional[str]:
+        """Termina si el error estándar de theta alcanzó el objetivo"""
+        error = self.scoring_system.error_estandar(self.preguntas_respondidas)
+        
+        # Sistemas sin error estándar (Elo) nunca cumplen este criterio
+        if error is not None and error <= self.error_estandar_objetivo:
+            return f"Precisión alcanzada (error estándar {error:.2f})"
+        
+        return None
+    
+    def _criterio_sprt(self) -> Optional[str]:
+        """Termina cuando la prueba SPRT decide aprobado o reprobado"""
+        decision = self.sprt.decision() if self.sprt else None
+        
+        if decision:
+            return f"Clasificación SPRT: {decision}"
+        
+        return None
+    
     def calcular_estadisticas_finales(self) -> Dict[str, Any]:
         """
         Calcula las estadísticas finales del examen
@@ -250,19 +411,6 @@ class ExamLogic:
         # Progresión de dificultad
         niveles_progresion = [r['nivel_en_pregunta'] for r in self.preguntas_respondidas]
         
-        # NUEVO: Preparar detalle de respuestas para retroalimentación
-        detalle_respuestas = []
-        for respuesta in self.preguntas_respondidas:
-            detalle_respuestas.append({
-                'pregunta': respuesta['pregunta_texto'],
-                'categoria': respuesta['categoria'],
-                'dificultad': respuesta['dificultad'],
-                'correcta': respuesta['correcta'],
-                'respuesta_correcta': respuesta['respuesta_correcta_texto'],
-                'respuesta_estudiante': respuesta['respuesta_estudiante_texto'],
-                'explicacion': respuesta['explicacion']
-            })
-        
         return {
             'preguntas_respondidas': len(self.preguntas_respondidas),
             'correctas': self.correctas,
@@ -276,11 +424,38 @@ class ExamLogic:
             'stats_por_nivel': stats_por_nivel,
             'stats_por_categoria': stats_por_categoria,
             'niveles_progresion': niveles_progresion,
-            'preguntas_ids': [r['pregunta_id'] for r in self.preguntas_respondidas],
+            'preguntas_ids': [
+                self.question_manager.id_de(r.slot) for r in self.preguntas_respondidas
+            ],
             'razon_terminacion': self._obtener_razon_terminacion(),
-            'detalle_respuestas': detalle_respuestas  # NUEVO
+            'clasificacion_sprt': self.sprt.decision() if self.sprt else None
         }
     
+    def obtener_detalle_respuestas(self) -> List[Dict[str, Any]]:
+        """
+        Detalle de cada respuesta para la retroalimentación final
+        
+        Los textos se leen del banco en este momento; no se guardan en la sesión.
+        
+        Returns:
+            Lista de diccionarios con enunciado, respuestas y explicación
+        """
+        detalle_respuestas = []
+        for respuesta in self.preguntas_respondidas:
+            pregunta = self.question_manager.preguntas[respuesta.slot]
+            opciones = pregunta['opciones']
+            detalle_respuestas.append({
+                'pregunta': pregunta['pregunta'],
+                'categoria': pregunta.get('categoria', 'Sin categoría'),
+                'dificultad': respuesta.dificultad,
+                'correcta': respuesta.correcta,
+                'respuesta_correcta': opciones[pregunta['respuesta_correcta']],
+                'respuesta_estudiante': opciones[sorted(opciones)[respuesta.opcion]],
+                'explicacion': pregunta.get('explicacion', 'Sin explicación disponible')
+            })
+        
+        return detalle_respuestas
+    
     def _calcular_stats_por_nivel(self) -> Dict[int, Dict[str, Any]]:
         """
         Calcula estadísticas por nivel de dificultad
@@ -327,7 +502,7 @@ class ExamLogic:
         
         # Agrupar por categoría
         for respuesta in self.preguntas_respondidas:
-            categoria = respuesta['categoria']
+            categoria = self.question_manager.categoria_de(respuesta.slot)
             
             if categoria not in stats:
                 stats[categoria] = {
@@ -360,6 +535,9 @@ class ExamLogic:
         Returns:
             Descripción de la razón
         """
+        if self.razon_terminacion:
+            return self.razon_terminacion
+        
         if self.pregunta_actual >= self.preguntas_maximas:
             return "Máximo de preguntas alcanzado"
         
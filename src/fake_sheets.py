@@ -0,0 +1,630 @@
+"""
+Servicio de Sheets Falso
+Emulación en memoria (o en un archivo local) de la API de Google Sheets v4
+para pruebas de carga sin tocar Google
+"""
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+# Operaciones que consumen la cuota de escritura (el resto, la de lectura)
+ESCRITURAS = {'values.update', 'values.batchUpdate', 'values.append', 'batchUpdate'}
+
+# Tamaño por defecto de una hoja nueva (addSheet sin gridProperties)
+FILAS_HOJA = 1000
+COLUMNAS_HOJA = 26
+
+
+def _indice_columna(letras: str) -> int:
+    """'A' -> 0, 'AB' -> 27"""
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+
+def _letras_columna(indice: int) -> str:
+    """0 -> 'A', 27 -> 'AB'"""
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _nombre_a1(hoja: str) -> str:
+    """Nombre de hoja como aparece en notación A1 (entre comillas si hace falta)"""
+    if re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', hoja):
+        return hoja
+    return "'" + hoja.replace("'", "''") + "'"
+
+
+def _formatear(valor: Any) -> str:
+    """Valor como lo devuelve values.get con FORMATTED_VALUE (aproximado)"""
+    if isinstance(valor, bool):
+        return 'TRUE' if valor else 'FALSE'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _error(status: int, mensaje: str) -> HttpError:
+    """HttpError con la forma de los errores de la API"""
+    estados = {400: 'INVALID_ARGUMENT', 404: 'NOT_FOUND', 429: 'RESOURCE_EXHAUSTED'}
+    contenido = json.dumps({
+        'error': {'code': status, 'message': mensaje, 'status': estados.get(status, 'UNKNOWN')}
+    }).encode('utf-8')
+    return HttpError(httplib2.Response({'status': status}), contenido)
+
+
+class _Solicitud:
+    """Solicitud diferida, como las que devuelve googleapiclient"""
+
+    def __init__(self, servicio: 'ServicioSheetsFalso', metodo: str, spreadsheet_id: str, operacion):
+        self.servicio = servicio
+        self.metodo = metodo
+        self.spreadsheet_id = spreadsheet_id
+        self.operacion = operacion
+        self.method = 'POST' if metodo in ESCRITURAS else 'GET'
+
+    def execute(self, **kwargs):
+        """Ejecuta la solicitud (latencia, cuota y luego la operación)"""
+        return self.servicio._ejecutar(self.metodo, self.spreadsheet_id, self.operacion)
+
+
+class _RecursoValores:
+    """spreadsheets().values()"""
+
+    def __init__(self, servicio: 'ServicioSheetsFalso'):
+        self.servicio = servicio
+
+    def get(self, spreadsheetId: str, range: str, **kwargs) -> _Solicitud:
+        return _Solicitud(
+            self.servicio, 'values.get', spreadsheetId,
+            lambda libro: self.servicio._leer(libro, range)
+        )
+
+    def batchGet(self, spreadsheetId: str, ranges: List[str], **kwargs) -> _Solicitud:
+        return _Solicitud(
+            self.servicio, 'values.batchGet', spreadsheetId,
+            lambda libro: {
+                'spreadsheetId': spreadsheetId,
+                'valueRanges': [self.servicio._leer(libro, rango) for rango in ranges]
+            }
+        )
+
+    def update(self, spreadsheetId: str, range: str, body: Dict[str, Any], **kwargs) -> _Solicitud:
+        return _Solicitud(
+            self.servicio, 'values.update', spreadsheetId,
+            lambda libro: self.servicio._escribir(libro, range, body.get('values', []))
+        )
+
+    def batchUpdate(self, spreadsheetId: str, body: Dict[str, Any], **kwargs) -> _Solicitud:
+        def operacion(libro):
+            respuestas = [
+                self.servicio._escribir(libro, dato['range'], dato.get('values', []))
+                for dato in body.get('data', [])
+            ]
+            return {
+                'spreadsheetId': spreadsheetId,
+                'totalUpdatedRows': sum(r['updatedRows'] for r in respuestas),
+                'totalUpdatedCells': sum(r['updatedCells'] for r in respuestas),
+                'responses': respuestas
+            }
+
+        return _Solicitud(self.servicio, 'values.batchUpdate', spreadsheetId, operacion)
+
+    def append(self, spreadsheetId: str, range: str, body: Dict[str, Any], **kwargs) -> _Solicitud:
+        return _Solicitud(
+            self.servicio, 'values.append', spreadsheetId,
+            lambda libro: self.servicio._agregar(libro, range, body.get('values', []))
+        )
+
+
+class _RecursoSpreadsheets:
+    """spreadsheets()"""
+
+    def __init__(self, servicio: 'ServicioSheetsFalso'):
+        self.servicio = servicio
+
+    def values(self) -> _RecursoValores:
+        return _RecursoValores(self.servicio)
+
+    def get(self, spreadsheetId: str, **kwargs) -> _Solicitud:
+        return _Solicitud(
+            self.servicio, 'get', spreadsheetId,
+            lambda libro: {
+                'spreadsheetId': spreadsheetId,
+                'sheets': [{'properties': dict(hoja['propiedades'])} for hoja in libro.values()]
+            }
+        )
+
+    def batchUpdate(self, spreadsheetId: str, body: Dict[str, Any], **kwargs) -> _Solicitud:
+        return _Solicitud(
+            self.servicio, 'batchUpdate', spreadsheetId,
+            lambda libro: {
+                'spreadsheetId': spreadsheetId,
+                'replies': self.servicio._aplicar_solicitudes(libro, body.get('requests', []))
+            }
+        )
+
+
+class ServicioSheetsFalso:
+    """
+    Emulación de un servicio de Sheets v4 (googleapiclient) para pruebas
+
+    Implementa spreadsheets().get/batchUpdate y values().get/batchGet/update/
+    batchUpdate/append sobre hojas en memoria, con la semántica que usa
+    DataPersistence: rangos A1, respuestas sin celdas vacías finales,
+    updatedRange en append y HttpError 400 para hojas inexistentes. Puede
+    añadir latencia y errores 429 de cuota, y cuenta las llamadas por método.
+    Los valores se guardan tal cual y se devuelven como texto.
+
+    Se inyecta con DataPersistence(config, service=ServicioSheetsFalso()).
+    """
+
+    def __init__(
+        self,
+        latencia: float = 0.0,
+        variacion: float = 0.0,
+        cuota_por_minuto: Optional[int] = None,
+        prob_error_cuota: float = 0.0,
+        ruta: Optional[str] = None,
+        semilla: Optional[int] = None
+    ):
+        """
+        Args:
+            latencia: Segundos de espera por llamada
+            variacion: Variación uniforme (± segundos) de la latencia
+            cuota_por_minuto: Máximo de llamadas por minuto, contado por separado
+                para lecturas y escrituras como en la API real (None = sin límite)
+            prob_error_cuota: Probabilidad de un 429 en cualquier llamada
+            ruta: Archivo JSON donde conservar las hojas entre ejecuciones
+            semilla: Semilla de la aleatoriedad (latencia y errores)
+        """
+        self.latencia = latencia
+        self.variacion = variacion
+        self.cuota_por_minuto = cuota_por_minuto
+        self.prob_error_cuota = prob_error_cuota
+        self.ruta = Path(ruta) if ruta else None
+        self._random = random.Random(semilla)
+        self._lock = threading.RLock()
+
+        # spreadsheetId -> título -> {'propiedades': ..., 'filas': [[...], ...]}
+        self._libros: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._ventanas = {'lectura': deque(), 'escritura': deque()}
+
+        # Contadores para monitoreo
+        self.llamadas = Counter()
+        self.errores = Counter()
+
+        if self.ruta and self.ruta.exists():
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                self._libros = json.load(f)
+
+    # ------------------------------------------------------------------
+    # Interfaz de googleapiclient
+    # ------------------------------------------------------------------
+
+    def spreadsheets(self) -> _RecursoSpreadsheets:
+        """Recurso spreadsheets()"""
+        return _RecursoSpreadsheets(self)
+
+    # ------------------------------------------------------------------
+    # Contadores
+    # ------------------------------------------------------------------
+
+    def total_llamadas(self) -> int:
+        """Número total de llamadas ejecutadas (incluidas las rechazadas)"""
+        return sum(self.llamadas.values())
+
+    def reiniciar_contadores(self):
+        """Pone en cero los contadores de llamadas y errores"""
+        with self._lock:
+            self.llamadas.clear()
+            self.errores.clear()
+
+    def filas(self, spreadsheet_id: str, hoja: str = 'Resultados') -> List[List[Any]]:
+        """
+        Copia de las filas de una hoja (para inspección en pruebas)
+
+        Args:
+            spreadsheet_id: ID del spreadsheet
+            hoja: Título de la hoja
+
+        Returns:
+            Lista de filas
+        """
+        with self._lock:
+            libro = self._libros.get(spreadsheet_id, {})
+            return [list(fila) for fila in libro.get(hoja, {}).get('filas', [])]
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _ejecutar(self, metodo: str, spreadsheet_id: str, operacion):
+        """Aplica latencia y cuota y ejecuta la operación sobre el libro"""
+        if self.latencia or self.variacion:
+            with self._lock:
+                espera = self.latencia + self._random.uniform(-self.variacion, self.variacion)
+            time.sleep(max(0.0, espera))
+
+        with self._lock:
+            self.llamadas[metodo] += 1
+            self._verificar_cuota(metodo)
+
+            libro = self._libros.setdefault(spreadsheet_id, {})
+            try:
+                resultado = operacion(libro)
+            except HttpError as e:
+                self.errores[e.resp.status] += 1
+                raise
+
+            if metodo in ESCRITURAS:
+                self._guardar()
+            return resultado
+
+    def _verificar_cuota(self, metodo: str):
+        """Lanza un 429 si la llamada excede la cuota (o por error inyectado)"""
+        if self.prob_error_cuota and self._random.random() < self.prob_error_cuota:
+            self.errores[429] += 1
+            raise _error(429, "Quota exceeded (injected)")
+
+        if self.cuota_por_minuto is None:
+            return
+
+        ventana = self._ventanas['escritura' if metodo in ESCRITURAS else 'lectura']
+        ahora = time.monotonic()
+        while ventana and ahora - ventana[0] >= 60:
+            ventana.popleft()
+
+        if len(ventana) >= self.cuota_por_minuto:
+            self.errores[429] += 1
+            raise _error(
+                429,
+                "Quota exceeded for quota metric 'Requests' and limit 'Requests per minute'"
+            )
+        ventana.append(ahora)
+
+    def _guardar(self):
+        """Escribe las hojas en el archivo local (si se configuró)"""
+        if self.ruta is None:
+            return
+        temporal = self.ruta.with_name(f"{self.ruta.name}.{os.getpid()}.tmp")
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self._libros, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+
+    # ------------------------------------------------------------------
+    # Rangos A1
+    # ------------------------------------------------------------------
+
+    def _resolver(
+        self,
+        libro: Dict[str, Any],
+        rango: str
+    ) -> Tuple[str, int, int, Optional[int], Optional[int]]:
+        """
+        Interpreta un rango A1
+
+        Returns:
+            (hoja, fila_inicio, col_inicio, fila_fin, col_fin), 0-indexed;
+            fila_fin/col_fin son None si el rango no está acotado
+        """
+        if '!' in rango:
+            hoja, celdas = rango.rsplit('!', 1)
+        elif rango.strip("'") in libro:
+            hoja, celdas = rango, ''
+        else:
+            hoja, celdas = (next(iter(libro), ''), rango)
+
+        if hoja.startswith("'") and hoja.endswith("'"):
+            hoja = hoja[1:-1].replace("''", "'")
+
+        if hoja not in libro:
+            raise _error(400, f"Unable to parse range: {rango}")
+
+        if not celdas:
+            return hoja, 0, 0, None, None
+
+        partes = celdas.split(':')
+        referencias = [re.fullmatch(r'([A-Z]*)(\d*)', parte) for parte in partes]
+        if len(partes) > 2 or not all(referencias):
+            raise _error(400, f"Unable to parse range: {rango}")
+
+        c1, f1 = referencias[0].groups()
+        fila_inicio = int(f1) - 1 if f1 else 0
+        col_inicio = _indice_columna(c1) if c1 else 0
+
+        if len(partes) == 1:
+            # Celda sola ('A1') o columna completa ('A')
+            return (
+                hoja,
+                fila_inicio,
+                col_inicio,
+                fila_inicio if f1 else None,
+                col_inicio if c1 else None
+            )
+
+        c2, f2 = referencias[1].groups()
+        return (
+            hoja,
+            fila_inicio,
+            col_inicio,
+            int(f2) - 1 if f2 else None,
+            _indice_columna(c2) if c2 else None
+        )
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def _leer(self, libro: Dict[str, Any], rango: str) -> Dict[str, Any]:
+        """values.get: valores del rango sin celdas ni filas vacías finales"""
+        hoja, f1, c1, f2, c2 = self._resolver(libro, rango)
+        filas = libro[hoja]['filas']
+
+        ultima = len(filas) - 1 if f2 is None else min(f2, len(filas) - 1)
+        valores = []
+        for fila in filas[f1:ultima + 1]:
+            celdas = fila[c1:] if c2 is None else fila[c1:c2 + 1]
+            celdas = [_formatear(v) for v in celdas]
+            while celdas and celdas[-1] == '':
+                celdas.pop()
+            valores.append(celdas)
+        while valores and not valores[-1]:
+            valores.pop()
+
+        respuesta = {'range': rango, 'majorDimension': 'ROWS'}
+        if valores:
+            respuesta['values'] = valores
+        return respuesta
+
+    def _escribir(self, libro: Dict[str, Any], rango: str, valores: List[List[Any]]) -> Dict[str, Any]:
+        """values.update: escribe desde la esquina superior izquierda del rango"""
+        hoja, f1, c1, _, _ = self._resolver(libro, rango)
+        filas = libro[hoja]['filas']
+
+        for i, valores_fila in enumerate(valores):
+            while len(filas) <= f1 + i:
+                filas.append([])
+            fila = filas[f1 + i]
+            if len(fila) < c1 + len(valores_fila):
+                fila.extend([''] * (c1 + len(valores_fila) - len(fila)))
+            fila[c1:c1 + len(valores_fila)] = ['' if v is None else v for v in valores_fila]
+
+        ancho = max((len(v) for v in valores), default=0)
+        return {
+            'updatedRange': self._rango_a1(hoja, f1, c1, len(valores), ancho),
+            'updatedRows': len(valores),
+            'updatedColumns': ancho,
+            'updatedCells': sum(len(v) for v in valores)
+        }
+
+    def _agregar(self, libro: Dict[str, Any], rango: str, valores: List[List[Any]]) -> Dict[str, Any]:
+        """values.append: escribe debajo de la última fila con datos de la hoja"""
+        hoja, _, c1, _, _ = self._resolver(libro, rango)
+        filas = libro[hoja]['filas']
+
+        siguiente = len(filas)
+        while siguiente > 0 and not any(v != '' for v in filas[siguiente - 1]):
+            siguiente -= 1
+
+        nombre = _nombre_a1(hoja)
+        actualizacion = self._escribir(libro, f"{nombre}!{_letras_columna(c1)}{siguiente + 1}", valores)
+        return {'tableRange': rango, 'updates': actualizacion}
+
+    def _rango_a1(self, hoja: str, fila: int, columna: int, alto: int, ancho: int) -> str:
+        """Rango A1 de un bloque escrito"""
+        inicio = f"{_letras_columna(columna)}{fila + 1}"
+        fin = f"{_letras_columna(columna + max(ancho, 1) - 1)}{fila + max(alto, 1)}"
+        return f"{_nombre_a1(hoja)}!{inicio}:{fin}"
+
+    def _aplicar_solicitudes(self, libro: Dict[str, Any], solicitudes: List[Dict[str, Any]]) -> List[Dict]:
+        """spreadsheets.batchUpdate: addSheet, deleteSheet, updateSheetProperties, updateCells"""
+        # Se aplican sobre una copia para que la solicitud sea atómica, como en la API
+        copia = json.loads(json.dumps(libro))
+        respuestas = []
+
+        for solicitud in solicitudes:
+            if 'addSheet' in solicitud:
+                propiedades = dict(solicitud['addSheet'].get('properties', {}))
+                titulo = propiedades.get('title') or f"Hoja {len(copia) + 1}"
+                if titulo in copia:
+                    raise _error(400, f'A sheet with the name "{titulo}" already exists.')
+                propiedades.setdefault('sheetId', self._random.randrange(1, 2 ** 31))
+                propiedades['title'] = titulo
+                propiedades.setdefault('index', len(copia))
+                propiedades.setdefault(
+                    'gridProperties',
+                    {'rowCount': FILAS_HOJA, 'columnCount': COLUMNAS_HOJA}
+                )
+                copia[titulo] = {'propiedades': propiedades, 'filas': []}
+                respuestas.append({'addSheet': {'properties': propiedades}})
+
+            elif 'deleteSheet' in solicitud:
+                titulo = self._titulo_por_id(copia, solicitud['deleteSheet']['sheetId'])
+                del copia[titulo]
+                respuestas.append({})
+
+            elif 'updateSheetProperties' in solicitud:
+                nuevas = solicitud['updateSheetProperties']['properties']
+                titulo = self._titulo_por_id(copia, nuevas['sheetId'])
+                hoja = copia.pop(titulo)
+                hoja['propiedades'].update(nuevas)
+                copia[hoja['propiedades']['title']] = hoja
+                respuestas.append({})
+
+            elif 'updateCells' in solicitud:
+                datos = solicitud['updateCells']
+                titulo = self._titulo_por_id(copia, datos['start']['sheetId'])
+                valores = [
+                    [
+                        next(iter(celda.get('userEnteredValue', {'stringValue': ''}).values()))
+                        for celda in fila.get('values', [])
+                    ]
+                    for fila in datos.get('rows', [])
+                ]
+                rango = (
+                    f"{_nombre_a1(titulo)}!"
+                    f"{_letras_columna(datos['start'].get('columnIndex', 0))}"
+                    f"{datos['start'].get('rowIndex', 0) + 1}"
+                )
+                self._escribir(copia, rango, valores)
+                respuestas.append({})
+
+            else:
+                raise _error(400, f"Solicitud no soportada por el servicio falso: {list(solicitud)}")
+
+        libro.clear()
+        libro.update(copia)
+        return respuestas
+
+    def _titulo_por_id(self, libro: Dict[str, Any], sheet_id: int) -> str:
+        """Título de la hoja con un sheetId"""
+        for titulo, hoja in libro.items():
+            if hoja['propiedades'].get('sheetId') == sheet_id:
+                return titulo
+        raise _error(400, f"No grid with id: {sheet_id}")
+
+
+def _ciclo_estudiante(
+    config: Dict[str, Any],
+    servicio: ServicioSheetsFalso,
+    planificador,
+    cola,
+    codigo: str,
+    preguntas: int,
+    pausa: float
+) -> bool:
+    """Ciclo de vida de un estudiante como lo recorre app.py"""
+    from data_persistence import DataPersistence
+
+    persistencia = DataPersistence(config, service=servicio, planificador=planificador)
+    if persistencia.verificar_examen_completado(codigo):
+        return False
+    if persistencia.verificar_examen_en_curso(codigo):
+        return False
+    persistencia.guardar_inicio_examen(codigo)
+
+    correctas = 0
+    for respondidas in range(1, preguntas + 1):
+        time.sleep(pausa)
+        correctas += random.random() < 0.6
+        cola.encolar(codigo, respondidas, correctas, respondidas - correctas)
+
+    cola.descartar(codigo)
+    return DataPersistence(config, service=servicio, planificador=planificador).guardar_resultados(
+        codigo, _stats_simuladas(preguntas, correctas)
+    )
+
+
+def _stats_simuladas(preguntas: int, correctas: int) -> Dict[str, Any]:
+    """Estadísticas finales de un examen simulado"""
+    return {
+        'preguntas_ids': [f"Q{i:03d}" for i in range(preguntas)],
+        'preguntas_respondidas': preguntas,
+        'correctas': correctas,
+        'incorrectas': preguntas - correctas,
+        'porcentaje_correctas': round(correctas / preguntas * 100, 1),
+        'nivel_final': 3,
+        'nota_final': round(correctas / preguntas * 5, 1),
+        'stats_sistema': {},
+        'razon_terminacion': 'MAXIMO_PREGUNTAS'
+    }
+
+
+def main():
+    """Punto de entrada de línea de comandos: prueba de carga del flujo completo"""
+    parser = argparse.ArgumentParser(
+        description="Prueba de carga de DataPersistence contra un servicio de Sheets falso"
+    )
+    parser.add_argument('--estudiantes', type=int, default=40, help="Estudiantes simultáneos")
+    parser.add_argument('--preguntas', type=int, default=20, help="Preguntas por examen")
+    parser.add_argument('--pausa', type=float, default=0.02, help="Segundos entre respuestas")
+    parser.add_argument('--latencia', type=float, default=0.0, help="Latencia por llamada (s)")
+    parser.add_argument('--cuota', type=int, default=None, help="Llamadas por minuto (lectura/escritura)")
+    parser.add_argument('--prob-error', type=float, default=0.0, help="Probabilidad de 429 por llamada")
+    parser.add_argument('--intervalo', type=float, default=0.1, help="Intervalo de la cola de progreso (s)")
+    parser.add_argument('--cuota-planificador', type=float, default=6000,
+                        help="Llamadas por minuto que permite el planificador de cuota")
+    parser.add_argument('--espera-base', type=float, default=1.0,
+                        help="Espera del primer reintento tras un 429 (s)")
+    args = parser.parse_args()
+
+    from data_persistence import DataPersistence
+    from progress_queue import ColaProgreso
+    from quota_scheduler import PlanificadorCuota
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # Espejo de filas aislado de los de la aplicación
+        os.environ['EXAMENES_DIR_ESPEJO'] = directorio
+
+        servicio = ServicioSheetsFalso(
+            latencia=args.latencia,
+            cuota_por_minuto=args.cuota,
+            prob_error_cuota=args.prob_error,
+            semilla=0
+        )
+        planificador = PlanificadorCuota(
+            args.cuota_planificador,
+            espera_base=args.espera_base,
+            semilla=0
+        )
+        config = {
+            'persistencia': {'metodo': 'google_sheets', 'spreadsheet_id': f"carga-{uuid.uuid4().hex}"},
+            'parametros': {'nivel_inicial': 3},
+            'sistema_calificacion': {'tipo': 'irt_simplificado'}
+        }
+        inicio = time.perf_counter()
+        cola = ColaProgreso(
+            lambda: DataPersistence(config, service=servicio, planificador=planificador),
+            args.intervalo
+        )
+        with ThreadPoolExecutor(max_workers=args.estudiantes) as ejecutor:
+            guardados = list(ejecutor.map(
+                lambda i: _ciclo_estudiante(
+                    config, servicio, planificador, cola, f"E{i:05d}", args.preguntas, args.pausa
+                ),
+                range(args.estudiantes)
+            ))
+        cola.vaciar()
+        duracion = time.perf_counter() - inicio
+        total = servicio.total_llamadas()
+        llamadas = Counter(servicio.llamadas)
+
+        # Cada resultado guardado debe contarse exactamente una vez en Resumen
+        resumen = DataPersistence(
+            config, service=servicio, planificador=planificador
+        ).obtener_estadisticas_globales().get('total_examenes', 0)
+
+    print(f"Estudiantes: {args.estudiantes} ({sum(guardados)} resultados guardados) en {duracion:.2f} s")
+    print(f"Llamadas: {total} ({total / args.estudiantes:.2f} por estudiante)")
+    for metodo, cantidad in sorted(llamadas.items()):
+        print(f"  {metodo:22s} {cantidad:6d}  ({cantidad / args.estudiantes:.2f} por estudiante)")
+    if servicio.errores:
+        print(f"Errores: {dict(servicio.errores)}")
+    print(f"Progreso: {cola.vaciados} lotes, {cola.filas_escritas} filas, {cola.errores} errores")
+    print(f"Planificador: {planificador.estadisticas()}")
+    print(f"Resumen: {resumen} resultados contados")
+    if resumen != sum(guardados):
+        raise SystemExit(f"❌ El resumen cuenta {resumen} resultados y se guardaron {sum(guardados)}")
+
+
+if __name__ == '__main__':
+    main()
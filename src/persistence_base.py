@@ -0,0 +1,106 @@
+"""
+Interfaz de Persistencia
+Operaciones que implementa cada backend de resultados
+"""
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+
+class PersistenciaBase(ABC):
+    """
+    Interfaz común de los backends de persistencia (Google Sheets, SQLite)
+
+    La aplicación y la cola de progreso solo usan estas operaciones, de modo
+    que el backend se elige en la configuración (persistencia.metodo).
+    """
+
+    @abstractmethod
+    def guardar_inicio_examen(self, codigo_estudiante: str) -> bool:
+        """Registra el inicio del examen (fila EN_CURSO)"""
+
+    @abstractmethod
+    def actualizar_progreso_examen(
+        self,
+        codigo_estudiante: str,
+        preguntas_respondidas: int,
+        correctas: int,
+        incorrectas: int
+    ) -> bool:
+        """Actualiza el progreso del examen en curso de un estudiante"""
+
+    @abstractmethod
+    def actualizar_progreso_lote(self, progresos: Dict[str, Tuple[int, int, int]]) -> List[str]:
+        """
+        Actualiza el progreso de varios estudiantes
+
+        No debe usar Streamlit: se llama desde el hilo de ColaProgreso.
+
+        Args:
+            progresos: Código del estudiante -> (respondidas, correctas, incorrectas)
+
+        Returns:
+            Códigos cuya fila EN_CURSO se encontró y actualizó
+        """
+
+    @abstractmethod
+    def verificar_examen_en_curso(self, codigo_estudiante: str) -> bool:
+        """Si el estudiante tiene un examen EN_CURSO"""
+
+    @abstractmethod
+    def verificar_examen_completado(self, codigo_estudiante: str) -> bool:
+        """Si el estudiante ya tiene un examen finalizado"""
+
+    @abstractmethod
+    def guardar_resultados(self, codigo_estudiante: str, stats: Dict[str, Any]) -> bool:
+        """Guarda el resultado final (actualiza la fila EN_CURSO o crea una nueva)"""
+
+    @abstractmethod
+    def iterar_resultados(
+        self,
+        codigo_estudiante: str = None,
+        columnas: Optional[List[str]] = None,
+        tamano_pagina: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los resultados en orden de registro, leyendo por páginas
+
+        Args:
+            codigo_estudiante: Si se proporciona, solo los de este código
+            columnas: Encabezados a leer (por defecto, todos)
+            tamano_pagina: Filas por lectura
+
+        Yields:
+            Diccionarios con los encabezados pedidos como claves
+        """
+
+    def obtener_resultados(
+        self,
+        codigo_estudiante: str = None,
+        limite: Optional[int] = 100,
+        columnas: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Primeros resultados (deja de leer al llegar al límite)
+
+        Args:
+            codigo_estudiante: Si se proporciona, filtra por este código
+            limite: Número máximo de resultados (None = todos)
+            columnas: Encabezados a incluir (por defecto, todos)
+
+        Returns:
+            Lista de diccionarios con resultados
+        """
+        tamano_pagina = min(limite, 500) if limite else 500
+        return list(islice(
+            self.iterar_resultados(codigo_estudiante, columnas, tamano_pagina),
+            limite
+        ))
+
+    @abstractmethod
+    def obtener_estadisticas_globales(self) -> Dict[str, Any]:
+        """Estadísticas agregadas de los exámenes"""
+
+    @abstractmethod
+    def verificar_conexion(self) -> bool:
+        """Si el backend responde"""
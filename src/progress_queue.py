@@ -0,0 +1,178 @@
+"""
+Cola de Progreso
+Escritura diferida (write-behind) del progreso de los exámenes en curso
+"""
+import atexit
+import logging
+import threading
+import time
+from typing import Dict, Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ColaProgreso:
+    """
+    Cola de actualizaciones de progreso con un hilo que las escribe por lotes
+
+    Cada respuesta confirmada solo deja en memoria el último progreso del
+    estudiante (las actualizaciones del mismo estudiante se fusionan). Un hilo
+    en segundo plano vacía la cola cada `intervalo` segundos con una sola
+    llamada de persistencia para todos los estudiantes pendientes, de modo que
+    el clic del estudiante no espera a Google Sheets.
+
+    El hilo no usa Streamlit: recibe una función que crea su propia
+    persistencia (con su propio cliente de Sheets).
+    """
+
+    _colas: Dict[str, 'ColaProgreso'] = {}
+    _lock_colas = threading.Lock()
+    _atexit_registrado = False
+
+    def __init__(self, crear_persistencia: Callable[[], Any], intervalo: float = 3.0):
+        """
+        Inicializa la cola (el hilo se inicia con el primer encolado)
+
+        Args:
+            crear_persistencia: Función sin argumentos que devuelve un objeto con
+                actualizar_progreso_lote(progresos) -> códigos actualizados
+            intervalo: Segundos entre vaciados
+        """
+        self._crear_persistencia = crear_persistencia
+        self.intervalo = intervalo
+        self._persistencia = None
+        self._pendientes: Dict[str, Tuple[int, int, int]] = {}
+
+        # _lock protege _pendientes; _lock_escritura serializa vaciados y descartes
+        self._lock = threading.Lock()
+        self._lock_escritura = threading.Lock()
+        self._hilo = None
+
+        # Contadores para monitoreo
+        self.vaciados = 0
+        self.filas_escritas = 0
+        self.errores = 0
+
+    @classmethod
+    def obtener(
+        cls,
+        clave: str,
+        crear_persistencia: Callable[[], Any],
+        intervalo: float = 3.0
+    ) -> 'ColaProgreso':
+        """
+        Obtiene la cola compartida del proceso para un destino (p. ej. un spreadsheet)
+
+        Args:
+            clave: Identificador del destino
+            crear_persistencia: Se usa solo si la cola aún no existe
+            intervalo: Se usa solo si la cola aún no existe
+
+        Returns:
+            ColaProgreso compartida
+        """
+        with cls._lock_colas:
+            cola = cls._colas.get(clave)
+            if cola is None:
+                cola = cls(crear_persistencia, intervalo)
+                cls._colas[clave] = cola
+                if not cls._atexit_registrado:
+                    atexit.register(cls._vaciar_todas)
+                    cls._atexit_registrado = True
+            return cola
+
+    @classmethod
+    def _vaciar_todas(cls):
+        """Vacía todas las colas (al terminar el proceso)"""
+        for cola in list(cls._colas.values()):
+            cola.vaciar()
+
+    def encolar(
+        self,
+        codigo_estudiante: str,
+        preguntas_respondidas: int,
+        correctas: int,
+        incorrectas: int
+    ):
+        """
+        Registra el progreso de un estudiante (reemplaza el pendiente anterior)
+
+        Args:
+            codigo_estudiante: Código del estudiante
+            preguntas_respondidas: Número de preguntas respondidas
+            correctas: Número de correctas
+            incorrectas: Número de incorrectas
+        """
+        with self._lock:
+            self._pendientes[codigo_estudiante] = (preguntas_respondidas, correctas, incorrectas)
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(
+                    target=self._bucle,
+                    name="cola-progreso",
+                    daemon=True
+                )
+                self._hilo.start()
+
+    def descartar(self, codigo_estudiante: str):
+        """
+        Descarta el progreso pendiente de un estudiante antes de su guardado final
+
+        Espera a que termine un vaciado en curso, así ninguna escritura de
+        progreso puede llegar después del resultado final.
+
+        Args:
+            codigo_estudiante: Código del estudiante
+        """
+        with self._lock_escritura:
+            with self._lock:
+                self._pendientes.pop(codigo_estudiante, None)
+
+    def pendientes(self) -> int:
+        """Número de estudiantes con progreso sin escribir"""
+        with self._lock:
+            return len(self._pendientes)
+
+    def vaciar(self) -> int:
+        """
+        Escribe ahora todo el progreso pendiente en un solo lote
+
+        Si la escritura falla, el lote vuelve a la cola (sin pisar progresos
+        más recientes encolados mientras tanto) y se reintenta en el próximo
+        vaciado.
+
+        Returns:
+            Número de filas actualizadas
+        """
+        with self._lock_escritura:
+            with self._lock:
+                lote, self._pendientes = self._pendientes, {}
+
+            if not lote:
+                return 0
+
+            try:
+                if self._persistencia is None:
+                    self._persistencia = self._crear_persistencia()
+                actualizados = self._persistencia.actualizar_progreso_lote(lote)
+            except Exception:
+                self.errores += 1
+                logger.exception("Error al escribir el progreso de %d estudiantes", len(lote))
+                with self._lock:
+                    for codigo, progreso in lote.items():
+                        self._pendientes.setdefault(codigo, progreso)
+                return 0
+
+            self.vaciados += 1
+            self.filas_escritas += len(actualizados)
+            return len(actualizados)
+
+    def _bucle(self):
+        """Bucle del hilo: vacía la cola cada intervalo mientras haya pendientes"""
+        while True:
+            time.sleep(self.intervalo)
+            self.vaciar()
+
+            with self._lock:
+                if not self._pendientes:
+                    self._hilo = None
+                    return
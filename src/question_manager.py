@@ -2,31 +2,197 @@
 Gestor de Preguntas
 Maneja el banco de preguntas y la selección de preguntas por nivel
 """
+import bisect
+import copy
 import json
 import random
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from bank_compiler import BancoCompilado, VistaPreguntas, cargar_banco_compilado
+
+
+class RegistroUso:
+    """
+    Preguntas usadas en una sesión de examen
+    
+    Guarda un bit por pregunta del banco (indexado por su posición o "slot") y
+    un contador de preguntas restantes por nivel, de modo que marcar, consultar
+    y verificar disponibilidad son operaciones O(1) sin importar el tamaño
+    del banco.
+    """
+    
+    def __init__(self, total_preguntas: int, preguntas_por_nivel: Dict[int, int]):
+        """
+        Inicializa el registro vacío
+        
+        Args:
+            total_preguntas: Número de preguntas del banco
+            preguntas_por_nivel: Cantidad de preguntas de cada nivel
+        """
+        self._bits = bytearray((total_preguntas + 7) // 8)
+        self.restantes_por_nivel = dict(preguntas_por_nivel)
+        self.total_restantes = total_preguntas
+    
+    def esta_usada(self, slot: int) -> bool:
+        """Indica si la pregunta en esa posición ya fue usada"""
+        return bool(self._bits[slot >> 3] & (1 << (slot & 7)))
+    
+    def marcar(self, slot: int, nivel: int) -> None:
+        """
+        Marca una pregunta como usada
+        
+        Args:
+            slot: Posición de la pregunta en el banco
+            nivel: Nivel de la pregunta (para actualizar el contador)
+        """
+        if self.esta_usada(slot):
+            return
+        
+        self._bits[slot >> 3] |= 1 << (slot & 7)
+        self.total_restantes -= 1
+        if nivel in self.restantes_por_nivel:
+            self.restantes_por_nivel[nivel] -= 1
+    
+    def restantes(self, nivel: int) -> int:
+        """Número de preguntas sin usar en un nivel"""
+        return self.restantes_por_nivel.get(nivel, 0)
 
 
 class QuestionManager:
     """Clase para gestionar el banco de preguntas"""
     
-    def __init__(self, preguntas_file: str):
+    # Bancos compartidos por proceso: ruta resuelta -> (firma del archivo, gestor)
+    _compartidos: Dict[str, Tuple[Tuple[int, int], 'QuestionManager']] = {}
+    _lock_compartidos = threading.Lock()
+    # Un lock por banco para que la carga de uno no bloquee a los demás
+    _locks_carga: Dict[str, threading.Lock] = {}
+    
+    def __init__(self, preguntas_file: str, usar_compilado: bool = True, capacidad_cache: int = 256):
         """
         Inicializa el gestor de preguntas
         
+        Se abre con mmap el artefacto compilado del banco (ver bank_compiler):
+        el que esté junto al JSON o, si no existe, la imagen del directorio
+        privado del usuario, que se compila la primera vez y que reutilizan
+        todos sus procesos. Los índices se leen ya construidos y el texto de
+        cada pregunta se decodifica solo al pedirla (con una caché LRU de
+        capacidad_cache preguntas). Si no hay artefacto utilizable, se parsea
+        el JSON completo en memoria.
+        
         Args:
             preguntas_file: Ruta al archivo JSON con las preguntas
+            usar_compilado: Si False, ignora el artefacto compilado
+            capacidad_cache: Preguntas decodificadas en caché (modo compilado)
             
         Raises:
             FileNotFoundError: Si el archivo no existe
             ValueError: Si el formato es inválido
         """
         self.preguntas_file = Path(preguntas_file)
-        self.preguntas = self._cargar_preguntas()
-        self.preguntas_por_nivel = self._organizar_por_nivel()
+        compilado = None
+        if usar_compilado:
+            compilado = cargar_banco_compilado(self.preguntas_file, capacidad_cache)
+        
+        if compilado is not None:
+            self._cargar_desde_compilado(compilado)
+        else:
+            self._banco = None
+            self.preguntas = self._cargar_preguntas()
+            self.preguntas_por_nivel = self._organizar_por_nivel()
+            
+            # Cada pregunta se identifica por su posición (slot) en self.preguntas
+            self.slot_por_id = {}
+            for slot, pregunta in enumerate(self.preguntas):
+                self.slot_por_id.setdefault(pregunta['id'], slot)
+            self.nivel_por_slot = [p.get('dificultad', 3) for p in self.preguntas]
+            self.slots_por_nivel = {nivel: [] for nivel in self.preguntas_por_nivel}
+            for slot, nivel in enumerate(self.nivel_por_slot):
+                if nivel in self.slots_por_nivel:
+                    self.slots_por_nivel[nivel].append(slot)
+            
+            self.valores_b, self.slots_por_b = self._indexar_por_parametro_b()
+            self.slots_por_categoria = {}
+            for slot, pregunta in enumerate(self.preguntas):
+                self.slots_por_categoria.setdefault(
+                    pregunta.get('categoria', 'Sin categoría'), []
+                ).append(slot)
+            self._estadisticas = None
+        
         self.preguntas_usadas_ids = set()
     
+    @classmethod
+    def obtener_compartido(cls, preguntas_file: str) -> 'QuestionManager':
+        """
+        Obtiene el gestor compartido del banco, cargándolo solo si hace falta
+        
+        Todas las sesiones y reruns del proceso reciben la misma instancia
+        mientras el archivo no cambie (se compara mtime y tamaño). Si el archivo
+        se modifica, se carga una instancia nueva; los exámenes en curso
+        conservan la que ya tenían. La instancia compartida es de solo lectura:
+        el estado de cada sesión vive en su RegistroUso.
+        
+        Args:
+            preguntas_file: Ruta al archivo JSON con las preguntas
+            
+        Returns:
+            QuestionManager compartido para ese archivo
+            
+        Raises:
+            FileNotFoundError: Si el archivo no existe
+            ValueError: Si el formato es inválido
+        """
+        ruta = Path(preguntas_file).resolve()
+        try:
+            info = ruta.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Archivo de preguntas no encontrado: {preguntas_file}")
+        firma = (info.st_mtime_ns, info.st_size)
+        clave = str(ruta)
+        
+        with cls._lock_compartidos:
+            entrada = cls._compartidos.get(clave)
+            if entrada is not None and entrada[0] == firma:
+                return entrada[1]
+            lock_carga = cls._locks_carga.setdefault(clave, threading.Lock())
+        
+        # La carga se serializa solo por banco: los demás bancos siguen disponibles
+        with lock_carga:
+            with cls._lock_compartidos:
+                entrada = cls._compartidos.get(clave)
+                if entrada is not None and entrada[0] == firma:
+                    return entrada[1]
+            
+            gestor = cls(preguntas_file)
+            with cls._lock_compartidos:
+                cls._compartidos[clave] = (firma, gestor)
+            return gestor
+    
+    def _cargar_desde_compilado(self, banco: BancoCompilado):
+        """
+        Toma índices de un banco compilado y expone sus preguntas como vistas perezosas
+        
+        Args:
+            banco: Banco abierto por cargar_banco_compilado
+        """
+        meta = banco.meta
+        self._banco = banco
+        self.preguntas = VistaPreguntas(banco, range(banco.total))
+        self.nivel_por_slot = banco.nivel_por_slot
+        self.slots_por_nivel = meta['slots_por_nivel']
+        self.preguntas_por_nivel = {
+            nivel: VistaPreguntas(banco, slots)
+            for nivel, slots in self.slots_por_nivel.items()
+        }
+        self.slot_por_id = {}
+        for slot, pregunta_id in enumerate(meta['ids']):
+            self.slot_por_id.setdefault(pregunta_id, slot)
+        self.valores_b = meta['valores_b']
+        self.slots_por_b = meta['slots_por_b']
+        self.slots_por_categoria = meta['slots_por_categoria']
+        self._estadisticas = meta['estadisticas']
+    
     def _cargar_preguntas(self) -> List[Dict[str, Any]]:
         """
         Carga las preguntas desde el archivo JSON
@@ -68,56 +234,185 @@ class QuestionManager:
         
         return preguntas_por_nivel
     
+    @staticmethod
+    def parametro_b(pregunta: Dict[str, Any]) -> float:
+        """
+        Parámetro b (dificultad logística) de una pregunta
+        
+        Usa la misma escala que IRTSimplificado: nivel 3 → 0, 0.8 por nivel.
+        
+        Args:
+            pregunta: Diccionario con la pregunta
+            
+        Returns:
+            Valor de b
+        """
+        return (pregunta.get('dificultad', 3) - 3) * 0.8
+    
+    def _indexar_por_parametro_b(self) -> Tuple[List[float], List[List[int]]]:
+        """
+        Construye el índice de preguntas ordenado por parámetro b
+        
+        Returns:
+            Tupla (valores de b distintos ordenados, slots agrupados por ese b)
+        """
+        grupos = {}
+        for slot, pregunta in enumerate(self.preguntas):
+            grupos.setdefault(self.parametro_b(pregunta), []).append(slot)
+        
+        valores_b = sorted(grupos)
+        return valores_b, [grupos[b] for b in valores_b]
+    
+    def crear_registro_uso(self) -> RegistroUso:
+        """
+        Crea un registro vacío de preguntas usadas para una sesión
+        
+        Returns:
+            RegistroUso con todas las preguntas disponibles
+        """
+        return RegistroUso(
+            len(self.preguntas),
+            {nivel: len(slots) for nivel, slots in self.slots_por_nivel.items()}
+        )
+    
+    def marcar_usada(self, registro: RegistroUso, pregunta_id: str) -> None:
+        """
+        Marca una pregunta como usada en el registro de una sesión
+        
+        Args:
+            registro: Registro de la sesión
+            pregunta_id: ID de la pregunta
+        """
+        slot = self.slot_por_id.get(pregunta_id)
+        if slot is not None:
+            registro.marcar(slot, self.nivel_por_slot[slot])
+    
+    def _como_registro(self, preguntas_usadas: Union[List[str], RegistroUso]) -> RegistroUso:
+        """
+        Acepta un RegistroUso o una lista de IDs (se convierte a registro)
+        
+        Args:
+            preguntas_usadas: Registro de la sesión o lista de IDs usados
+            
+        Returns:
+            RegistroUso equivalente
+        """
+        if isinstance(preguntas_usadas, RegistroUso):
+            return preguntas_usadas
+        
+        registro = self.crear_registro_uso()
+        for pregunta_id in preguntas_usadas:
+            self.marcar_usada(registro, pregunta_id)
+        return registro
+    
+    def _elegir_libre(self, slots: Union[List[int], range], registro: RegistroUso) -> Optional[int]:
+        """
+        Elige al azar un slot no usado
+        
+        Usa muestreo con rechazo: como cada sesión usa pocas preguntas frente al
+        tamaño del banco, casi siempre acierta en el primer intento. Solo si el
+        grupo está casi agotado recorre la lista completa.
+        
+        Args:
+            slots: Slots candidatos
+            registro: Registro de la sesión
+            
+        Returns:
+            Slot elegido o None si todos están usados
+        """
+        for _ in range(8):
+            slot = random.choice(slots)
+            if not registro.esta_usada(slot):
+                return slot
+        
+        libres = [slot for slot in slots if not registro.esta_usada(slot)]
+        return random.choice(libres) if libres else None
+    
+    def obtener_pregunta_max_informacion(
+        self,
+        theta: float,
+        preguntas_usadas: Union[List[str], RegistroUso]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la pregunta no usada con mayor información de Fisher en theta
+        
+        En el modelo de 1 parámetro la información p * (1 - p) es máxima cuando b
+        está más cerca de theta, así que basta una búsqueda binaria en el índice
+        ordenado por b y recorrer hacia afuera hasta encontrar una pregunta libre.
+        Entre preguntas con el mismo b se parte de una posición aleatoria para no
+        entregar a todos los estudiantes la misma secuencia.
+        
+        Args:
+            theta: Habilidad actual del estudiante
+            preguntas_usadas: Registro de la sesión o lista de IDs ya usados
+            
+        Returns:
+            Diccionario con la pregunta o None si no hay preguntas disponibles
+        """
+        registro = self._como_registro(preguntas_usadas)
+        if registro.total_restantes == 0:
+            return None
+        
+        derecha = bisect.bisect_left(self.valores_b, theta)
+        izquierda = derecha - 1
+        
+        while izquierda >= 0 or derecha < len(self.valores_b):
+            # Elegir el grupo de b más cercano a theta entre los dos frentes
+            if derecha >= len(self.valores_b) or (
+                izquierda >= 0 and
+                theta - self.valores_b[izquierda] <= self.valores_b[derecha] - theta
+            ):
+                grupo = self.slots_por_b[izquierda]
+                izquierda -= 1
+            else:
+                grupo = self.slots_por_b[derecha]
+                derecha += 1
+            
+            inicio = random.randrange(len(grupo))
+            for k in range(len(grupo)):
+                slot = grupo[(inicio + k) % len(grupo)]
+                if not registro.esta_usada(slot):
+                    return self.preguntas[slot]
+        
+        return None
+    
     def obtener_pregunta_por_nivel(
         self, 
         nivel: int, 
-        preguntas_usadas: List[str]
+        preguntas_usadas: Union[List[str], RegistroUso]
     ) -> Optional[Dict[str, Any]]:
         """
         Obtiene una pregunta aleatoria del nivel especificado que no haya sido usada
         
         Args:
             nivel: Nivel de dificultad deseado (1-5)
-            preguntas_usadas: Lista de IDs de preguntas ya usadas
+            preguntas_usadas: Registro de la sesión o lista de IDs ya usados
             
         Returns:
             Diccionario con la pregunta o None si no hay preguntas disponibles
         """
+        registro = self._como_registro(preguntas_usadas)
+        
         # Asegurar que el nivel esté en rango válido
         nivel = max(1, min(5, nivel))
         
-        # Obtener preguntas del nivel que no han sido usadas
-        preguntas_disponibles = [
-            p for p in self.preguntas_por_nivel[nivel]
-            if p['id'] not in preguntas_usadas
-        ]
-        
-        # Si no hay preguntas disponibles en este nivel exacto, buscar en niveles cercanos
-        if not preguntas_disponibles:
-            # Intentar niveles adyacentes
-            for offset in [1, -1, 2, -2]:
-                nivel_alternativo = nivel + offset
-                if 1 <= nivel_alternativo <= 5:
-                    preguntas_disponibles = [
-                        p for p in self.preguntas_por_nivel[nivel_alternativo]
-                        if p['id'] not in preguntas_usadas
-                    ]
-                    if preguntas_disponibles:
-                        break
+        # Nivel exacto y, si está agotado, niveles adyacentes
+        slot = None
+        for offset in [0, 1, -1, 2, -2]:
+            nivel_candidato = nivel + offset
+            if registro.restantes(nivel_candidato) > 0:
+                slot = self._elegir_libre(self.slots_por_nivel[nivel_candidato], registro)
+                break
         
         # Si aún no hay preguntas disponibles, buscar en cualquier nivel
-        if not preguntas_disponibles:
-            preguntas_disponibles = [
-                p for p in self.preguntas
-                if p['id'] not in preguntas_usadas
-            ]
+        if slot is None and registro.total_restantes > 0:
+            slot = self._elegir_libre(range(len(self.preguntas)), registro)
         
         # Si no hay preguntas disponibles en absoluto
-        if not preguntas_disponibles:
+        if slot is None:
             return None
         
-        # Seleccionar una pregunta aleatoria
-        return random.choice(preguntas_disponibles)
+        return self.preguntas[slot]
     
     def obtener_pregunta_por_id(self, pregunta_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -129,10 +424,36 @@ class QuestionManager:
         Returns:
             Diccionario con la pregunta o None si no existe
         """
-        for pregunta in self.preguntas:
-            if pregunta['id'] == pregunta_id:
-                return pregunta
-        return None
+        slot = self.slot_por_id.get(pregunta_id)
+        return self.preguntas[slot] if slot is not None else None
+    
+    def id_de(self, slot: int) -> str:
+        """
+        ID de la pregunta en un slot (sin decodificar la pregunta completa)
+        
+        Args:
+            slot: Posición de la pregunta en el banco
+            
+        Returns:
+            ID de la pregunta
+        """
+        if self._banco is not None:
+            return self._banco.meta['ids'][slot]
+        return self.preguntas[slot]['id']
+    
+    def categoria_de(self, slot: int) -> str:
+        """
+        Categoría de la pregunta en un slot (sin decodificar la pregunta completa)
+        
+        Args:
+            slot: Posición de la pregunta en el banco
+            
+        Returns:
+            Nombre de la categoría
+        """
+        if self._banco is not None:
+            return self._banco.meta['categorias'][self._banco.categoria_por_slot[slot]]
+        return self.preguntas[slot].get('categoria', 'Sin categoría')
     
     def obtener_estadisticas_banco(self) -> Dict[str, Any]:
         """
@@ -141,10 +462,13 @@ class QuestionManager:
         Returns:
             Diccionario con estadísticas
         """
-        categorias = {}
-        for pregunta in self.preguntas:
-            categoria = pregunta.get('categoria', 'Sin categoría')
-            categorias[categoria] = categorias.get(categoria, 0) + 1
+        if self._estadisticas is not None:
+            return copy.deepcopy(self._estadisticas)
+        
+        categorias = {
+            categoria: len(slots)
+            for categoria, slots in self.slots_por_categoria.items()
+        }
         
         return {
             'total_preguntas': len(self.preguntas),
@@ -202,10 +526,13 @@ class QuestionManager:
         Returns:
             Lista de preguntas de la categoría
         """
-        return [
-            p for p in self.preguntas
-            if p.get('categoria', '').lower() == categoria.lower()
-        ]
+        slots = sorted(
+            slot
+            for nombre, slots_categoria in self.slots_por_categoria.items()
+            if nombre.lower() == categoria.lower()
+            for slot in slots_categoria
+        )
+        return [self.preguntas[slot] for slot in slots]
     
     def obtener_categorias(self) -> List[str]:
         """
@@ -214,39 +541,40 @@ class QuestionManager:
         Returns:
             Lista de categorías únicas
         """
-        categorias = set()
-        for pregunta in self.preguntas:
-            categoria = pregunta.get('categoria', 'Sin categoría')
-            categorias.add(categoria)
-        return sorted(list(categorias))
+        return sorted(self.slots_por_categoria)
     
     def reiniciar_preguntas_usadas(self):
-        """Reinicia el conjunto de preguntas usadas"""
+        """
+        Reinicia el conjunto de preguntas usadas
+        
+        No usar con el gestor compartido: el estado por sesión va en RegistroUso.
+        """
         self.preguntas_usadas_ids.clear()
     
     def marcar_pregunta_usada(self, pregunta_id: str):
         """
         Marca una pregunta como usada
         
+        No usar con el gestor compartido: el estado por sesión va en RegistroUso.
+        
         Args:
             pregunta_id: ID de la pregunta
         """
         self.preguntas_usadas_ids.add(pregunta_id)
     
-    def hay_preguntas_disponibles(self, nivel: int, preguntas_usadas: List[str]) -> bool:
+    def hay_preguntas_disponibles(
+        self,
+        nivel: int,
+        preguntas_usadas: Union[List[str], RegistroUso]
+    ) -> bool:
         """
         Verifica si hay preguntas disponibles en un nivel
         
         Args:
             nivel: Nivel de dificultad
-            preguntas_usadas: Lista de IDs de preguntas ya usadas
+            preguntas_usadas: Registro de la sesión o lista de IDs ya usados
             
         Returns:
             True si hay preguntas disponibles
         """
-        nivel = max(1, min(5, nivel))
-        preguntas_disponibles = [
-            p for p in self.preguntas_por_nivel[nivel]
-            if p['id'] not in preguntas_usadas
-        ]
-        return len(preguntas_disponibles) > 0
+        return self._como_registro(preguntas_usadas).restantes(nivel) > 0
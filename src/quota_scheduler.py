@@ -0,0 +1,249 @@
+"""
+Planificador de Cuota
+Ritmo de las llamadas a Google Sheets según la cuota por minuto, con
+prioridades y reintentos ante errores 429
+"""
+import contextvars
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+# Clases de prioridad (menor = antes)
+PRIORIDAD_FINAL = 0      # Resultado final del examen
+PRIORIDAD_INICIO = 1     # Validación de ingreso e inicio del examen
+PRIORIDAD_PROGRESO = 2   # Progreso y consultas sin estudiante esperando
+
+# Estados HTTP que se reintentan
+REINTENTABLES = {429, 500, 502, 503, 504}
+
+_prioridad = contextvars.ContextVar('prioridad_sheets', default=PRIORIDAD_PROGRESO)
+
+
+@contextmanager
+def con_prioridad(prioridad: int):
+    """
+    Fija la prioridad de las llamadas a Sheets hechas dentro del bloque
+
+    También sirve como decorador de métodos.
+
+    Args:
+        prioridad: PRIORIDAD_FINAL, PRIORIDAD_INICIO o PRIORIDAD_PROGRESO
+    """
+    token = _prioridad.set(prioridad)
+    try:
+        yield
+    finally:
+        _prioridad.reset(token)
+
+
+def prioridad_actual() -> int:
+    """Prioridad vigente en el contexto actual"""
+    return _prioridad.get()
+
+
+class CuboTokens:
+    """Cubo de tokens que se recarga de forma continua a `por_minuto` tokens por minuto"""
+
+    def __init__(self, por_minuto: float, rafaga: float):
+        """
+        Args:
+            por_minuto: Tokens por minuto
+            rafaga: Capacidad del cubo (llamadas seguidas sin esperar)
+        """
+        self.tasa = por_minuto / 60.0
+        self.capacidad = rafaga
+        self.tokens = rafaga
+        self._ultimo = time.monotonic()
+
+    def _recargar(self, ahora: float):
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def espera(self) -> float:
+        """Segundos hasta que haya un token disponible (0 si ya lo hay)"""
+        self._recargar(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.tasa
+
+    def consumir(self):
+        """Toma un token (debe haberse comprobado antes con espera())"""
+        self.tokens -= 1
+
+    def vaciar(self):
+        """Descarta los tokens acumulados (tras un 429)"""
+        self._recargar(time.monotonic())
+        self.tokens = min(self.tokens, 0.0)
+
+
+class PlanificadorCuota:
+    """
+    Planificador central de las llamadas a Google Sheets
+
+    Mantiene un cubo de tokens para lecturas y otro para escrituras (la API
+    cuenta las cuotas por separado). Cuando no hay tokens, las llamadas
+    esperan en orden de prioridad y, dentro de la misma prioridad, en orden
+    de llegada. Los errores 429 y 5xx se reintentan con espera exponencial y
+    jitter completo; un 429 además vacía el cubo para frenar al resto de
+    llamadas del proceso.
+
+    Los cubos no se comparten entre procesos: con varios procesos que usan
+    la misma cuenta, por_minuto debe ser la cuota de la cuenta dividida por
+    el número de procesos.
+    """
+
+    _compartido: Optional['PlanificadorCuota'] = None
+    _lock_compartido = threading.Lock()
+
+    def __init__(
+        self,
+        por_minuto: float = 60,
+        rafaga: Optional[float] = None,
+        max_reintentos: int = 5,
+        espera_base: float = 1.0,
+        espera_maxima: float = 32.0,
+        semilla: Optional[int] = None
+    ):
+        """
+        Args:
+            por_minuto: Llamadas por minuto permitidas a este proceso (de lectura y de escritura)
+            rafaga: Capacidad de cada cubo (por defecto, un cuarto de minuto de cuota)
+            max_reintentos: Reintentos ante 429/5xx antes de propagar el error
+            espera_base: Espera del primer reintento en segundos
+            espera_maxima: Tope de la espera exponencial en segundos
+            semilla: Semilla del jitter
+        """
+        rafaga = rafaga if rafaga is not None else max(1.0, por_minuto / 4)
+        self._cubos = {
+            'lectura': CuboTokens(por_minuto, rafaga),
+            'escritura': CuboTokens(por_minuto, rafaga)
+        }
+        self._turnos = {'lectura': [], 'escritura': []}
+        self._secuencia = itertools.count()
+        self._condicion = threading.Condition()
+        self._random = random.Random(semilla)
+
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+        # Contadores para monitoreo
+        self.ejecutadas = 0
+        self.limitadas = 0      # Tuvieron que esperar un token
+        self.reintentadas = 0   # Reintentos tras 429/5xx
+        self.errores_cuota = 0  # Respuestas 429 recibidas
+        self.fallidas = 0       # Errores propagados tras agotar los reintentos
+
+    @classmethod
+    def compartido(cls, por_minuto: float = 60) -> 'PlanificadorCuota':
+        """
+        Planificador del proceso (la cuota de Sheets es por proyecto y cuenta)
+
+        Args:
+            por_minuto: Cuota de este proceso; se usa solo si el planificador
+                aún no existe
+
+        Returns:
+            PlanificadorCuota compartido
+        """
+        with cls._lock_compartido:
+            if cls._compartido is None:
+                cls._compartido = cls(por_minuto)
+            return cls._compartido
+
+    def _adquirir(self, tipo: str, prioridad: int):
+        """Espera su turno y un token del cubo del tipo de llamada"""
+        turno = (prioridad, next(self._secuencia))
+        cubo = self._cubos[tipo]
+        turnos = self._turnos[tipo]
+
+        with self._condicion:
+            heapq.heappush(turnos, turno)
+            espero = False
+
+            while True:
+                if turnos[0] == turno:
+                    espera = cubo.espera()
+                    if espera <= 0:
+                        cubo.consumir()
+                        heapq.heappop(turnos)
+                        self._condicion.notify_all()
+                        break
+                else:
+                    espera = None  # Lo despertará quien tenga el turno
+                espero = True
+                self._condicion.wait(espera)
+
+            if espero:
+                self.limitadas += 1
+
+    def ejecutar(
+        self,
+        funcion: Callable[[], Any],
+        prioridad: Optional[int] = None,
+        escritura: bool = False
+    ) -> Any:
+        """
+        Ejecuta una llamada respetando la cuota y reintentando 429/5xx
+
+        Args:
+            funcion: Llamada sin argumentos (p. ej. solicitud.execute)
+            prioridad: Clase de prioridad (por defecto, la del contexto)
+            escritura: Si consume la cuota de escritura
+
+        Returns:
+            Resultado de la llamada
+        """
+        tipo = 'escritura' if escritura else 'lectura'
+        if prioridad is None:
+            prioridad = prioridad_actual()
+
+        intento = 0
+        while True:
+            self._adquirir(tipo, prioridad)
+            try:
+                resultado = funcion()
+                with self._condicion:
+                    self.ejecutadas += 1
+                return resultado
+
+            except HttpError as e:
+                status = e.resp.status
+                with self._condicion:
+                    if status == 429:
+                        self.errores_cuota += 1
+                        self._cubos[tipo].vaciar()
+                    if status not in REINTENTABLES or intento >= self.max_reintentos:
+                        self.fallidas += 1
+                        raise
+                    self.reintentadas += 1
+                    espera = self._random.uniform(
+                        0, min(self.espera_maxima, self.espera_base * 2 ** intento)
+                    )
+
+                logger.warning(
+                    "Sheets respondió %s; reintento %d en %.1f s", status, intento + 1, espera
+                )
+                intento += 1
+                time.sleep(espera)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Contadores del planificador"""
+        with self._condicion:
+            return {
+                'ejecutadas': self.ejecutadas,
+                'limitadas': self.limitadas,
+                'reintentadas': self.reintentadas,
+                'errores_cuota': self.errores_cuota,
+                'fallidas': self.fallidas,
+                'en_espera': sum(len(turnos) for turnos in self._turnos.values())
+            }
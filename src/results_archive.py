@@ -0,0 +1,41 @@
+"""
+Archivo de Resultados
+Saca de la zona activa los resultados de periodos cerrados de un examen
+"""
+import argparse
+import json
+from pathlib import Path
+
+from data_persistence import DataPersistence, examen_id_de
+from sqlite_persistence import SQLitePersistence
+
+
+def main():
+    """Punto de entrada de línea de comandos: archiva un periodo cerrado de un examen"""
+    parser = argparse.ArgumentParser(
+        description="Archiva los resultados de un periodo cerrado de un examen"
+    )
+    parser.add_argument('config', help="Ruta a la configuración del examen (config/examenes/<id>.json)")
+    parser.add_argument('periodo', help="Periodo cerrado a archivar (p. ej. 2024-2)")
+    parser.add_argument('--destino', help="Spreadsheet de archivo (solo google_sheets; "
+                                          "si no se indica, la hoja se renombra y se oculta)")
+    args = parser.parse_args()
+
+    ruta_config = Path(args.config)
+    with open(ruta_config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config['_examen_id'] = ruta_config.stem
+
+    particion = f"{examen_id_de(config)}_{args.periodo}"
+
+    if config['persistencia']['metodo'] == 'sqlite':
+        archivadas = SQLitePersistence(config).archivar_particion(particion)
+        print(f"✅ {archivadas} resultados de {particion} movidos a resultados_archivo")
+    else:
+        hoja = DataPersistence(config).archivar_particion(particion, args.destino)
+        print(f"✅ Hoja de {particion} archivada como {hoja}"
+              + (f" en {args.destino}" if args.destino else ""))
+
+
+if __name__ == '__main__':
+    main()
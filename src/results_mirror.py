@@ -0,0 +1,402 @@
+"""
+Espejo de Resultados
+Copia local (SQLite) de las filas de una hoja de resultados: fila, código y
+estado, más los agregados de notas que publica la hoja Resumen
+"""
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from app_dirs import directorio_privado, es_propio
+
+
+def _directorio_espejo() -> Path:
+    """Directorio privado de los espejos, compartido por los procesos del usuario"""
+    return directorio_privado('espejo', 'EXAMENES_DIR_ESPEJO')
+
+
+class EspejoResultados:
+    """
+    Espejo local codigo_estudiante -> filas y estado de una hoja de resultados
+
+    Vive en un archivo SQLite (modo WAL) de un directorio privado del
+    usuario, compartido por todos sus procesos, de modo que las filas que
+    cualquiera de ellos agrega o finaliza quedan visibles para los demás sin leer la hoja. Las filas de
+    otras máquinas o los cambios manuales se incorporan con lecturas
+    incrementales: la cola de filas nuevas y el estado de las filas EN_CURSO.
+    Asume que las filas de la hoja no se reordenan ni se borran.
+
+    También acumula los agregados del resumen por examen y sistema de
+    calificación. Cada resultado se cuenta una sola vez (tabla contados),
+    así que una siembra desde la hoja y los guardados concurrentes de
+    cualquier proceso pueden llegar en cualquier orden.
+    """
+
+    _espejos: Dict[str, 'EspejoResultados'] = {}
+    _lock_espejos = threading.Lock()
+
+    def __init__(self, ruta: str):
+        """
+        Abre (o crea) el espejo
+
+        Args:
+            ruta: Ruta del archivo SQLite o ':memory:'
+        """
+        self.ruta = ruta
+        self.lock = threading.RLock()
+        self._conexion = sqlite3.connect(
+            ruta,
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        if ruta != ':memory:':
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS filas (
+                fila INTEGER PRIMARY KEY,
+                codigo TEXT NOT NULL,
+                estado TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_filas_codigo ON filas (codigo, fila);
+            CREATE TABLE IF NOT EXISTS meta (
+                clave TEXT PRIMARY KEY,
+                valor REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS contados (
+                examen_id TEXT NOT NULL,
+                clave TEXT NOT NULL,
+                PRIMARY KEY (examen_id, clave)
+            );
+            CREATE TABLE IF NOT EXISTS agregados (
+                examen_id TEXT NOT NULL,
+                sistema_calificacion TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                suma_nota REAL NOT NULL,
+                suma_cuadrados_nota REAL NOT NULL,
+                nota_minima REAL NOT NULL,
+                nota_maxima REAL NOT NULL,
+                suma_preguntas INTEGER NOT NULL,
+                PRIMARY KEY (examen_id, sistema_calificacion)
+            );
+        """)
+
+    @classmethod
+    def para(cls, spreadsheet_id: str, hoja: str = 'Resultados') -> 'EspejoResultados':
+        """
+        Obtiene el espejo compartido de una hoja de resultados
+
+        Si el directorio privado no se puede usar (o el archivo del espejo no
+        pertenece al usuario), usa un espejo en memoria (propio del proceso).
+
+        Args:
+            spreadsheet_id: ID del spreadsheet
+            hoja: Hoja de resultados
+
+        Returns:
+            EspejoResultados de la hoja
+        """
+        clave = spreadsheet_id if hoja == 'Resultados' else f"{spreadsheet_id}/{hoja}"
+        with cls._lock_espejos:
+            espejo = cls._espejos.get(clave)
+            if espejo is None:
+                nombre = hashlib.sha256(clave.encode('utf-8')).hexdigest()[:16]
+                try:
+                    ruta = _directorio_espejo() / f"resultados-{nombre}.sqlite3"
+                    if ruta.exists() and not es_propio(ruta):
+                        raise PermissionError(f"{ruta} no pertenece al usuario actual")
+                    espejo = cls(str(ruta))
+                except (OSError, sqlite3.Error):
+                    espejo = cls(':memory:')
+                cls._espejos[clave] = espejo
+            return espejo
+
+    def _meta(self, clave: str) -> float:
+        """Lee un valor de la tabla meta (0 si no existe)"""
+        fila = self._conexion.execute(
+            "SELECT valor FROM meta WHERE clave = ?", (clave,)
+        ).fetchone()
+        return fila[0] if fila else 0
+
+    def _guardar_meta(self, clave: str, valor: float):
+        """Escribe un valor en la tabla meta"""
+        self._conexion.execute(
+            "INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, valor)
+        )
+
+    @property
+    def filas_leidas(self) -> int:
+        """Última fila de la hoja incorporada por lectura incremental"""
+        with self.lock:
+            return int(self._meta('filas_leidas'))
+
+    def registrar(self, fila: int, codigo: str, estado: str):
+        """
+        Registra (o actualiza) una fila
+
+        Args:
+            fila: Número de fila en la hoja (1-indexed)
+            codigo: Código del estudiante
+            estado: Valor de Razon_Terminacion (columna O)
+        """
+        with self.lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO filas (fila, codigo, estado) VALUES (?, ?, ?)",
+                (fila, codigo, estado)
+            )
+
+    def procesar_filas(self, inicio: int, filas: List[List[Any]]):
+        """
+        Incorpora filas leídas de la hoja (columnas B:O)
+
+        Args:
+            inicio: Número de la primera fila leída
+            filas: Valores leídos, una lista por fila
+        """
+        registros = [
+            (inicio + i, valores[0], valores[13] if len(valores) > 13 else '')
+            for i, valores in enumerate(filas)
+            if inicio + i > 1 and valores and valores[0]  # Encabezado o fila vacía
+        ]
+
+        with self.lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                # La lectura pudo hacerse antes de que este proceso finalizara
+                # la fila: un estado final ya registrado no vuelve a EN_CURSO
+                self._conexion.executemany(
+                    """
+                    INSERT INTO filas (fila, codigo, estado) VALUES (?, ?, ?)
+                    ON CONFLICT (fila) DO UPDATE SET
+                        codigo = excluded.codigo,
+                        estado = CASE
+                            WHEN excluded.estado = 'EN_CURSO' AND filas.codigo = excluded.codigo
+                                 AND filas.estado NOT IN ('EN_CURSO', '')
+                            THEN filas.estado ELSE excluded.estado
+                        END
+                    """,
+                    registros
+                )
+                self._guardar_meta(
+                    'filas_leidas',
+                    max(self._meta('filas_leidas'), inicio + len(filas) - 1)
+                )
+                self._conexion.execute("COMMIT")
+            except Exception:
+                self._conexion.execute("ROLLBACK")
+                raise
+
+    def reiniciar(self):
+        """Descarta todas las filas para volver a indexar la hoja desde el principio"""
+        with self.lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                self._conexion.execute("DELETE FROM filas")
+                self._guardar_meta('filas_leidas', 0)
+                self._conexion.execute("COMMIT")
+            except Exception:
+                self._conexion.execute("ROLLBACK")
+                raise
+
+    def actualizar_estados(self, inicio: int, estados: List[str]):
+        """
+        Actualiza el estado de filas ya conocidas a partir de una lectura de la columna O
+
+        Args:
+            inicio: Número de la primera fila leída
+            estados: Estado de cada fila desde inicio
+        """
+        with self.lock:
+            # Igual que en procesar_filas: una lectura anterior a la
+            # finalización no devuelve la fila a EN_CURSO
+            self._conexion.executemany(
+                """
+                UPDATE filas SET estado = CASE
+                    WHEN :estado = 'EN_CURSO' AND estado NOT IN ('EN_CURSO', '')
+                    THEN estado ELSE :estado
+                END
+                WHERE fila = :fila
+                """,
+                [{'estado': estado, 'fila': inicio + i} for i, estado in enumerate(estados)]
+            )
+
+    def primera_fila_en_curso(self) -> Optional[int]:
+        """Fila EN_CURSO más antigua, o None"""
+        with self.lock:
+            fila = self._conexion.execute(
+                "SELECT MIN(fila) FROM filas WHERE estado = 'EN_CURSO'"
+            ).fetchone()
+            return fila[0] if fila else None
+
+    def fila_en_curso(self, codigo: str) -> Optional[int]:
+        """Última fila EN_CURSO del estudiante, o None"""
+        with self.lock:
+            fila = self._conexion.execute(
+                "SELECT MAX(fila) FROM filas WHERE codigo = ? AND estado = 'EN_CURSO'",
+                (codigo,)
+            ).fetchone()
+            return fila[0] if fila else None
+
+    def filas_de(self, codigo: str) -> List[int]:
+        """Filas del estudiante en orden ascendente"""
+        with self.lock:
+            return [
+                fila for (fila,) in self._conexion.execute(
+                    "SELECT fila FROM filas WHERE codigo = ? ORDER BY fila", (codigo,)
+                )
+            ]
+
+    def tiene_completado(self, codigo: str) -> bool:
+        """Si el estudiante tiene alguna fila finalizada (estado distinto de EN_CURSO)"""
+        with self.lock:
+            fila = self._conexion.execute(
+                "SELECT 1 FROM filas WHERE codigo = ? AND estado NOT IN ('EN_CURSO', '') LIMIT 1",
+                (codigo,)
+            ).fetchone()
+            return fila is not None
+
+    def reclamar_sincronizacion(self, vigencia: float) -> bool:
+        """
+        Decide si este proceso debe refrescar el espejo
+
+        Si la última sincronización tiene más de `vigencia` segundos, la marca
+        como hecha ahora y devuelve True; así, cuando muchos estudiantes entran
+        a la vez, solo un proceso de la máquina lee la hoja.
+
+        Args:
+            vigencia: Segundos durante los que el espejo se considera al día
+
+        Returns:
+            True si quien llama debe sincronizar
+        """
+        with self.lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                ahora = time.time()
+                vencido = ahora - self._meta('ultima_sincronizacion') >= vigencia
+                if vencido:
+                    self._guardar_meta('ultima_sincronizacion', ahora)
+                self._conexion.execute("COMMIT")
+            except Exception:
+                self._conexion.execute("ROLLBACK")
+                raise
+            return vencido
+
+    def marcar_vencido(self):
+        """Fuerza una sincronización en la próxima consulta (p. ej. tras un error)"""
+        with self.lock:
+            self._guardar_meta('ultima_sincronizacion', 0)
+
+    @property
+    def origen(self) -> str:
+        """Identificador de este espejo en la hoja Resumen (se crea la primera vez)"""
+        with self.lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                valor = int(self._meta('origen'))
+                if not valor:
+                    valor = random.getrandbits(48) + 1
+                    self._guardar_meta('origen', valor)
+                self._conexion.execute("COMMIT")
+            except Exception:
+                self._conexion.execute("ROLLBACK")
+                raise
+            return f"{valor:012x}"
+
+    def resumen_sembrado(self, examen_id: str) -> bool:
+        """Si los agregados del examen ya se sembraron (ver acumular)"""
+        with self.lock:
+            return bool(self._meta(f'sembrado:{examen_id}'))
+
+    def _acumular(self, examen_id: str, registros: List[Tuple[str, str, float, int]]):
+        """Suma a los agregados los resultados aún no contados (dentro de una transacción)"""
+        for clave, sistema, nota, preguntas in registros:
+            nuevo = self._conexion.execute(
+                "INSERT OR IGNORE INTO contados (examen_id, clave) VALUES (?, ?)",
+                (examen_id, clave)
+            ).rowcount
+            if not nuevo:
+                continue
+            self._conexion.execute(
+                """
+                INSERT INTO agregados VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+                ON CONFLICT (examen_id, sistema_calificacion) DO UPDATE SET
+                    total = total + 1,
+                    suma_nota = suma_nota + excluded.suma_nota,
+                    suma_cuadrados_nota = suma_cuadrados_nota + excluded.suma_cuadrados_nota,
+                    nota_minima = MIN(nota_minima, excluded.nota_minima),
+                    nota_maxima = MAX(nota_maxima, excluded.nota_maxima),
+                    suma_preguntas = suma_preguntas + excluded.suma_preguntas
+                """,
+                (examen_id, sistema, nota, nota * nota, nota, nota, preguntas)
+            )
+
+    def acumular(
+        self,
+        examen_id: str,
+        registros: List[Tuple[str, str, float, int]],
+        sembrar: bool = False
+    ):
+        """
+        Suma resultados finales a los agregados del examen
+
+        Un resultado ya contado (misma clave) se ignora. Con sembrar=True
+        además se marca el examen como sembrado, salvo que otro proceso ya lo
+        haya hecho (entonces los registros no se suman).
+
+        Args:
+            examen_id: ID del examen
+            registros: (clave del resultado, sistema_calificacion, nota_final,
+                preguntas_respondidas) por resultado
+            sembrar: Si los registros son la siembra inicial desde la hoja
+        """
+        with self.lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                if not (sembrar and self._meta(f'sembrado:{examen_id}')):
+                    self._acumular(examen_id, registros)
+                if sembrar:
+                    self._guardar_meta(f'sembrado:{examen_id}', 1)
+                self._conexion.execute("COMMIT")
+            except Exception:
+                self._conexion.execute("ROLLBACK")
+                raise
+
+    def reemplazar_resumen(self, examen_id: str, registros: List[Tuple[str, str, float, int]]):
+        """
+        Recalcula desde cero los agregados de un examen (y lo marca como sembrado)
+
+        Args:
+            examen_id: ID del examen
+            registros: Todos sus resultados finales, como en acumular
+        """
+        with self.lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                self._conexion.execute("DELETE FROM contados WHERE examen_id = ?", (examen_id,))
+                self._conexion.execute("DELETE FROM agregados WHERE examen_id = ?", (examen_id,))
+                self._acumular(examen_id, registros)
+                self._guardar_meta(f'sembrado:{examen_id}', 1)
+                self._conexion.execute("COMMIT")
+            except Exception:
+                self._conexion.execute("ROLLBACK")
+                raise
+
+    def agregados(self, examen_id: str) -> List[Tuple]:
+        """
+        Agregados del examen, uno por sistema de calificación
+
+        Returns:
+            Tuplas (examen_id, sistema, total, suma_nota, suma_cuadrados_nota,
+            nota_minima, nota_maxima, suma_preguntas)
+        """
+        with self.lock:
+            return self._conexion.execute(
+                "SELECT * FROM agregados WHERE examen_id = ? ORDER BY sistema_calificacion",
+                (examen_id,)
+            ).fetchall()
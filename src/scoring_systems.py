@@ -1,9 +1,9 @@
 """
 Sistemas de Calificación
-Implementa IRT Simplificado, Elo y sistema Híbrido
+Implementa IRT Simplificado, IRT Bayesiano, Elo y sistema Híbrido
 """
 import math
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Tuple, Any, Optional
 from abc import ABC, abstractmethod
 
 
@@ -24,6 +24,46 @@ class ScoringSystem(ABC):
     def obtener_estadisticas(self, respuestas: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Obtiene estadísticas adicionales del desempeño"""
         pass
+    
+    def registrar_respuesta(self, respuesta: Dict[str, Any]) -> None:
+        """
+        Incorpora una respuesta nueva al estado incremental del sistema
+        
+        Los sistemas sin estado incremental no necesitan sobrescribirlo:
+        siguen recibiendo la lista completa en calcular_nota_parcial.
+        
+        Args:
+            respuesta: Diccionario con 'dificultad' y 'correcta'
+        """
+        pass
+    
+    def reiniciar(self) -> None:
+        """Descarta el estado incremental acumulado"""
+        pass
+    
+    def theta_actual(self, respuestas: List[Dict[str, Any]]) -> Optional[float]:
+        """
+        Habilidad actual en la escala logística de IRT (usada para elegir preguntas)
+        
+        Args:
+            respuestas: Lista de respuestas
+            
+        Returns:
+            Theta estimado, o None si el sistema no lo estima
+        """
+        return None
+    
+    def error_estandar(self, respuestas: List[Dict[str, Any]]) -> Optional[float]:
+        """
+        Error estándar de la habilidad estimada
+        
+        Args:
+            respuestas: Lista de respuestas
+            
+        Returns:
+            Error estándar de theta, o None si el sistema no lo estima
+        """
+        return None
 
 
 class IRTSimplificado(ScoringSystem):
@@ -44,6 +84,50 @@ class IRTSimplificado(ScoringSystem):
         self.max_iteraciones = max_iteraciones
         self.theta_min = -3.0
         self.theta_max = 3.0
+        self.reiniciar()
+    
+    def reiniciar(self) -> None:
+        """Descarta los estadísticos suficientes acumulados"""
+        # En el modelo de 1 parámetro la verosimilitud solo depende de
+        # (correctas, total) por nivel de dificultad: {dificultad: [correctas, total]}
+        self._conteos: Dict[int, List[int]] = {}
+        self._total_registradas = 0
+        self._ultima_registrada: Optional[Dict[str, Any]] = None
+        self._theta_actual = 0.0
+    
+    def registrar_respuesta(self, respuesta: Dict[str, Any]) -> None:
+        """
+        Actualiza los conteos por nivel y re-estima theta partiendo del valor anterior
+        
+        El costo es O(niveles) sin importar cuántas preguntas lleve el examen.
+        
+        Args:
+            respuesta: Diccionario con 'dificultad' y 'correcta'
+        """
+        self._sumar_conteo(self._conteos, respuesta)
+        self._total_registradas += 1
+        self._ultima_registrada = respuesta
+        
+        # Arranque en caliente: el theta anterior ya está cerca del nuevo óptimo.
+        # Si estaba en un límite (todas correctas o todas incorrectas) no existía
+        # máximo finito y Newton oscilaría desde ahí, así que se parte de 0
+        theta_inicial = self._theta_actual
+        if not (self.theta_min < theta_inicial < self.theta_max):
+            theta_inicial = 0.0
+        self._theta_actual = self._newton_raphson(self._conteos, theta_inicial)
+    
+    def _estado_sincronizado(self, respuestas: List[Dict[str, Any]]) -> bool:
+        """
+        Indica si el estado incremental corresponde a la lista de respuestas
+        
+        Además del largo se compara la última respuesta (el mismo objeto que
+        se registró), de modo que otra lista del mismo largo se recalcula.
+        """
+        return (
+            self._total_registradas > 0
+            and self._total_registradas == len(respuestas)
+            and respuestas[-1] is self._ultima_registrada
+        )
     
     def probabilidad_respuesta_correcta(self, theta: float, dificultad: int) -> float:
         """
@@ -82,28 +166,55 @@ class IRTSimplificado(ScoringSystem):
             return 0.0
         
         # Iniciar con theta = 0 (habilidad promedio)
-        theta = 0.0
+        return self._newton_raphson(self._agrupar_por_dificultad(respuestas), 0.0)
+    
+    def _agrupar_por_dificultad(self, respuestas: List[Dict[str, Any]]) -> Dict[int, List[int]]:
+        """
+        Reduce la lista de respuestas a sus estadísticos suficientes
         
+        Args:
+            respuestas: Lista de respuestas
+            
+        Returns:
+            Diccionario {dificultad: [correctas, total]}
+        """
+        conteos = {}
+        for respuesta in respuestas:
+            self._sumar_conteo(conteos, respuesta)
+        return conteos
+    
+    def _sumar_conteo(self, conteos: Dict[int, List[int]], respuesta: Dict[str, Any]) -> None:
+        """Suma una respuesta a los conteos {dificultad: [correctas, total]}"""
+        conteo = conteos.setdefault(respuesta['dificultad'], [0, 0])
+        if respuesta['correcta']:
+            conteo[0] += 1
+        conteo[1] += 1
+    
+    def _newton_raphson(self, conteos: Dict[int, List[int]], theta: float) -> float:
+        """
+        Maximiza la log-verosimilitud a partir de los conteos por dificultad
+        
+        Args:
+            conteos: Diccionario {dificultad: [correctas, total]}
+            theta: Valor inicial de theta
+            
+        Returns:
+            Estimación de theta (habilidad)
+        """
         for _ in range(self.max_iteraciones):
             # Calcular primera y segunda derivada de la log-verosimilitud
             primera_derivada = 0.0
             segunda_derivada = 0.0
             
-            for respuesta in respuestas:
-                dificultad = respuesta['dificultad']
-                correcta = respuesta['correcta']
-                
+            for dificultad, (correctas, total) in conteos.items():
                 p = self.probabilidad_respuesta_correcta(theta, dificultad)
                 
                 # Evitar divisiones por cero
                 p = max(0.001, min(0.999, p))
                 
-                if correcta:
-                    primera_derivada += (1 - p)
-                    segunda_derivada -= p * (1 - p)
-                else:
-                    primera_derivada -= p
-                    segunda_derivada -= p * (1 - p)
+                # Cada correcta aporta (1 - p) y cada incorrecta -p
+                primera_derivada += correctas - total * p
+                segunda_derivada -= total * p * (1 - p)
             
             # Evitar división por cero
             if abs(segunda_derivada) < 0.001:
@@ -141,6 +252,21 @@ class IRTSimplificado(ScoringSystem):
         
         return round(max(0.0, min(5.0, nota)), 2)
     
+    def nota_a_theta(self, nota: float) -> float:
+        """
+        Convierte una nota 0-5 al theta correspondiente (inversa de theta_a_nota)
+        
+        Args:
+            nota: Nota en escala 0-5
+            
+        Returns:
+            Theta en el rango efectivo de la transformación
+        """
+        theta_min_efectivo = -2.0
+        theta_max_efectivo = 2.5
+        
+        return theta_min_efectivo + (nota / 5.0) * (theta_max_efectivo - theta_min_efectivo)
+    
     def calcular_nota(self, respuestas: List[Dict[str, Any]]) -> float:
         """
         Calcula la nota final usando IRT
@@ -154,6 +280,9 @@ class IRTSimplificado(ScoringSystem):
         if not respuestas:
             return 0.0
         
+        if self._estado_sincronizado(respuestas):
+            return self.theta_a_nota(self._theta_actual)
+        
         theta = self.estimar_theta(respuestas)
         return self.theta_a_nota(theta)
     
@@ -186,28 +315,42 @@ class IRTSimplificado(ScoringSystem):
                 'nivel_habilidad': 'Sin datos'
             }
         
-        theta = self.estimar_theta(respuestas)
+        if self._estado_sincronizado(respuestas):
+            theta = self._theta_actual
+            conteos = self._conteos
+        else:
+            conteos = self._agrupar_por_dificultad(respuestas)
+            theta = self._newton_raphson(conteos, 0.0)
         
         # Calcular consistencia (qué tan bien se ajustan las respuestas al modelo)
-        consistencia = self._calcular_consistencia(respuestas, theta)
+        consistencia = self._consistencia_desde_conteos(conteos, theta)
         
-        # Determinar nivel de habilidad
+        return {
+            'theta': round(theta, 3),
+            'consistencia': round(consistencia, 3),
+            'nivel_habilidad': self._nivel_habilidad(theta)
+        }
+    
+    def _nivel_habilidad(self, theta: float) -> str:
+        """
+        Determina el nivel de habilidad correspondiente a theta
+        
+        Args:
+            theta: Habilidad estimada
+            
+        Returns:
+            Nombre del nivel
+        """
         if theta < -1.5:
-            nivel = 'Básico'
+            return 'Básico'
         elif theta < -0.5:
-            nivel = 'Fundamental'
+            return 'Fundamental'
         elif theta < 0.5:
-            nivel = 'Intermedio'
+            return 'Intermedio'
         elif theta < 1.5:
-            nivel = 'Avanzado'
+            return 'Avanzado'
         else:
-            nivel = 'Experto'
-        
-        return {
-            'theta': round(theta, 3),
-            'consistencia': round(consistencia, 3),
-            'nivel_habilidad': nivel
-        }
+            return 'Experto'
     
     def _calcular_consistencia(self, respuestas: List[Dict[str, Any]], theta: float) -> float:
         """
@@ -223,23 +366,330 @@ class IRTSimplificado(ScoringSystem):
         if not respuestas:
             return 0.0
         
-        suma_diferencias = 0.0
+        return self._consistencia_desde_conteos(self._agrupar_por_dificultad(respuestas), theta)
+    
+    def _consistencia_desde_conteos(self, conteos: Dict[int, List[int]], theta: float) -> float:
+        """
+        Calcula la consistencia a partir de los conteos por dificultad
         
-        for respuesta in respuestas:
-            dificultad = respuesta['dificultad']
-            correcta = respuesta['correcta']
+        Args:
+            conteos: Diccionario {dificultad: [correctas, total]}
+            theta: Habilidad estimada
             
+        Returns:
+            Valor entre 0 y 1 (1 = máxima consistencia)
+        """
+        total_respuestas = 0
+        suma_diferencias = 0.0
+        
+        for dificultad, (correctas, total) in conteos.items():
             prob_esperada = self.probabilidad_respuesta_correcta(theta, dificultad)
-            resultado_real = 1.0 if correcta else 0.0
             
-            # Diferencia absoluta entre esperado y real
-            diferencia = abs(prob_esperada - resultado_real)
-            suma_diferencias += diferencia
+            # Diferencia absoluta entre esperado y real: (1 - p) por cada
+            # correcta y p por cada incorrecta
+            suma_diferencias += correctas * (1.0 - prob_esperada)
+            suma_diferencias += (total - correctas) * prob_esperada
+            total_respuestas += total
+        
+        if total_respuestas == 0:
+            return 0.0
         
         # Consistencia = 1 - (promedio de diferencias)
-        consistencia = 1.0 - (suma_diferencias / len(respuestas))
+        consistencia = 1.0 - (suma_diferencias / total_respuestas)
         
         return max(0.0, min(1.0, consistencia))
+    
+    def theta_actual(self, respuestas: List[Dict[str, Any]]) -> Optional[float]:
+        """Theta del estado incremental, o estimado desde cero si no está al día"""
+        if self._estado_sincronizado(respuestas):
+            return self._theta_actual
+        return self.estimar_theta(respuestas)
+    
+    def error_estandar(self, respuestas: List[Dict[str, Any]]) -> Optional[float]:
+        """
+        Error estándar de theta: inverso de la raíz de la información de Fisher
+        
+        Args:
+            respuestas: Lista de respuestas
+            
+        Returns:
+            Error estándar (infinito si aún no hay información)
+        """
+        if self._estado_sincronizado(respuestas):
+            conteos, theta = self._conteos, self._theta_actual
+        else:
+            conteos = self._agrupar_por_dificultad(respuestas)
+            theta = self._newton_raphson(conteos, 0.0)
+        
+        informacion = self._informacion(conteos, theta)
+        if informacion <= 0:
+            return float('inf')
+        
+        return 1.0 / math.sqrt(informacion)
+    
+    def _informacion(self, conteos: Dict[int, List[int]], theta: float) -> float:
+        """
+        Información de Fisher del modelo de 1 parámetro en theta
+        
+        Args:
+            conteos: Diccionario {dificultad: [correctas, total]}
+            theta: Habilidad estimada
+            
+        Returns:
+            Suma de p * (1 - p) sobre las respuestas
+        """
+        informacion = 0.0
+        for dificultad, (_, total) in conteos.items():
+            p = self.probabilidad_respuesta_correcta(theta, dificultad)
+            p = max(0.001, min(0.999, p))
+            informacion += total * p * (1 - p)
+        return informacion
+
+
+class IRTBayesiano(IRTSimplificado):
+    """
+    Sistema IRT con estimación bayesiana de theta sobre una malla de cuadratura
+    
+    Mantiene la distribución posterior de theta en una malla fija de puntos y la
+    actualiza multiplicándola por la probabilidad de cada respuesta. El costo por
+    respuesta es constante y, gracias a la distribución previa, la estimación es
+    finita incluso si todas las respuestas son correctas o incorrectas.
+    """
+    
+    # Tablas de probabilidad compartidas por todas las instancias:
+    # {(puntos, limite): (nodos, {dificultad: (P, 1 - P)})}
+    _tablas_cache: Dict[Tuple[int, float], Tuple[List[float], Dict]] = {}
+    
+    def __init__(
+        self,
+        estimador: str = 'eap',
+        puntos_cuadratura: int = 61,
+        limite_theta: float = 4.0,
+        media_previa: float = 0.0,
+        desviacion_previa: float = 1.0,
+        **kwargs
+    ):
+        """
+        Inicializa el sistema IRT bayesiano
+        
+        Args:
+            estimador: 'eap' (media posterior) o 'map' (moda posterior)
+            puntos_cuadratura: Número de puntos de la malla de theta
+            limite_theta: La malla cubre [-limite_theta, limite_theta]
+            media_previa: Media de la distribución previa normal de theta
+            desviacion_previa: Desviación estándar de la distribución previa
+            **kwargs: Parámetros de IRTSimplificado (max_iteraciones)
+        """
+        if estimador not in ('eap', 'map'):
+            raise ValueError(f"Estimador desconocido: {estimador}")
+        
+        if puntos_cuadratura < 3:
+            raise ValueError("puntos_cuadratura debe ser al menos 3")
+        
+        if desviacion_previa <= 0:
+            raise ValueError("desviacion_previa debe ser positiva")
+        
+        self.estimador = estimador
+        self.puntos_cuadratura = puntos_cuadratura
+        self.limite_theta = limite_theta
+        self.nodos, self._tablas = self._obtener_tablas(puntos_cuadratura, limite_theta)
+        
+        # Distribución previa normalizada sobre la malla
+        previa = [
+            math.exp(-0.5 * ((x - media_previa) / desviacion_previa) ** 2)
+            for x in self.nodos
+        ]
+        suma = sum(previa)
+        self.previa = [w / suma for w in previa]
+        
+        super().__init__(**kwargs)
+    
+    @classmethod
+    def _obtener_tablas(
+        cls,
+        puntos: int,
+        limite: float
+    ) -> Tuple[List[float], Dict]:
+        """
+        Obtiene (o construye una única vez) la malla y las tablas P/Q por nivel
+        
+        Args:
+            puntos: Número de puntos de la malla
+            limite: Extremo de la malla
+            
+        Returns:
+            Tupla (nodos, tablas por dificultad)
+        """
+        clave = (puntos, limite)
+        if clave not in cls._tablas_cache:
+            paso = 2 * limite / (puntos - 1)
+            nodos = [-limite + i * paso for i in range(puntos)]
+            cls._tablas_cache[clave] = (nodos, {})
+            
+            for dificultad in range(1, 6):
+                cls._tabla_para(cls._tablas_cache[clave], dificultad)
+        
+        return cls._tablas_cache[clave]
+    
+    @staticmethod
+    def _tabla_para(
+        malla: Tuple[List[float], Dict],
+        dificultad: int
+    ) -> Tuple[List[float], List[float]]:
+        """Retorna (P, 1 - P) sobre la malla, calculándola si el nivel es nuevo"""
+        nodos, tablas = malla
+        if dificultad not in tablas:
+            b = (dificultad - 3) * 0.8
+            p = [1.0 / (1.0 + math.exp(-(x - b))) for x in nodos]
+            tablas[dificultad] = (p, [1.0 - v for v in p])
+        return tablas[dificultad]
+    
+    def reiniciar(self) -> None:
+        """Vuelve a la distribución previa"""
+        super().reiniciar()
+        self._posterior = list(self.previa)
+        self._theta_actual, self._error_actual = self._resumir_posterior(self._posterior)
+    
+    def registrar_respuesta(self, respuesta: Dict[str, Any]) -> None:
+        """
+        Multiplica la posterior por la probabilidad de la respuesta
+        
+        Args:
+            respuesta: Diccionario con 'dificultad' y 'correcta'
+        """
+        self._sumar_conteo(self._conteos, respuesta)
+        self._total_registradas += 1
+        self._ultima_registrada = respuesta
+        
+        self._posterior = self._actualizar_posterior(self._posterior, respuesta)
+        self._theta_actual, self._error_actual = self._resumir_posterior(self._posterior)
+    
+    def _actualizar_posterior(self, posterior: List[float], respuesta: Dict[str, Any]) -> List[float]:
+        """
+        Aplica una respuesta a la posterior y la renormaliza
+        
+        Args:
+            posterior: Pesos actuales sobre la malla
+            respuesta: Diccionario con 'dificultad' y 'correcta'
+            
+        Returns:
+            Nueva lista de pesos (suma 1)
+        """
+        p, q = self._tabla_para((self.nodos, self._tablas), respuesta['dificultad'])
+        verosimilitud = p if respuesta['correcta'] else q
+        
+        nueva = [w * v for w, v in zip(posterior, verosimilitud)]
+        suma = sum(nueva)
+        
+        # Renormalizar en cada paso evita el desbordamiento por abajo
+        return [w / suma for w in nueva]
+    
+    def _resumir_posterior(self, posterior: List[float]) -> Tuple[float, float]:
+        """
+        Calcula el estimador configurado y la desviación estándar posterior
+        
+        Args:
+            posterior: Pesos normalizados sobre la malla
+            
+        Returns:
+            Tupla (theta, error estándar)
+        """
+        media = sum(x * w for x, w in zip(self.nodos, posterior))
+        varianza = sum((x - media) ** 2 * w for x, w in zip(self.nodos, posterior))
+        
+        if self.estimador == 'eap':
+            return media, math.sqrt(varianza)
+        
+        # MAP: punto máximo de la malla refinado con una parábola
+        i = max(range(len(posterior)), key=posterior.__getitem__)
+        theta = self.nodos[i]
+        if 0 < i < len(posterior) - 1:
+            izq, centro, der = (math.log(posterior[j]) for j in (i - 1, i, i + 1))
+            curvatura = izq - 2 * centro + der
+            if curvatura < 0:
+                paso = self.nodos[1] - self.nodos[0]
+                theta += 0.5 * paso * (izq - der) / curvatura
+        
+        return theta, math.sqrt(varianza)
+    
+    def error_estandar(self, respuestas: List[Dict[str, Any]]) -> Optional[float]:
+        """
+        Desviación estándar de la posterior de theta
+        
+        Args:
+            respuestas: Lista de respuestas
+            
+        Returns:
+            Error estándar posterior
+        """
+        if self._estado_sincronizado(respuestas):
+            return self._error_actual
+        
+        _, error = self._resumir_posterior(self.estimar_posterior(respuestas))
+        return error
+    
+    def estimar_posterior(self, respuestas: List[Dict[str, Any]]) -> List[float]:
+        """
+        Calcula la posterior desde cero para una lista de respuestas
+        
+        Args:
+            respuestas: Lista de respuestas
+            
+        Returns:
+            Pesos normalizados sobre la malla
+        """
+        if self._estado_sincronizado(respuestas):
+            return self._posterior
+        
+        posterior = list(self.previa)
+        for respuesta in respuestas:
+            posterior = self._actualizar_posterior(posterior, respuesta)
+        return posterior
+    
+    def estimar_theta(self, respuestas: List[Dict[str, Any]]) -> float:
+        """
+        Estima theta como media (EAP) o moda (MAP) posterior
+        
+        Args:
+            respuestas: Lista de respuestas
+            
+        Returns:
+            Estimación de theta
+        """
+        theta, _ = self._resumir_posterior(self.estimar_posterior(respuestas))
+        return theta
+    
+    def obtener_estadisticas(self, respuestas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Obtiene theta, su error estándar posterior y las estadísticas de IRT
+        
+        Args:
+            respuestas: Lista de respuestas
+            
+        Returns:
+            Diccionario con estadísticas
+        """
+        if not respuestas:
+            return {
+                'theta': 0.0,
+                'error_estandar': round(self._resumir_posterior(self.previa)[1], 3),
+                'consistencia': 0.0,
+                'nivel_habilidad': 'Sin datos'
+            }
+        
+        if self._estado_sincronizado(respuestas):
+            theta, error = self._theta_actual, self._error_actual
+            conteos = self._conteos
+        else:
+            theta, error = self._resumir_posterior(self.estimar_posterior(respuestas))
+            conteos = self._agrupar_por_dificultad(respuestas)
+        
+        return {
+            'theta': round(theta, 3),
+            'error_estandar': round(error, 3),
+            'consistencia': round(self._consistencia_desde_conteos(conteos, theta), 3),
+            'nivel_habilidad': self._nivel_habilidad(theta)
+        }
 
 
 class SistemaElo(ScoringSystem):
@@ -257,6 +707,49 @@ class SistemaElo(ScoringSystem):
         """
         self.k_factor = k_factor
         self.rating_inicial = rating_inicial
+        self.reiniciar()
+    
+    def reiniciar(self) -> None:
+        """Vuelve al rating inicial"""
+        self._rating_actual = self.rating_inicial
+        self._total_registradas = 0
+        self._ultima_registrada: Optional[Dict[str, Any]] = None
+    
+    def registrar_respuesta(self, respuesta: Dict[str, Any]) -> None:
+        """
+        Aplica una única actualización Elo con la respuesta nueva
+        
+        Args:
+            respuesta: Diccionario con 'dificultad' y 'correcta'
+        """
+        self._rating_actual = self._actualizar_rating(self._rating_actual, respuesta)
+        self._total_registradas += 1
+        self._ultima_registrada = respuesta
+    
+    def _estado_sincronizado(self, respuestas: List[Dict[str, Any]]) -> bool:
+        """Indica si el rating acumulado corresponde a la lista de respuestas (largo y última respuesta)"""
+        return (
+            self._total_registradas > 0
+            and self._total_registradas == len(respuestas)
+            and respuestas[-1] is self._ultima_registrada
+        )
+    
+    def _actualizar_rating(self, rating: float, respuesta: Dict[str, Any]) -> float:
+        """
+        Calcula el rating tras una respuesta
+        
+        Args:
+            rating: Rating antes de la respuesta
+            respuesta: Diccionario con 'dificultad' y 'correcta'
+            
+        Returns:
+            Rating actualizado
+        """
+        rating_pregunta = self.dificultad_a_rating(respuesta['dificultad'])
+        prob_esperada = self.probabilidad_esperada(rating, rating_pregunta)
+        
+        resultado = 1.0 if respuesta['correcta'] else 0.0
+        return rating + self.k_factor * (resultado - prob_esperada)
     
     def probabilidad_esperada(self, rating_estudiante: float, rating_pregunta: float) -> float:
         """
@@ -298,17 +791,27 @@ class SistemaElo(ScoringSystem):
         rating = self.rating_inicial
         
         for respuesta in respuestas:
-            dificultad = respuesta['dificultad']
-            correcta = respuesta['correcta']
-            
-            rating_pregunta = self.dificultad_a_rating(dificultad)
-            prob_esperada = self.probabilidad_esperada(rating, rating_pregunta)
-            
-            resultado = 1.0 if correcta else 0.0
-            rating += self.k_factor * (resultado - prob_esperada)
+            rating = self._actualizar_rating(rating, respuesta)
         
         return rating
     
+    def theta_actual(self, respuestas: List[Dict[str, Any]]) -> Optional[float]:
+        """
+        Convierte el rating a la escala de theta de IRT
+        
+        Un nivel de dificultad equivale a 150 puntos de rating y a 0.8 en theta,
+        y el nivel 3 corresponde a theta = 0.
+        """
+        centro = self.dificultad_a_rating(3)
+        puntos_por_nivel = self.dificultad_a_rating(4) - centro
+        return (self._rating_para(respuestas) - centro) * 0.8 / puntos_por_nivel
+    
+    def _rating_para(self, respuestas: List[Dict[str, Any]]) -> float:
+        """Usa el rating acumulado si está al día; si no, repite el historial"""
+        if self._estado_sincronizado(respuestas):
+            return self._rating_actual
+        return self.calcular_rating_final(respuestas)
+    
     def rating_a_nota(self, rating: float) -> float:
         """
         Convierte rating Elo a nota 0-5
@@ -336,7 +839,7 @@ class SistemaElo(ScoringSystem):
         if not respuestas:
             return 0.0
         
-        rating = self.calcular_rating_final(respuestas)
+        rating = self._rating_para(respuestas)
         return self.rating_a_nota(rating)
     
     def calcular_nota_parcial(self, respuestas: List[Dict[str, Any]]) -> float:
@@ -351,7 +854,7 @@ class SistemaElo(ScoringSystem):
                 'cambio_rating': 0.0
             }
         
-        rating_final = self.calcular_rating_final(respuestas)
+        rating_final = self._rating_para(respuestas)
         cambio = rating_final - self.rating_inicial
         
         return {
@@ -386,6 +889,24 @@ class SistemaHibrido(ScoringSystem):
         self.irt = IRTSimplificado(**kwargs)
         self.elo = SistemaElo(**kwargs)
     
+    def reiniciar(self) -> None:
+        """Reinicia el estado de ambos componentes"""
+        self.irt.reiniciar()
+        self.elo.reiniciar()
+    
+    def registrar_respuesta(self, respuesta: Dict[str, Any]) -> None:
+        """Propaga la respuesta a los componentes IRT y Elo"""
+        self.irt.registrar_respuesta(respuesta)
+        self.elo.registrar_respuesta(respuesta)
+    
+    def theta_actual(self, respuestas: List[Dict[str, Any]]) -> Optional[float]:
+        """Theta proviene del componente IRT"""
+        return self.irt.theta_actual(respuestas)
+    
+    def error_estandar(self, respuestas: List[Dict[str, Any]]) -> Optional[float]:
+        """El error estándar proviene del componente IRT"""
+        return self.irt.error_estandar(respuestas)
+    
     def calcular_nota(self, respuestas: List[Dict[str, Any]]) -> float:
         """Calcula la nota combinando IRT y Elo"""
         if not respuestas:
@@ -413,6 +934,84 @@ class SistemaHibrido(ScoringSystem):
         }
 
 
+class ClasificadorSPRT:
+    """
+    Prueba secuencial de razón de probabilidades (SPRT) para decidir aprobado/reprobado
+    
+    Compara dos hipótesis simples alrededor de la nota de corte, theta_corte + delta
+    (aprueba) contra theta_corte - delta (reprueba), con el modelo IRT de 1 parámetro.
+    La decisión se toma cuando el logaritmo de la razón de verosimilitudes cruza
+    alguno de los límites de Wald dados por los errores alfa y beta.
+    """
+    
+    def __init__(
+        self,
+        nota_corte: float = 3.0,
+        delta: float = 0.5,
+        alfa: float = 0.05,
+        beta: float = 0.05
+    ):
+        """
+        Inicializa la prueba
+        
+        Args:
+            nota_corte: Nota mínima aprobatoria (escala 0-5)
+            delta: Semiancho de la región de indiferencia en unidades de theta
+            alfa: Probabilidad máxima de aprobar a quien debía reprobar
+            beta: Probabilidad máxima de reprobar a quien debía aprobar
+        """
+        self.irt = IRTSimplificado()
+        self.nota_corte = nota_corte
+        self.theta_corte = self.irt.nota_a_theta(nota_corte)
+        self.theta_aprueba = self.theta_corte + delta
+        self.theta_reprueba = self.theta_corte - delta
+        
+        # Límites de Wald
+        self.limite_superior = math.log((1 - beta) / alfa)
+        self.limite_inferior = math.log(beta / (1 - alfa))
+        
+        # Incrementos del log de la razón por dificultad: {dificultad: (correcta, incorrecta)}
+        self._incrementos: Dict[int, Tuple[float, float]] = {}
+        self.reiniciar()
+    
+    def reiniciar(self) -> None:
+        """Vuelve a la razón de verosimilitudes inicial"""
+        self.log_razon = 0.0
+    
+    def registrar_respuesta(self, respuesta: Dict[str, Any]) -> None:
+        """
+        Suma la evidencia de una respuesta
+        
+        Args:
+            respuesta: Diccionario con 'dificultad' y 'correcta'
+        """
+        dificultad = respuesta['dificultad']
+        
+        if dificultad not in self._incrementos:
+            p1 = self.irt.probabilidad_respuesta_correcta(self.theta_aprueba, dificultad)
+            p0 = self.irt.probabilidad_respuesta_correcta(self.theta_reprueba, dificultad)
+            self._incrementos[dificultad] = (
+                math.log(p1 / p0),
+                math.log((1 - p1) / (1 - p0))
+            )
+        
+        si_correcta, si_incorrecta = self._incrementos[dificultad]
+        self.log_razon += si_correcta if respuesta['correcta'] else si_incorrecta
+    
+    def decision(self) -> Optional[str]:
+        """
+        Retorna la clasificación si ya hay suficiente evidencia
+        
+        Returns:
+            'aprobado', 'reprobado' o None si aún no se decide
+        """
+        if self.log_razon >= self.limite_superior:
+            return 'aprobado'
+        if self.log_razon <= self.limite_inferior:
+            return 'reprobado'
+        return None
+
+
 def crear_sistema_calificacion(config: Dict[str, Any]) -> ScoringSystem:
     """
     Factory para crear el sistema de calificación apropiado
@@ -428,6 +1027,8 @@ def crear_sistema_calificacion(config: Dict[str, Any]) -> ScoringSystem:
     
     if tipo == 'irt_simplificado':
         return IRTSimplificado(**params)
+    elif tipo == 'irt_bayesiano':
+        return IRTBayesiano(**params)
     elif tipo == 'elo':
         return SistemaElo(**params)
     elif tipo == 'hibrido':
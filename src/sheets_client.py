@@ -0,0 +1,134 @@
+"""
+Clientes de Google Sheets
+Pool de clientes autorizados reutilizables por proceso
+"""
+import threading
+from typing import Dict, Any, List
+
+import httplib2
+from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+class PoolHttp:
+    """
+    Pool de transportes HTTP autorizados con conexiones keep-alive
+
+    httplib2 no es seguro entre hilos, así que cada solicitud toma un transporte
+    libre (o crea uno), lo usa en exclusiva y lo devuelve al terminar. Los
+    transportes conservan su conexión abierta y todos comparten las mismas
+    credenciales, de modo que el token se obtiene una vez y se reutiliza.
+
+    Se pasa a googleapiclient como objeto http: solo necesita request().
+    """
+
+    def __init__(self, credentials, max_inactivos: int = 16, timeout: float = 60):
+        """
+        Args:
+            credentials: Credenciales compartidas por todos los transportes
+            max_inactivos: Máximo de transportes libres que se conservan
+            timeout: Timeout de red en segundos
+        """
+        self.credentials = credentials
+        self.max_inactivos = max_inactivos
+        self.timeout = timeout
+        self._libres: List[AuthorizedHttp] = []
+        self._lock = threading.Lock()
+
+        # Contadores para monitoreo
+        self.creados = 0
+        self.reutilizados = 0
+
+    def _prestar(self) -> AuthorizedHttp:
+        """Toma un transporte libre o crea uno nuevo"""
+        with self._lock:
+            if self._libres:
+                self.reutilizados += 1
+                return self._libres.pop()
+            self.creados += 1
+
+        return AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout))
+
+    def _devolver(self, http: AuthorizedHttp):
+        """Devuelve un transporte al pool (o lo cierra si sobran)"""
+        with self._lock:
+            if len(self._libres) < self.max_inactivos:
+                self._libres.append(http)
+                return
+        http.close()
+
+    def request(self, *args, **kwargs):
+        """Ejecuta una solicitud HTTP con un transporte del pool"""
+        http = self._prestar()
+        try:
+            return http.request(*args, **kwargs)
+        finally:
+            self._devolver(http)
+
+    def close(self):
+        """Cierra los transportes libres"""
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for http in libres:
+            http.close()
+
+
+# Servicios compartidos por proceso: cuenta de servicio -> (servicio, pool)
+_servicios: Dict[str, Any] = {}
+_lock_servicios = threading.Lock()
+
+
+def _clave_cuenta(info_credenciales: Dict[str, Any]) -> str:
+    """Identificador de una cuenta de servicio"""
+    return f"{info_credenciales.get('client_email')}:{info_credenciales.get('private_key_id')}"
+
+
+def obtener_servicio_sheets(info_credenciales: Dict[str, Any]):
+    """
+    Obtiene el cliente de Google Sheets del proceso para una cuenta de servicio
+
+    El descubrimiento de la API y la creación de credenciales se hacen una sola
+    vez por proceso; las solicitudes usan el PoolHttp del servicio, así que el
+    mismo objeto puede usarse desde cualquier hilo. No usa Streamlit.
+
+    Args:
+        info_credenciales: Datos de la service account (gcp_service_account)
+
+    Returns:
+        Servicio de Sheets v4
+    """
+    clave = _clave_cuenta(info_credenciales)
+
+    with _lock_servicios:
+        entrada = _servicios.get(clave)
+        if entrada is None:
+            credentials = service_account.Credentials.from_service_account_info(
+                dict(info_credenciales),
+                scopes=SCOPES
+            )
+            pool = PoolHttp(credentials)
+            servicio = build('sheets', 'v4', http=pool, cache_discovery=False)
+            entrada = (servicio, pool)
+            _servicios[clave] = entrada
+
+    return entrada[0]
+
+
+def obtener_pool(info_credenciales: Dict[str, Any]) -> PoolHttp:
+    """
+    Pool HTTP del servicio de una cuenta (para monitoreo)
+
+    Args:
+        info_credenciales: Datos de la service account
+
+    Returns:
+        PoolHttp del servicio
+    """
+    obtener_servicio_sheets(info_credenciales)
+    return _servicios[_clave_cuenta(info_credenciales)][1]
@@ -0,0 +1,590 @@
+"""
+Persistencia en SQLite
+Backend local de resultados (modo WAL) con replicación opcional a Google Sheets
+"""
+import argparse
+import json
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import streamlit as st
+
+from data_persistence import (
+    ENCABEZADOS,
+    RUTA_SQLITE,
+    DataPersistence,
+    estadisticas_de_resumen,
+    fila_inicio_examen,
+    particion_de,
+    preparar_fila_resultados,
+    registro_resumen
+)
+from persistence_base import PersistenciaBase
+
+# Agregados de notas por examen y sistema de calificación (columnas de la hoja Resumen)
+ESQUEMA_RESUMEN = """
+    CREATE TABLE IF NOT EXISTS resumen (
+        examen_id TEXT NOT NULL,
+        sistema_calificacion TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        suma_nota REAL NOT NULL,
+        suma_cuadrados_nota REAL NOT NULL,
+        nota_minima REAL NOT NULL,
+        nota_maxima REAL NOT NULL,
+        suma_preguntas INTEGER NOT NULL,
+        PRIMARY KEY (examen_id, sistema_calificacion)
+    );
+"""
+
+# Columnas de la tabla resultados, en el orden de ENCABEZADOS
+COLUMNAS = [encabezado.lower() for encabezado in ENCABEZADOS]
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS resultados (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        examen_id TEXT NOT NULL,
+        fecha_hora TEXT NOT NULL,
+        codigo_estudiante TEXT NOT NULL,
+        preguntas_respondidas INTEGER NOT NULL DEFAULT 0,
+        correctas INTEGER NOT NULL DEFAULT 0,
+        incorrectas INTEGER NOT NULL DEFAULT 0,
+        porcentaje_correctas REAL NOT NULL DEFAULT 0,
+        nivel_final INTEGER,
+        nota_final REAL,
+        preguntas_ids TEXT,
+        theta_irt,
+        consistencia_irt,
+        nivel_habilidad_irt,
+        rating_elo,
+        cambio_rating_elo,
+        razon_terminacion TEXT NOT NULL,
+        sistema_calificacion TEXT,
+        replicado INTEGER NOT NULL DEFAULT 0,
+        lote_replicacion TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_resultados_estudiante
+        ON resultados (examen_id, codigo_estudiante, razon_terminacion);
+    CREATE INDEX IF NOT EXISTS idx_resultados_examen
+        ON resultados (examen_id, id);
+    CREATE INDEX IF NOT EXISTS idx_resultados_pendientes
+        ON resultados (examen_id, id) WHERE replicado = 0;
+    CREATE TABLE IF NOT EXISTS resultados_archivo AS SELECT * FROM resultados WHERE 0;
+    CREATE INDEX IF NOT EXISTS idx_archivo_examen
+        ON resultados_archivo (examen_id, id);
+""" + ESQUEMA_RESUMEN
+
+# Columnas agregadas después de la primera versión del esquema: (tabla, columna, definición)
+MIGRACIONES = [
+    ('resultados', 'lote_replicacion', 'TEXT'),
+    ('resultados_archivo', 'lote_replicacion', 'TEXT'),
+]
+
+# Versión de la tabla resumen (PRAGMA user_version): una base con una
+# versión menor se recalcula una vez al abrirla
+VERSION_RESUMEN = 1
+
+# Recalcula el resumen desde los resultados vigentes y archivados
+RECONSTRUIR_RESUMEN = """
+    INSERT INTO resumen
+    SELECT examen_id, COALESCE(sistema_calificacion, ''), COUNT(*),
+           SUM(nota_final), SUM(nota_final * nota_final), MIN(nota_final), MAX(nota_final),
+           SUM(preguntas_respondidas)
+    FROM (
+        SELECT examen_id, sistema_calificacion, nota_final, preguntas_respondidas, razon_terminacion
+        FROM resultados
+        UNION ALL
+        SELECT examen_id, sistema_calificacion, nota_final, preguntas_respondidas, razon_terminacion
+        FROM resultados_archivo
+    )
+    WHERE razon_terminacion <> 'EN_CURSO'
+    GROUP BY examen_id, COALESCE(sistema_calificacion, '')
+"""
+
+
+
+def acumular_resumen(
+    conexion: sqlite3.Connection,
+    examen_id: str,
+    registros: List[Tuple[str, float, int]]
+):
+    """
+    Suma resultados finales a la tabla resumen (dentro de la transacción de quien llama)
+
+    Args:
+        conexion: Conexión con la tabla resumen
+        examen_id: ID del examen
+        registros: (sistema_calificacion, nota_final, preguntas_respondidas) por resultado
+    """
+    conexion.executemany(
+        """
+        INSERT INTO resumen VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+        ON CONFLICT (examen_id, sistema_calificacion) DO UPDATE SET
+            total = total + 1,
+            suma_nota = suma_nota + excluded.suma_nota,
+            suma_cuadrados_nota = suma_cuadrados_nota + excluded.suma_cuadrados_nota,
+            nota_minima = MIN(nota_minima, excluded.nota_minima),
+            nota_maxima = MAX(nota_maxima, excluded.nota_maxima),
+            suma_preguntas = suma_preguntas + excluded.suma_preguntas
+        """,
+        [
+            (examen_id, sistema, nota, nota * nota, nota, nota, preguntas)
+            for sistema, nota, preguntas in registros
+        ]
+    )
+
+class SQLitePersistence(PersistenciaBase):
+    """
+    Clase para manejar la persistencia en una base SQLite local
+
+    Implementa las mismas operaciones que DataPersistence. Todos los exámenes
+    comparten la base y se distinguen por examen_id (la partición: examen y
+    periodo); las particiones cerradas se mueven a resultados_archivo. La conexión se comparte
+    entre los hilos del proceso (serializada con un lock) y el modo WAL
+    permite que varios procesos escriban sobre el mismo archivo.
+    """
+
+    # Conexiones compartidas por proceso: ruta -> (conexión, lock)
+    _conexiones: Dict[str, Tuple[sqlite3.Connection, threading.RLock]] = {}
+    _lock_conexiones = threading.Lock()
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Inicializa el sistema de persistencia
+
+        Args:
+            config: Configuración del examen
+        """
+        self.config = config
+        self.examen_id = particion_de(config)
+        self.ruta = str(Path(config['persistencia'].get('ruta_sqlite', RUTA_SQLITE)).resolve())
+        self.conexion, self.lock = self._obtener_conexion(self.ruta)
+
+    @classmethod
+    def _obtener_conexion(cls, ruta: str) -> Tuple[sqlite3.Connection, threading.RLock]:
+        """Abre (una vez por proceso) la base y crea el esquema"""
+        with cls._lock_conexiones:
+            entrada = cls._conexiones.get(ruta)
+            if entrada is None:
+                Path(ruta).parent.mkdir(parents=True, exist_ok=True)
+                conexion = sqlite3.connect(
+                    ruta,
+                    timeout=30,
+                    check_same_thread=False,
+                    isolation_level=None
+                )
+                conexion.execute("PRAGMA journal_mode=WAL")
+                conexion.execute("PRAGMA synchronous=NORMAL")
+                conexion.executescript(ESQUEMA)
+                cls._actualizar_esquema(conexion)
+                entrada = (conexion, threading.RLock())
+                cls._conexiones[ruta] = entrada
+            return entrada
+
+    @staticmethod
+    def _actualizar_esquema(conexion: sqlite3.Connection):
+        """
+        Aplica las migraciones y, si está desactualizado, recalcula el resumen
+
+        Todo ocurre en una transacción de escritura, así que si varios
+        procesos abren a la vez una base antigua solo el primero la actualiza.
+        """
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            for tabla, columna, definicion in MIGRACIONES:
+                existentes = {fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")}
+                if columna not in existentes:
+                    conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+            if conexion.execute("PRAGMA user_version").fetchone()[0] < VERSION_RESUMEN:
+                conexion.execute("DELETE FROM resumen")
+                conexion.execute(RECONSTRUIR_RESUMEN)
+                conexion.execute(f"PRAGMA user_version = {VERSION_RESUMEN}")
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+
+    def _transaccion(self, operacion):
+        """Ejecuta operacion(conexion) en una transacción de escritura"""
+        with self.lock:
+            self.conexion.execute("BEGIN IMMEDIATE")
+            try:
+                resultado = operacion(self.conexion)
+                self.conexion.execute("COMMIT")
+                return resultado
+            except Exception:
+                self.conexion.execute("ROLLBACK")
+                raise
+
+    def _id_en_curso(self, conexion: sqlite3.Connection, codigo_estudiante: str):
+        """ID de la última fila EN_CURSO del estudiante, o None"""
+        fila = conexion.execute(
+            "SELECT MAX(id) FROM resultados "
+            "WHERE examen_id = ? AND codigo_estudiante = ? AND razon_terminacion = 'EN_CURSO'",
+            (self.examen_id, codigo_estudiante)
+        ).fetchone()
+        return fila[0]
+
+    def _insertar(self, conexion: sqlite3.Connection, datos: List[Any]):
+        """Inserta una fila (columnas A-P)"""
+        conexion.execute(
+            f"INSERT INTO resultados (examen_id, {', '.join(COLUMNAS)}) "
+            f"VALUES (?, {', '.join('?' * len(COLUMNAS))})",
+            [self.examen_id, *datos]
+        )
+
+    def guardar_inicio_examen(self, codigo_estudiante: str) -> bool:
+        """
+        Guarda el registro de inicio de examen
+
+        Args:
+            codigo_estudiante: Código del estudiante
+
+        Returns:
+            True si se guardó exitosamente
+        """
+        try:
+            datos = fila_inicio_examen(self.config, codigo_estudiante)
+            self._transaccion(lambda conexion: self._insertar(conexion, datos))
+            return True
+
+        except sqlite3.Error as e:
+            st.warning(f"⚠️ No se pudo guardar el inicio del examen: {str(e)}")
+            return False
+
+    def actualizar_progreso_examen(
+        self,
+        codigo_estudiante: str,
+        preguntas_respondidas: int,
+        correctas: int,
+        incorrectas: int
+    ) -> bool:
+        """
+        Actualiza el progreso del examen en curso
+
+        Args:
+            codigo_estudiante: Código del estudiante
+            preguntas_respondidas: Número de preguntas respondidas
+            correctas: Número de correctas
+            incorrectas: Número de incorrectas
+
+        Returns:
+            True si se actualizó exitosamente
+        """
+        try:
+            actualizados = self.actualizar_progreso_lote({
+                codigo_estudiante: (preguntas_respondidas, correctas, incorrectas)
+            })
+            return codigo_estudiante in actualizados
+
+        except sqlite3.Error:
+            return False
+
+    def actualizar_progreso_lote(self, progresos: Dict[str, Tuple[int, int, int]]) -> List[str]:
+        """
+        Actualiza el progreso de varios estudiantes en una sola transacción
+
+        No usa Streamlit (se llama desde el hilo de ColaProgreso).
+
+        Args:
+            progresos: Código del estudiante -> (respondidas, correctas, incorrectas)
+
+        Returns:
+            Códigos cuya fila EN_CURSO se encontró y actualizó
+        """
+        def actualizar(conexion):
+            actualizados = []
+            for codigo, (respondidas, correctas, incorrectas) in progresos.items():
+                fila = self._id_en_curso(conexion, codigo)
+                if fila is None:
+                    continue
+                porcentaje = (correctas / respondidas * 100) if respondidas > 0 else 0
+                conexion.execute(
+                    "UPDATE resultados SET preguntas_respondidas = ?, correctas = ?, "
+                    "incorrectas = ?, porcentaje_correctas = ? WHERE id = ?",
+                    (respondidas, correctas, incorrectas, round(porcentaje, 1), fila)
+                )
+                actualizados.append(codigo)
+            return actualizados
+
+        if not progresos:
+            return []
+
+        return self._transaccion(actualizar)
+
+    def verificar_examen_en_curso(self, codigo_estudiante: str) -> bool:
+        """
+        Verifica si el estudiante tiene un examen en curso
+
+        Args:
+            codigo_estudiante: Código del estudiante
+
+        Returns:
+            True si tiene un examen EN_CURSO
+        """
+        try:
+            with self.lock:
+                return self._id_en_curso(self.conexion, codigo_estudiante) is not None
+
+        except sqlite3.Error as e:
+            st.warning(f"⚠️ No se pudo verificar el examen en curso: {str(e)}")
+            return False
+
+    def verificar_examen_completado(self, codigo_estudiante: str) -> bool:
+        """
+        Verifica si el estudiante ya completó el examen
+
+        Args:
+            codigo_estudiante: Código del estudiante
+
+        Returns:
+            True si ya completó el examen (tiene registro con razón_terminacion diferente a EN_CURSO)
+        """
+        try:
+            with self.lock:
+                fila = self.conexion.execute(
+                    "SELECT 1 FROM resultados WHERE examen_id = ? AND codigo_estudiante = ? "
+                    "AND razon_terminacion <> 'EN_CURSO' LIMIT 1",
+                    (self.examen_id, codigo_estudiante)
+                ).fetchone()
+                return fila is not None
+
+        except sqlite3.Error as e:
+            st.warning(f"⚠️ No se pudo verificar si el examen fue completado: {str(e)}")
+            return False
+
+    def guardar_resultados(self, codigo_estudiante: str, stats: Dict[str, Any]) -> bool:
+        """
+        Guarda los resultados del examen
+        Actualiza la fila EN_CURSO si existe, o crea una nueva
+
+        Args:
+            codigo_estudiante: Código del estudiante
+            stats: Estadísticas del examen
+
+        Returns:
+            True si se guardó exitosamente, False en caso contrario
+        """
+        datos = preparar_fila_resultados(self.config, codigo_estudiante, stats)
+
+        def guardar(conexion):
+            fila = self._id_en_curso(conexion, codigo_estudiante)
+            if fila is None:
+                self._insertar(conexion, datos)
+            else:
+                conexion.execute(
+                    f"UPDATE resultados SET {', '.join(f'{c} = ?' for c in COLUMNAS)} WHERE id = ?",
+                    [*datos, fila]
+                )
+            acumular_resumen(conexion, self.examen_id, [registro_resumen(datos)])
+
+        try:
+            self._transaccion(guardar)
+            return True
+
+        except sqlite3.Error as e:
+            st.error(f"⚠️ Error al guardar resultados: {str(e)}")
+            return False
+
+    def iterar_resultados(
+        self,
+        codigo_estudiante: str = None,
+        columnas: Optional[List[str]] = None,
+        tamano_pagina: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre los resultados del examen por páginas (paginación por id)
+
+        El lock se toma solo durante cada consulta, no entre páginas.
+
+        Args:
+            codigo_estudiante: Si se proporciona, solo los de este código
+            columnas: Encabezados a leer (por defecto, todos)
+            tamano_pagina: Filas por consulta
+
+        Yields:
+            Diccionarios con los encabezados pedidos como claves
+        """
+        claves = columnas if columnas is not None else ENCABEZADOS
+        desconocidas = set(claves) - set(ENCABEZADOS)
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas: {', '.join(sorted(desconocidas))}")
+
+        consulta = (
+            f"SELECT id, {', '.join(c.lower() for c in claves)} FROM resultados "
+            "WHERE examen_id = ? AND id > ?"
+        )
+        if codigo_estudiante:
+            consulta += " AND codigo_estudiante = ?"
+        consulta += " ORDER BY id LIMIT ?"
+
+        ultimo = 0
+        while True:
+            parametros: List[Any] = [self.examen_id, ultimo]
+            if codigo_estudiante:
+                parametros.append(codigo_estudiante)
+            parametros.append(tamano_pagina)
+
+            with self.lock:
+                filas = self.conexion.execute(consulta, parametros).fetchall()
+
+            for fila in filas:
+                yield dict(zip(claves, fila[1:]))
+
+            if len(filas) < tamano_pagina:
+                return
+            ultimo = filas[-1][0]
+
+    def obtener_estadisticas_globales(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas globales del examen desde la tabla resumen
+
+        Returns:
+            Diccionario con estadísticas
+        """
+        try:
+            with self.lock:
+                filas = self.conexion.execute(
+                    "SELECT * FROM resumen WHERE examen_id = ? ORDER BY sistema_calificacion",
+                    (self.examen_id,)
+                ).fetchall()
+            return estadisticas_de_resumen(filas)
+
+        except sqlite3.Error as e:
+            st.error(f"⚠️ Error al calcular estadísticas globales: {str(e)}")
+            return {}
+
+    def verificar_conexion(self) -> bool:
+        """
+        Verifica que la base responda
+
+        Returns:
+            True si la conexión es exitosa
+        """
+        try:
+            with self.lock:
+                self.conexion.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error as e:
+            st.error(f"⚠️ Error de conexión con SQLite: {str(e)}")
+            return False
+
+    def archivar_particion(self, particion: str) -> int:
+        """
+        Mueve las filas de una partición cerrada a la tabla resultados_archivo
+
+        Las consultas del examen activo solo recorren la tabla resultados; el
+        resumen de la partición se conserva.
+
+        Args:
+            particion: Partición cerrada, p. ej. 'programacion_2024-2'
+
+        Returns:
+            Número de filas archivadas
+        """
+        if particion == self.examen_id:
+            raise ValueError(f"{particion} es la partición activa del examen")
+
+        def archivar(conexion):
+            conexion.execute(
+                "INSERT INTO resultados_archivo SELECT * FROM resultados WHERE examen_id = ?",
+                (particion,)
+            )
+            return conexion.execute(
+                "DELETE FROM resultados WHERE examen_id = ?", (particion,)
+            ).rowcount
+
+        return self._transaccion(archivar)
+
+    def replicar_a_sheets(self, destino: DataPersistence = None) -> int:
+        """
+        Copia a Google Sheets los resultados finalizados aún no replicados
+
+        Las filas EN_CURSO no se replican; se copian cuando terminan. Antes de
+        enviarlas, las filas pendientes se marcan con un lote de replicación y
+        se envían en un solo append; si este tiene éxito se marcan como
+        replicadas. Si un envío anterior se interrumpió después del append, sus
+        filas siguen marcadas con su lote: antes de reenviarlas se buscan en la
+        hoja (por Fecha_Hora y Codigo_Estudiante) y las que ya están solo se
+        marcan. No debe ejecutarse dos veces a la vez para el mismo examen.
+
+        Args:
+            destino: DataPersistence de destino (si no, se crea con
+                persistencia.spreadsheet_id y st.secrets)
+
+        Returns:
+            Número de filas replicadas
+        """
+        lote = uuid.uuid4().hex
+
+        def marcar(conexion):
+            conexion.execute(
+                "UPDATE resultados SET lote_replicacion = ? "
+                "WHERE examen_id = ? AND replicado = 0 AND razon_terminacion <> 'EN_CURSO' "
+                "AND lote_replicacion IS NULL",
+                (lote, self.examen_id)
+            )
+            return conexion.execute(
+                f"SELECT id, lote_replicacion, {', '.join(COLUMNAS)} FROM resultados "
+                "WHERE examen_id = ? AND replicado = 0 AND razon_terminacion <> 'EN_CURSO' "
+                "ORDER BY id",
+                (self.examen_id,)
+            ).fetchall()
+
+        def marcar_replicadas(ids):
+            self._transaccion(
+                lambda conexion: conexion.executemany(
+                    "UPDATE resultados SET replicado = 1 WHERE id = ?", [(i,) for i in ids]
+                )
+            )
+
+        pendientes = self._transaccion(marcar)
+        if not pendientes:
+            return 0
+
+        if destino is None:
+            destino = DataPersistence(self.config)
+
+        # Filas de lotes anteriores: pudieron llegar a la hoja sin marcarse
+        if any(fila[1] != lote for fila in pendientes):
+            en_hoja = {
+                (str(r['Fecha_Hora']), str(r['Codigo_Estudiante']))
+                for r in destino.recorrer_resultados(columnas=['Fecha_Hora', 'Codigo_Estudiante'])
+            }
+            ya_enviadas = {
+                fila[0] for fila in pendientes
+                if fila[1] != lote and (str(fila[2]), str(fila[3])) in en_hoja
+            }
+            marcar_replicadas(ya_enviadas)
+            pendientes = [fila for fila in pendientes if fila[0] not in ya_enviadas]
+
+        filas = [['' if valor is None else valor for valor in fila[2:]] for fila in pendientes]
+        destino.agregar_resultados(filas)
+        marcar_replicadas([fila[0] for fila in pendientes])
+        return len(pendientes)
+
+def main():
+    """Punto de entrada de línea de comandos: replica un examen a Google Sheets"""
+    parser = argparse.ArgumentParser(
+        description="Replica a Google Sheets los resultados guardados en SQLite"
+    )
+    parser.add_argument('config', help="Ruta a la configuración del examen (config/examenes/<id>.json)")
+    args = parser.parse_args()
+
+    ruta_config = Path(args.config)
+    with open(ruta_config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config['_examen_id'] = ruta_config.stem
+
+    spreadsheet_id = config.get('persistencia', {}).get('spreadsheet_id')
+    if not spreadsheet_id:
+        raise SystemExit(f"❌ {ruta_config} no define persistencia.spreadsheet_id: no hay a dónde replicar")
+
+    replicadas = SQLitePersistence(config).replicar_a_sheets()
+    print(f"✅ {replicadas} resultados replicados a {spreadsheet_id}")
+
+
+if __name__ == '__main__':
+    main()
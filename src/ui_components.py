@@ -6,7 +6,7 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 class UIComponents:
     """Clase para manejar componentes de UI con Streamlit"""
@@ -182,7 +182,12 @@ class UIComponents:
         }
         return colores.get(dificultad, "#9E9E9E")
     
-    def mostrar_resultados_finales(self, stats: Dict[str, Any], codigo: str):
+    def mostrar_resultados_finales(
+        self,
+        stats: Dict[str, Any],
+        codigo: str,
+        detalle_respuestas: Optional[List[Dict[str, Any]]] = None
+    ):
         """Muestra los resultados finales del examen"""
         st.balloons()
         
@@ -222,8 +227,8 @@ class UIComponents:
             self._mostrar_grafico_evolucion(stats['historial_notas'])
         
         with tab2:
-            if 'detalle_respuestas' in stats and stats['detalle_respuestas']:
-                for i, detalle in enumerate(stats['detalle_respuestas'], 1):
+            if detalle_respuestas:
+                for i, detalle in enumerate(detalle_respuestas, 1):
                     estado = "✅" if detalle['correcta'] else "❌"
                     
                     with st.expander(f"{estado} Pregunta {i} - {detalle['categoria']} (Nivel {detalle['dificultad']})"):